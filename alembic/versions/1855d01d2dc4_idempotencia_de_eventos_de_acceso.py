@@ -0,0 +1,31 @@
+"""Idempotencia de eventos de acceso
+
+Revision ID: 1855d01d2dc4
+Revises: 5a84895a32b9
+Create Date: 2026-10-19 15:12:08.417305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1855d01d2dc4'
+down_revision: Union[str, None] = '5a84895a32b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('access_log', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    # Los registros existentes quedan con NULL, que no entra en conflicto
+    op.create_unique_constraint(
+        'uq_access_log_device_idempotency_key', 'access_log', ['device_id', 'idempotency_key']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_access_log_device_idempotency_key', 'access_log', type_='unique')
+    op.drop_column('access_log', 'idempotency_key')
@@ -0,0 +1,43 @@
+"""Lectores de sedes y grupos en el registro
+
+Revision ID: 3b9d2e61f4a8
+Revises: e07b6a2c9d14
+Create Date: 2026-10-20 10:21:56.114392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2e61f4a8'
+down_revision: Union[str, None] = 'e07b6a2c9d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Los lectores asignados que aún no están en el registro se dan de alta
+    op.execute(
+        """
+        INSERT INTO device (device_id, is_active)
+        SELECT device_id, true FROM site_device
+        UNION
+        SELECT device_id, true FROM door_group_device
+        ON CONFLICT (device_id) DO NOTHING
+        """
+    )
+    op.create_foreign_key(
+        'site_device_device_id_fkey', 'site_device', 'device', ['device_id'], ['device_id'], ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        'door_group_device_device_id_fkey', 'door_group_device', 'device', ['device_id'], ['device_id'],
+        ondelete='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('door_group_device_device_id_fkey', 'door_group_device', type_='foreignkey')
+    op.drop_constraint('site_device_device_id_fkey', 'site_device', type_='foreignkey')
@@ -0,0 +1,30 @@
+"""Metadatos de enrolamiento de huellas
+
+Revision ID: 43ae4a962171
+Revises: 1855d01d2dc4
+Create Date: 2026-10-19 16:03:51.228940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '43ae4a962171'
+down_revision: Union[str, None] = '1855d01d2dc4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('fingerprint_quality', sa.SmallInteger(), nullable=True))
+    op.add_column('user', sa.Column('fingerprint_device_id', sa.String(), nullable=True))
+    op.add_column('user', sa.Column('fingerprint_enrolled_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('user', 'fingerprint_enrolled_at')
+    op.drop_column('user', 'fingerprint_device_id')
+    op.drop_column('user', 'fingerprint_quality')
@@ -0,0 +1,61 @@
+"""Sedes y partición de la galería
+
+Revision ID: 4754853baa6f
+Revises: 43ae4a962171
+Create Date: 2026-10-19 16:48:20.531774
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4754853baa6f'
+down_revision: Union[str, None] = '43ae4a962171'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'site',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_site_id'), 'site', ['id'], unique=False)
+    op.create_index(op.f('ix_site_code'), 'site', ['code'], unique=True)
+    op.create_table(
+        'site_device',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('device_id', sa.String(), nullable=False),
+        sa.Column('site_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['site_id'], ['site.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_site_device_id'), 'site_device', ['id'], unique=False)
+    op.create_index(op.f('ix_site_device_device_id'), 'site_device', ['device_id'], unique=True)
+    op.create_table(
+        'user_site',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('site_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['site_id'], ['site.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'site_id')
+    )
+    op.create_index(op.f('ix_user_site_site_id'), 'user_site', ['site_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_site_site_id'), table_name='user_site')
+    op.drop_table('user_site')
+    op.drop_index(op.f('ix_site_device_device_id'), table_name='site_device')
+    op.drop_index(op.f('ix_site_device_id'), table_name='site_device')
+    op.drop_table('site_device')
+    op.drop_index(op.f('ix_site_code'), table_name='site')
+    op.drop_index(op.f('ix_site_id'), table_name='site')
+    op.drop_table('site')
@@ -0,0 +1,51 @@
+"""Trabajos en segundo plano
+
+Revision ID: 4808d5502882
+Revises: 5077eee8d301
+Create Date: 2026-10-19 20:31:07.554120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4808d5502882'
+down_revision: Union[str, None] = '5077eee8d301'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('queue', sa.String(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('progress', sa.Float(), nullable=False),
+        sa.Column('message', sa.String(), nullable=True),
+        sa.Column('attempts', sa.SmallInteger(), nullable=False),
+        sa.Column('max_attempts', sa.SmallInteger(), nullable=False),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('worker', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('run_after', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_queue_status_run_after', 'job', ['queue', 'status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_queue_status_run_after', table_name='job')
+    op.drop_table('job')
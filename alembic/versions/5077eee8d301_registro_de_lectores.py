@@ -0,0 +1,34 @@
+"""Registro de lectores
+
+Revision ID: 5077eee8d301
+Revises: 5297e3d899cf
+Create Date: 2026-10-19 19:48:31.907214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5077eee8d301'
+down_revision: Union[str, None] = '5297e3d899cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('device', sa.Column('name', sa.String(), nullable=True))
+    op.add_column('device', sa.Column('location', sa.String(), nullable=True))
+    op.add_column('device', sa.Column('firmware_version', sa.String(), nullable=True))
+    op.add_column('device', sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+    op.add_column('device', sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('device', 'last_seen_at')
+    op.drop_column('device', 'is_active')
+    op.drop_column('device', 'firmware_version')
+    op.drop_column('device', 'location')
+    op.drop_column('device', 'name')
@@ -0,0 +1,102 @@
+"""Códigos compactos en access_log
+
+Revision ID: 5297e3d899cf
+Revises: aa21d00d3092
+Create Date: 2026-10-19 19:05:12.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5297e3d899cf'
+down_revision: Union[str, None] = 'aa21d00d3092'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Dimensión de lectores, poblada con los códigos ya registrados
+    op.create_table(
+        'device',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('device_id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_device_id'), 'device', ['id'], unique=False)
+    op.create_index(op.f('ix_device_device_id'), 'device', ['device_id'], unique=True)
+    op.execute(
+        "INSERT INTO device (device_id) "
+        "SELECT DISTINCT device_id FROM access_log WHERE device_id IS NOT NULL"
+    )
+
+    op.add_column('access_log', sa.Column('device_pk', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE access_log SET device_pk = device.id "
+        "FROM device WHERE device.device_id = access_log.device_id"
+    )
+    op.create_foreign_key('access_log_device_pk_fkey', 'access_log', 'device', ['device_pk'], ['id'])
+    op.drop_constraint('uq_access_log_device_idempotency_key', 'access_log', type_='unique')
+    op.drop_column('access_log', 'device_id')
+    op.create_unique_constraint(
+        'uq_access_log_device_idempotency_key', 'access_log', ['device_pk', 'idempotency_key']
+    )
+
+    # Un valor fuera del mapa se convertiría en NULL: se aborta antes de reescribir
+    unmapped = op.get_bind().execute(sa.text(
+        "SELECT 'access_type', access_type, count(*) FROM access_log "
+        "WHERE access_type NOT IN ('entry', 'exit') GROUP BY access_type "
+        "UNION ALL "
+        "SELECT 'status', status, count(*) FROM access_log "
+        "WHERE status NOT IN ('success', 'denied') GROUP BY status"
+    )).all()
+    if unmapped:
+        found = ", ".join(f"{column}={value!r} ({count} filas)" for column, value, count in unmapped)
+        raise RuntimeError(f"access_log tiene valores sin código; corríjalos antes de migrar: {found}")
+
+    # Una sola reescritura de la tabla para ambas columnas. El ELSE falla con
+    # el cast (o con el CHECK) en vez de dejar NULL si algo se coló
+    op.drop_index('ix_access_log_status_timestamp', table_name='access_log')
+    op.execute(
+        "ALTER TABLE access_log "
+        "ALTER COLUMN access_type TYPE smallint USING "
+        "CASE access_type WHEN 'entry' THEN 1 WHEN 'exit' THEN 2 ELSE access_type::smallint END, "
+        "ALTER COLUMN status TYPE smallint USING "
+        "CASE status WHEN 'success' THEN 1 WHEN 'denied' THEN 2 ELSE status::smallint END"
+    )
+    op.create_index('ix_access_log_status_timestamp', 'access_log', ['status', 'timestamp'])
+    op.create_check_constraint('ck_access_log_access_type', 'access_log', 'access_type IN (1, 2)')
+    op.create_check_constraint('ck_access_log_status', 'access_log', 'status IN (1, 2)')
+
+
+def downgrade() -> None:
+    op.drop_constraint('ck_access_log_status', 'access_log', type_='check')
+    op.drop_constraint('ck_access_log_access_type', 'access_log', type_='check')
+    op.drop_index('ix_access_log_status_timestamp', table_name='access_log')
+    op.execute(
+        "ALTER TABLE access_log "
+        "ALTER COLUMN access_type TYPE varchar USING "
+        "CASE access_type WHEN 1 THEN 'entry' WHEN 2 THEN 'exit' ELSE access_type::varchar END, "
+        "ALTER COLUMN status TYPE varchar USING "
+        "CASE status WHEN 1 THEN 'success' WHEN 2 THEN 'denied' ELSE status::varchar END"
+    )
+    op.create_index('ix_access_log_status_timestamp', 'access_log', ['status', 'timestamp'])
+
+    op.add_column('access_log', sa.Column('device_id', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE access_log SET device_id = device.device_id "
+        "FROM device WHERE device.id = access_log.device_pk"
+    )
+    op.drop_constraint('uq_access_log_device_idempotency_key', 'access_log', type_='unique')
+    op.create_unique_constraint(
+        'uq_access_log_device_idempotency_key', 'access_log', ['device_id', 'idempotency_key']
+    )
+    op.drop_constraint('access_log_device_pk_fkey', 'access_log', type_='foreignkey')
+    op.drop_column('access_log', 'device_pk')
+    op.drop_index(op.f('ix_device_device_id'), table_name='device')
+    op.drop_index(op.f('ix_device_id'), table_name='device')
+    op.drop_table('device')
@@ -0,0 +1,37 @@
+"""Indices para listado de usuarios
+
+Revision ID: 5a84895a32b9
+Revises: b282dc469186
+Create Date: 2026-10-19 10:41:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a84895a32b9'
+down_revision: Union[str, None] = 'b282dc469186'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Búsqueda por prefijo (LIKE 'abc%') independiente de la collation
+    op.create_index(
+        'ix_user_email_prefix', 'user', ['email'],
+        postgresql_ops={'email': 'text_pattern_ops'}
+    )
+    op.create_index(
+        'ix_user_full_name_lower_prefix', 'user',
+        [sa.text('lower(full_name) text_pattern_ops')]
+    )
+    op.create_index('ix_user_is_active', 'user', ['is_active'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_is_active', table_name='user')
+    op.drop_index('ix_user_full_name_lower_prefix', table_name='user')
+    op.drop_index('ix_user_email_prefix', table_name='user')
@@ -0,0 +1,26 @@
+"""Zona horaria por sede
+
+Revision ID: 8846adf37906
+Revises: 4808d5502882
+Create Date: 2026-10-19 22:41:05.318462
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8846adf37906'
+down_revision: Union[str, None] = '4808d5502882'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('site', sa.Column('timezone', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('site', 'timezone')
@@ -0,0 +1,29 @@
+"""Motivo de accesos denegados
+
+Revision ID: aa21d00d3092
+Revises: b93788e31357
+Create Date: 2026-10-19 18:20:44.117350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aa21d00d3092'
+down_revision: Union[str, None] = 'b93788e31357'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Código de app.models.access_log.DenialReason
+    op.add_column('access_log', sa.Column('reason', sa.SmallInteger(), nullable=True))
+    op.create_index('ix_access_log_status_timestamp', 'access_log', ['status', 'timestamp'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_access_log_status_timestamp', table_name='access_log')
+    op.drop_column('access_log', 'reason')
@@ -0,0 +1,136 @@
+"""Políticas de acceso
+
+Revision ID: b93788e31357
+Revises: 4754853baa6f
+Create Date: 2026-10-19 17:36:12.804419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b93788e31357'
+down_revision: Union[str, None] = '4754853baa6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'schedule',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_schedule_id'), 'schedule', ['id'], unique=False)
+    op.create_table(
+        'schedule_window',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('schedule_id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.SmallInteger(), nullable=False),
+        sa.Column('start_minute', sa.SmallInteger(), nullable=False),
+        sa.Column('end_minute', sa.SmallInteger(), nullable=False),
+        sa.CheckConstraint('weekday BETWEEN 0 AND 7', name='ck_schedule_window_weekday'),
+        sa.CheckConstraint(
+            'start_minute >= 0 AND end_minute <= 1440 AND start_minute < end_minute',
+            name='ck_schedule_window_range'
+        ),
+        sa.ForeignKeyConstraint(['schedule_id'], ['schedule.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_schedule_window_id'), 'schedule_window', ['id'], unique=False)
+    op.create_index(op.f('ix_schedule_window_schedule_id'), 'schedule_window', ['schedule_id'], unique=False)
+    op.create_table(
+        'door_group',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_door_group_id'), 'door_group', ['id'], unique=False)
+    op.create_table(
+        'door_group_device',
+        sa.Column('door_group_id', sa.Integer(), nullable=False),
+        sa.Column('device_id', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['door_group_id'], ['door_group.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('door_group_id', 'device_id')
+    )
+    op.create_table(
+        'access_rule',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('schedule_id', sa.Integer(), nullable=True),
+        sa.Column('door_group_id', sa.Integer(), nullable=True),
+        sa.Column('applies_to_all', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.ForeignKeyConstraint(['door_group_id'], ['door_group.id'], ondelete='RESTRICT'),
+        sa.ForeignKeyConstraint(['schedule_id'], ['schedule.id'], ondelete='RESTRICT'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_access_rule_id'), 'access_rule', ['id'], unique=False)
+    op.create_table(
+        'user_access_rule',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['rule_id'], ['access_rule.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'rule_id')
+    )
+    op.create_index(op.f('ix_user_access_rule_rule_id'), 'user_access_rule', ['rule_id'], unique=False)
+    op.create_table(
+        'holiday',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('date')
+    )
+    op.create_index(op.f('ix_holiday_id'), 'holiday', ['id'], unique=False)
+    op.create_table(
+        'user_access_exception',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('effect', sa.String(length=5), nullable=False),
+        sa.Column('door_group_id', sa.Integer(), nullable=True),
+        sa.Column('starts_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('ends_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('note', sa.String(), nullable=True),
+        sa.CheckConstraint("effect IN ('allow', 'deny')", name='ck_user_access_exception_effect'),
+        sa.ForeignKeyConstraint(['door_group_id'], ['door_group.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_access_exception_id'), 'user_access_exception', ['id'], unique=False)
+    op.create_index(op.f('ix_user_access_exception_user_id'), 'user_access_exception', ['user_id'], unique=False)
+    op.create_table(
+        'access_policy_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('access_policy_state')
+    op.drop_index(op.f('ix_user_access_exception_user_id'), table_name='user_access_exception')
+    op.drop_index(op.f('ix_user_access_exception_id'), table_name='user_access_exception')
+    op.drop_table('user_access_exception')
+    op.drop_index(op.f('ix_holiday_id'), table_name='holiday')
+    op.drop_table('holiday')
+    op.drop_index(op.f('ix_user_access_rule_rule_id'), table_name='user_access_rule')
+    op.drop_table('user_access_rule')
+    op.drop_index(op.f('ix_access_rule_id'), table_name='access_rule')
+    op.drop_table('access_rule')
+    op.drop_table('door_group_device')
+    op.drop_index(op.f('ix_door_group_id'), table_name='door_group')
+    op.drop_table('door_group')
+    op.drop_index(op.f('ix_schedule_window_schedule_id'), table_name='schedule_window')
+    op.drop_index(op.f('ix_schedule_window_id'), table_name='schedule_window')
+    op.drop_table('schedule_window')
+    op.drop_index(op.f('ix_schedule_id'), table_name='schedule')
+    op.drop_table('schedule')
@@ -0,0 +1,36 @@
+"""Sesiones de enrolamiento
+
+Revision ID: c5e1f0a7b312
+Revises: 8846adf37906
+Create Date: 2026-10-20 09:12:44.208613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1f0a7b312'
+down_revision: Union[str, None] = '8846adf37906'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'enrollment_session',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('device_ids', sa.JSON(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('results', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('enrollment_session')
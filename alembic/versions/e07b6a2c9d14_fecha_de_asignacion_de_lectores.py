@@ -0,0 +1,26 @@
+"""Fecha de asignación de lectores
+
+Revision ID: e07b6a2c9d14
+Revises: c5e1f0a7b312
+Create Date: 2026-10-20 09:48:31.730215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e07b6a2c9d14'
+down_revision: Union[str, None] = 'c5e1f0a7b312'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('site_device', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('site_device', 'updated_at')
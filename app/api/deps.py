@@ -1,11 +1,15 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Any, Dict, Generator, Optional
+from zoneinfo import ZoneInfo
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.core.config import get_settings
-from app.db.session import SessionLocal
+from app.core.timezones import get_zone
+from app.core.tokens import DenylistUnavailable, get_token_service
+from app.db.session import SessionLocal, open_read_session
+from app.models.site import Site
 from app.models.user import User
 
 settings = get_settings()
@@ -34,32 +38,49 @@ def get_db() -> Generator:
         db.close()
 
 
-# Verificar que un usuario está autenticado
-async def get_current_user(
-        db: Session = Depends(get_db),
-        token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
+def get_read_db() -> Generator:
+    """Sesión de solo lectura (réplica si hay una sana; ver app.db.replicas)"""
+    db = open_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+# Claims de un token válido y no revocado
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    token_service = get_token_service()
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
+        payload = token_service.decode(token)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    try:
+        revoked = await token_service.is_revoked(payload)
+    except DenylistUnavailable:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="No se puede comprobar la revocación del token")
+    if payload.get("sub") is None or revoked:
+        raise _credentials_exception()
+    return payload
+
 
+# Verificar que un usuario está autenticado
+async def get_current_user(
+        db: Session = Depends(get_db),
+        claims: Dict[str, Any] = Depends(get_token_claims)
+) -> User:
+    token_data = TokenData(email=claims["sub"])
     user = db.query(User).filter(User.email == token_data.email).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
@@ -75,3 +96,23 @@ async def get_current_admin(
             detail="El usuario no tiene privilegios de administrador"
         )
     return current_user
+
+
+def get_timezone(
+        tz: Optional[str] = Query(None, description="Zona horaria IANA de las fechas (por defecto TIMEZONE)"),
+        tz_site: Optional[str] = Query(None, description="Código de sede cuya zona horaria se usa"),
+        db: Session = Depends(get_db)
+) -> ZoneInfo:
+    """
+    Zona horaria de la petición para los días de filtros y reportes:
+    tz explícita, la de la sede tz_site o TIMEZONE
+    """
+    if tz is None and tz_site is not None:
+        site = db.query(Site.id, Site.timezone).filter(Site.code == tz_site).first()
+        if site is None:
+            raise HTTPException(status_code=404, detail="Sede no encontrada")
+        tz = site.timezone
+    try:
+        return get_zone(tz)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
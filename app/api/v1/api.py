@@ -1,8 +1,13 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, access, biometric, reports
+from app.api.v1.endpoints import auth, access, biometric, reports, sites, policies, devices, anomalies, jobs
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(access.router, prefix="/access", tags=["access-control"])
 api_router.include_router(biometric.router, prefix="/biometric", tags=["biometric"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(sites.router, prefix="/sites", tags=["sites"])
+api_router.include_router(policies.router, prefix="/policies", tags=["access-policies"])
+api_router.include_router(devices.router, prefix="/devices", tags=["devices"])
+api_router.include_router(anomalies.router, prefix="/anomalies", tags=["anomalies"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
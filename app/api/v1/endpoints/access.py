@@ -1,22 +1,39 @@
-from typing import List, Optional, Any
+from typing import List, Literal, Optional, Any
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from datetime import datetime, date
+from zoneinfo import ZoneInfo
 from fastapi.responses import FileResponse
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from starlette.concurrency import run_in_threadpool
 import tempfile
 from app.api import deps
+from app.core.config import get_settings
+from app.core.responses import FastJSONResponse, RowListSerializer
+from app.core.timezones import utc_range
 from app.models.user import User
 from app.models.access_log import AccessLog
 from app.schemas import access_log as access_schemas
+from app.services.access_feed import get_access_feed
+from app.services.access_export import access_logs_export_query, write_access_logs_pdf
+from app.services.access_ingest import ingest_access_events
+from app.services.device_cache import get_device_cache
+from app.services.access_log_queries import (
+    access_log_query,
+    access_log_with_user_query,
+    apply_date_range,
+    to_access_log_with_user,
+)
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter()
 
+# Serializadores en bloque para los listados de filas proyectadas
+access_log_rows = RowListSerializer(access_schemas.AccessLogRow)
+access_log_with_user_rows = RowListSerializer(access_schemas.AccessLogWithUserRow)
+
 
 @router.post("/record", response_model=access_schemas.AccessLog)
 def record_access(
@@ -28,19 +45,12 @@ def record_access(
     """
     Registrar una entrada o salida del usuario actual
     """
-    # Verificar tipo de acceso válido
-    if access_data.access_type not in ["entry", "exit"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Tipo de acceso debe ser 'entry' o 'exit'"
-        )
-
     # Crear registro de acceso
     access_log = AccessLog(
         user_id=current_user.id,
         access_type=access_data.access_type,
         status="success",
-        device_id=access_data.device_id
+        device_pk=get_device_cache().id_for(db, access_data.device_id)
     )
 
     db.add(access_log)
@@ -49,6 +59,29 @@ def record_access(
     return access_log
 
 
+@router.post(
+    "/events/batch",
+    response_model=access_schemas.AccessEventBatchResult,
+    response_class=FastJSONResponse
+)
+def ingest_access_events_batch(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        batch: access_schemas.AccessEventBatch
+) -> Any:
+    """
+    Cargar en lote los eventos almacenados por un lector sin conexión.
+    Los eventos ya recibidos (misma clave de idempotencia) se reportan como duplicados
+    """
+    if len(batch.events) > settings.ACCESS_INGEST_MAX_EVENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {settings.ACCESS_INGEST_MAX_EVENTS} eventos"
+        )
+    return ingest_access_events(db, batch.device_id, batch.events)
+
+
 @router.get("/history", response_model=List[access_schemas.AccessLog])
 def get_access_history(
         db: Session = Depends(deps.get_db),
@@ -59,108 +92,135 @@ def get_access_history(
     """
     Obtener historial de accesos del usuario actual
     """
-    access_logs = db.query(AccessLog) \
+    access_logs = access_log_query(db) \
         .filter(AccessLog.user_id == current_user.id) \
         .order_by(AccessLog.timestamp.desc()) \
         .offset(skip) \
         .limit(limit) \
         .all()
-    return access_logs
+    return access_log_rows.response([row._asdict() for row in access_logs])
 
 
 @router.get("/today", response_model=List[access_schemas.AccessLog])
 def get_today_access(
         db: Session = Depends(deps.get_db),
-        current_user: User = Depends(deps.get_current_user)
+        current_user: User = Depends(deps.get_current_user),
+        tz: ZoneInfo = Depends(deps.get_timezone)
 ) -> Any:
     """
-    Obtener registros de acceso del día actual
+    Obtener registros de acceso del día actual (día local de tz)
     """
-    today = datetime.now().date()
-    access_logs = db.query(AccessLog) \
+    today = datetime.now(tz).date()
+    start, end = utc_range(today, today, tz)
+    access_logs = access_log_query(db) \
         .filter(
         AccessLog.user_id == current_user.id,
-        AccessLog.timestamp >= today
+        AccessLog.timestamp >= start,
+        AccessLog.timestamp < end
     ) \
         .order_by(AccessLog.timestamp.desc()) \
         .all()
-    return access_logs
+    return access_log_rows.response([row._asdict() for row in access_logs])
 
 
 @router.get("/admin/logs", response_model=List[access_schemas.AccessLogWithUser])
 def get_all_access_logs(
         *,
-        db: Session = Depends(deps.get_db),
+        db: Session = Depends(deps.get_read_db),
         current_user: User = Depends(deps.get_current_admin),
         start_date: Optional[date] = Query(None),
         end_date: Optional[date] = Query(None),
         user_id: Optional[int] = Query(None),
-        access_type: Optional[str] = Query(None),
+        access_type: Optional[Literal["entry", "exit"]] = Query(None),
         device_id: Optional[str] = Query(None),
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        tz: ZoneInfo = Depends(deps.get_timezone)
 ) -> Any:
     """
     Obtener todos los registros de acceso con filtros (solo admin)
     """
-    query = db.query(AccessLog)
+    query = apply_date_range(access_log_with_user_query(db, outer=True), start_date, end_date, tz)
 
-    if start_date:
-        query = query.filter(func.date(AccessLog.timestamp) >= start_date)
-    if end_date:
-        query = query.filter(func.date(AccessLog.timestamp) <= end_date)
     if user_id:
         query = query.filter(AccessLog.user_id == user_id)
     if access_type:
         query = query.filter(AccessLog.access_type == access_type)
     if device_id:
-        query = query.filter(AccessLog.device_id == device_id)
+        query = query.filter(get_device_cache().filter_for(db, device_id))
 
-    return query.order_by(AccessLog.timestamp.desc()).offset(skip).limit(limit).all()
+    rows = query.order_by(AccessLog.timestamp.desc()).offset(skip).limit(limit).all()
+    return access_log_with_user_rows.response([to_access_log_with_user(row) for row in rows])
 
 
-@router.get("/admin/stats/device", response_model=List[dict])
+@router.get("/admin/stats/device", response_model=List[dict], response_class=FastJSONResponse)
 def get_device_stats(
         *,
-        db: Session = Depends(deps.get_db),
+        db: Session = Depends(deps.get_read_db),
         current_user: User = Depends(deps.get_current_admin),
         start_date: Optional[date] = Query(None),
-        end_date: Optional[date] = Query(None)
+        end_date: Optional[date] = Query(None),
+        tz: ZoneInfo = Depends(deps.get_timezone)
 ) -> Any:
     """
     Obtener estadísticas de uso por dispositivo
     """
     query = db.query(
-        AccessLog.device_id,
+        AccessLog.device_pk,
         func.count(AccessLog.id).label('total_accesses'),
         func.count(func.distinct(AccessLog.user_id)).label('unique_users')
     )
-
-    if start_date:
-        query = query.filter(func.date(AccessLog.timestamp) >= start_date)
-    if end_date:
-        query = query.filter(func.date(AccessLog.timestamp) <= end_date)
-
-    return query.group_by(AccessLog.device_id).all()
+    query = apply_date_range(query, start_date, end_date, tz)
+
+    # Se agrupa por el id entero; código y metadatos salen del caché de lectores
+    device_cache = get_device_cache()
+    return [
+        {
+            **device_cache.summary(db, row.device_pk),
+            "total_accesses": row.total_accesses,
+            "unique_users": row.unique_users,
+        }
+        for row in query.group_by(AccessLog.device_pk).all()
+    ]
+
+
+@router.get("/admin/feed", response_model=access_schemas.AccessFeedPage, response_class=FastJSONResponse)
+async def get_access_feed_page(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        cursor: int = Query(0, ge=0),
+        limit: int = Query(1000, ge=1),
+        wait: float = Query(0, ge=0)
+) -> Any:
+    """
+    Eventos de acceso con id mayor que cursor, en orden de id. Se reenvía
+    next_cursor en la siguiente petición; con wait > 0 se espera hasta wait
+    segundos a que haya eventos nuevos
+    """
+    # La espera no retiene la conexión usada para autenticar
+    db.close()
+    feed = get_access_feed()
+    horizon = await feed.wait_for(cursor, min(wait, settings.ACCESS_FEED_MAX_WAIT_SECONDS))
+    page = await run_in_threadpool(feed.read, cursor, horizon, min(limit, settings.ACCESS_FEED_MAX_LIMIT))
+    return FastJSONResponse(page)
 
 
 @router.get("/admin/check-records")
 def check_access_logs_exist(
         *,
-        db: Session = Depends(deps.get_db),
+        db: Session = Depends(deps.get_read_db),
         current_user: User = Depends(deps.get_current_admin),
         start_date: Optional[date] = Query(None),
         end_date: Optional[date] = Query(None),
         employee_id: Optional[str] = Query(None),
-        full_name: Optional[str] = Query(None)
+        full_name: Optional[str] = Query(None),
+        tz: ZoneInfo = Depends(deps.get_timezone)
 ) -> dict:
     """Verificar si existen registros de acceso con los filtros especificados"""
     query = db.query(func.count(AccessLog.id)).join(User)
+    query = apply_date_range(query, start_date, end_date, tz)
 
-    if start_date:
-        query = query.filter(func.date(AccessLog.timestamp) >= start_date)
-    if end_date:
-        query = query.filter(func.date(AccessLog.timestamp) <= end_date)
     if employee_id:
         query = query.filter(User.employee_id == employee_id)
     if full_name:
@@ -178,79 +238,41 @@ def check_access_logs_exist(
 @router.get("/admin/export-pdf")
 def export_access_logs_pdf(
     *,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     current_user: User = Depends(deps.get_current_admin),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     employee_id: Optional[str] = Query(None),  # Cambiado de user_id
-    full_name: Optional[str] = Query(None)     # Nuevo
+    full_name: Optional[str] = Query(None),    # Nuevo
+    tz: ZoneInfo = Depends(deps.get_timezone)
 ) -> Any:
-    """Exportar registros de acceso a PDF"""
-    query = db.query(AccessLog).join(User)
-
-    if start_date:
-        query = query.filter(func.date(AccessLog.timestamp) >= start_date)
-    if end_date:
-        query = query.filter(func.date(AccessLog.timestamp) <= end_date)
-    if employee_id:
-        query = query.filter(User.employee_id == employee_id)
-    if full_name:
-        query = query.filter(User.full_name.ilike(f"%{full_name}%"))
-
-    logs = query.order_by(AccessLog.timestamp.desc()).all()
+    """Exportar registros de acceso a PDF (para rangos grandes, usar el job access_logs_pdf)"""
+    logs = access_logs_export_query(db, start_date, end_date, employee_id, full_name, tz).all()
 
     # Crear PDF temporal
     with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-        doc = SimpleDocTemplate(tmp.name, pagesize=letter)
-        elements = []
-
-        # Crear tabla
-        data = [['Fecha', 'Usuario', 'Tipo', 'Dispositivo', 'Estado']]
-        for log in logs:
-            data.append([
-                log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                log.user.full_name,
-                log.access_type,
-                log.device_id,
-                log.status
-            ])
-
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(table)
-        doc.build(elements)
+        write_access_logs_pdf(tmp.name, logs, tz)
 
         return FileResponse(
             tmp.name,
             media_type='application/pdf',
-            filename=f'access_logs_{datetime.now().strftime("%Y%m%d")}.pdf'
+            filename=f'access_logs_{datetime.now(tz).strftime("%Y%m%d")}.pdf'
         )
 
 
 @router.get("/history/filtered", response_model=List[access_schemas.AccessLogWithUser])
 def get_filtered_access_history(
-        db: Session = Depends(deps.get_db),
+        db: Session = Depends(deps.get_read_db),
         current_user: User = Depends(deps.get_current_admin),
         start_date: Optional[date] = Query(None),
         end_date: Optional[date] = Query(None),
         employee_id: Optional[str] = Query(None),  # Cambiado a str
         email: Optional[str] = Query(None),
         full_name: Optional[str] = Query(None),
-        access_type: Optional[str] = Query(None),
+        access_type: Optional[Literal["entry", "exit"]] = Query(None),
         device_id: Optional[str] = Query(None),
-        status: Optional[str] = Query(None)
+        status: Optional[Literal["success", "denied"]] = Query(None),
+        tz: ZoneInfo = Depends(deps.get_timezone)
 ):
     """
     Obtener historial de accesos con filtros
@@ -258,35 +280,31 @@ def get_filtered_access_history(
     try:
         logger.info(f"Iniciando búsqueda con filtros: {locals()}")
 
-        # Construir la consulta base
-        query = db.query(AccessLog)
+        # Consulta base: un único JOIN con las columnas del resumen de usuario
+        query = access_log_with_user_query(db)
 
         # Aplicar los filtros
-        if start_date:
-            query = query.filter(func.date(AccessLog.timestamp) >= start_date)
-        if end_date:
-            query = query.filter(func.date(AccessLog.timestamp) <= end_date)
+        query = apply_date_range(query, start_date, end_date, tz)
         if employee_id:
-            query = query.join(User).filter(User.employee_id == employee_id)
+            query = query.filter(User.employee_id == employee_id)
         if email:
-            query = query.join(User).filter(User.email.ilike(f"%{email}%"))
+            query = query.filter(User.email.ilike(f"%{email}%"))
         if full_name:
-            query = query.join(User).filter(User.full_name.ilike(f"%{full_name}%"))
+            query = query.filter(User.full_name.ilike(f"%{full_name}%"))
         if access_type:
             query = query.filter(AccessLog.access_type == access_type)
         if device_id:
-            query = query.filter(AccessLog.device_id == device_id)
+            query = query.filter(get_device_cache().filter_for(db, device_id))
         if status:
             query = query.filter(AccessLog.status == status)
 
-        # Asegurarnos de que la relación user está cargada
-        if not any([employee_id, email, full_name]):
-            query = query.join(User)
-
-        result = query.order_by(AccessLog.timestamp.desc()).all()
+        result = [
+            to_access_log_with_user(row)
+            for row in query.order_by(AccessLog.timestamp.desc()).all()
+        ]
         logger.info(f"Búsqueda completada. Encontrados {len(result)} registros")
 
-        return result
+        return access_log_with_user_rows.response(result)
     except Exception as e:
         logger.error(f"Error en get_filtered_access_history: {str(e)}")
         logger.exception("Traceback completo:")
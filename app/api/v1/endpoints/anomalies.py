@@ -0,0 +1,68 @@
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.models.access_log import AccessLog
+from app.models.device import Device
+from app.models.site import SiteDevice
+from app.models.user import User
+from app.schemas import anomaly as anomaly_schemas
+from app.services.access_log_queries import apply_date_range
+from app.services.anomaly_detection import (
+    ALERT_KINDS, AccessEvent, AnomalyDetector, AnomalyThresholds, get_anomaly_detector, replay
+)
+
+router = APIRouter()
+
+AlertKind = Literal[ALERT_KINDS]
+
+
+@router.get("", response_model=List[anomaly_schemas.AnomalyAlert])
+def list_alerts(
+        current_user: User = Depends(deps.get_current_admin),
+        detector: AnomalyDetector = Depends(get_anomaly_detector),
+        kind: Optional[AlertKind] = Query(None),
+        limit: int = Query(100, ge=1, le=1000)
+) -> Any:
+    """
+    Alertas recientes, las más nuevas primero. Cada worker sigue el mismo feed de
+    access_log, así que todos devuelven las mismas (con unos segundos de desfase)
+    """
+    return [alert._asdict() for alert in detector.alerts(kind, limit)]
+
+
+@router.get("/stats", response_model=anomaly_schemas.AnomalyStats)
+def anomaly_stats(
+        current_user: User = Depends(deps.get_current_admin),
+        detector: AnomalyDetector = Depends(get_anomaly_detector)
+) -> Any:
+    """
+    Contadores del detector: eventos procesados, alertas por tipo y costo medio por evento
+    """
+    return detector.stats()
+
+
+@router.post("/replay", response_model=anomaly_schemas.AnomalyReplayResult)
+def replay_anomalies(
+        replay_in: anomaly_schemas.AnomalyReplayRequest,
+        db: Session = Depends(deps.get_read_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Reprocesar accesos históricos con otros umbrales, sin afectar al detector en vivo
+    """
+    overrides = replay_in.model_dump(exclude_none=True, exclude={"start_date", "end_date", "limit"})
+    thresholds = AnomalyThresholds.from_settings()._replace(**overrides)
+    device_sites = dict(db.query(SiteDevice.device_id, SiteDevice.site_id))
+
+    query = db.query(
+        AccessLog.user_id, Device.device_id, AccessLog.access_type, AccessLog.status, AccessLog.timestamp
+    ).select_from(AccessLog).outerjoin(Device, AccessLog.device_pk == Device.id)
+    query = apply_date_range(query, replay_in.start_date, replay_in.end_date)
+    events = (AccessEvent(*row) for row in query.order_by(AccessLog.timestamp).yield_per(5000))
+
+    detector = replay(events, thresholds, device_sites.get, max_alerts=max(replay_in.limit, 1))
+    return {
+        "stats": detector.stats(),
+        "alerts": [alert._asdict() for alert in detector.alerts(limit=replay_in.limit)],
+    }
@@ -1,19 +1,80 @@
+import asyncio
+import logging
+import time
 from datetime import timedelta
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import Session, undefer
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.login_throttle import LoginThrottle
+from app.core.security import create_access_token, get_password_hash, verify_password_or_dummy
+from app.core.tokens import DenylistUnavailable, get_token_service
 from app.api import deps
 from app.schemas import user as user_schemas
 from app.models.user import User
+from app.services.fingerprint_service import get_fingerprint_service
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 router = APIRouter()
 
+account_throttle = LoginThrottle(
+    max_failures=settings.LOGIN_MAX_FAILURES_PER_ACCOUNT,
+    base_delay=settings.LOGIN_BACKOFF_BASE_SECONDS,
+    max_delay=settings.LOGIN_BACKOFF_MAX_SECONDS,
+    window=settings.LOGIN_FAILURE_WINDOW_SECONDS
+)
+ip_throttle = LoginThrottle(
+    max_failures=settings.LOGIN_MAX_FAILURES_PER_IP,
+    base_delay=settings.LOGIN_BACKOFF_BASE_SECONDS,
+    max_delay=settings.LOGIN_BACKOFF_MAX_SECONDS,
+    window=settings.LOGIN_FAILURE_WINDOW_SECONDS
+)
+
+# Por encima de este número de filas, el total sin filtros se toma de las
+# estadísticas del planner (pg_class.reltuples) en lugar de un COUNT(*)
+USER_COUNT_ESTIMATE_THRESHOLD = 100_000
+
+
+class UserSortField(str, Enum):
+    id = "id"
+    full_name = "full_name"
+    email = "email"
+    employee_id = "employee_id"
+    created_at = "created_at"
+
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+
+def _escape_like(value: str) -> str:
+    """Escapa comodines de LIKE para búsquedas por prefijo literal"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _estimated_user_count(db: Session) -> Optional[int]:
+    """Total aproximado de usuarios según las estadísticas de Postgres"""
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'public.\"user\"'::regclass")
+    ).scalar()
+    # reltuples es -1 (o 0) si la tabla nunca fue analizada
+    if estimate is None or estimate <= 0:
+        return None
+    return int(estimate)
+
+
+def _invalidate_template_index(user_in: user_schemas.UserUpdate) -> None:
+    """Los cambios de estado o de huella deben verse ya en la verificación"""
+    if user_in.model_fields_set & {"is_active", "fingerprint_template"}:
+        get_fingerprint_service().template_index.invalidate()
+
 
 @router.post("/register", response_model=user_schemas.User)
 def register_user(
@@ -56,8 +117,26 @@ def register_user(
     return user
 
 
+def _authenticate(db: Session, email: str, password: str):
+    """(usuario, contraseña correcta, hash nuevo); bloqueante: consulta y hash"""
+    user = db.query(User) \
+        .options(undefer(User.hashed_password)) \
+        .filter(User.email == email) \
+        .first()
+    # La contraseña se verifica siempre (con un hash ficticio si el usuario no
+    # existe): todos los fallos cuestan lo mismo
+    password_ok, new_hash = verify_password_or_dummy(password, user.hashed_password if user else None)
+    return user, password_ok, new_hash
+
+
+def _rehash(db: Session, user: User, new_hash: str) -> None:
+    user.hashed_password = new_hash
+    db.commit()
+
+
 @router.post("/login")
-def login(
+async def login(
+        request: Request,
         db: Session = Depends(deps.get_db),
         form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
@@ -65,25 +144,46 @@ def login(
     Login OAuth2 compatible con obtención de token JWT.
     Solo para administradores.
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
+    account_key = form_data.username.strip().lower()
+    ip_key = request.client.host if request.client else "unknown"
 
-    # Primero verificamos si es superuser
-    if not user or not user.is_superuser:
-        print("Solo ingreso permitido a Superusuarios")
+    # Cuentas o IPs en retroceso se rechazan antes de consultar o hashear
+    retry_after = max(account_throttle.retry_after(account_key), ip_throttle.retry_after(ip_key))
+    if retry_after > 0:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Acceso permitido solo para administradores",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos fallidos. Intente más tarde",
+            headers={"Retry-After": str(int(retry_after) + 1)},
         )
 
-    # Luego verificamos la contraseña
-    if not verify_password(form_data.password, user.hashed_password):
+    started = time.perf_counter()
+    # Consulta y hash en el pool de hilos; la espera de relleno no ocupa hilo
+    user, password_ok, new_hash = await run_in_threadpool(
+        _authenticate, db, form_data.username, form_data.password
+    )
+
+    # El rol se comprueba después del hash: los fallos responden igual, sin
+    # revelar qué correos existen o son administradores
+    if not user or not password_ok or not user.is_superuser:
+        account_throttle.record_failure(account_key)
+        ip_throttle.record_failure(ip_key)
+        logger.info(f"Login fallido para {account_key} desde {ip_key}")
+        remaining = settings.LOGIN_FAILURE_MIN_SECONDS - (time.perf_counter() - started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Contraseña incorrecta",
+            detail="Credenciales inválidas o acceso no permitido",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    account_throttle.reset(account_key)
+
+    # Rehash transparente si el hash usa un esquema o costo obsoleto
+    if new_hash:
+        await run_in_threadpool(_rehash, db, user, new_hash)
+        logger.info(f"Hash de contraseña actualizado a la política vigente para {account_key}")
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -100,16 +200,28 @@ def login(
     }
 
 
+@router.get("/jwks.json")
+async def jwks():
+    """
+    Claves públicas de verificación de tokens (vacío con algoritmos HS*)
+    """
+    return get_token_service().keys.jwks()
+
+
 @router.post("/logout")
-async def logout(current_user: User = Depends(deps.get_current_user)):
+async def logout(
+        current_user: User = Depends(deps.get_current_user),
+        claims: Dict[str, Any] = Depends(deps.get_token_claims)
+):
     """
-    Endpoint para registrar el logout del usuario
+    Endpoint para registrar el logout del usuario.
+    Revoca el token actual hasta su expiración.
     """
-    print("------- Logout Endpoint Hit -------")
-    print(f"User: {current_user.email}")
-    print(f"ID: {current_user.id}")
-    print(f"Full name: {current_user.full_name}")
-    print("----------------------------------")
+    try:
+        await get_token_service().revoke(claims)
+    except DenylistUnavailable:
+        raise HTTPException(status_code=503, detail="No se pudo revocar el token, intente de nuevo")
+    logger.info(f"Logout del usuario {current_user.id}")
     return {"message": f"Logout exitoso para usuario {current_user.email}"}
 
 
@@ -152,6 +264,7 @@ def update_current_user(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    _invalidate_template_index(user_in)
     return current_user
 
 
@@ -166,7 +279,6 @@ def partial_update_user(
     Actualizar parcialmente datos del usuario actual.
     Solo actualiza los campos que se envían.
     """
-    stored_user_data = jsonable_encoder(current_user)
     update_data = user_in.model_dump(exclude_unset=True)
 
     # Si se está actualizando el email, verificar que no exista
@@ -181,31 +293,84 @@ def partial_update_user(
     if "password" in update_data:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
 
-    for field in stored_user_data:
-        if field in update_data:
-            setattr(current_user, field, update_data[field])
+    # Se recorre update_data (no el estado cargado) porque las columnas
+    # diferidas no aparecen entre los atributos cargados del usuario
+    for field, value in update_data.items():
+        if hasattr(User, field):
+            setattr(current_user, field, value)
 
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    _invalidate_template_index(user_in)
     return current_user
 
 
-@router.get("/users", response_model=List[user_schemas.User])
+@router.get("/users", response_model=user_schemas.UserPage)
 def get_users(
         db: Session = Depends(deps.get_db),
-        current_user: User = Depends(deps.get_current_admin)
-):
+        current_user: User = Depends(deps.get_current_admin),
+        skip: int = Query(0, ge=0),
+        limit: int = Query(50, ge=1, le=500),
+        sort_by: UserSortField = Query(UserSortField.id),
+        sort_order: SortOrder = Query(SortOrder.asc),
+        is_active: Optional[bool] = Query(None),
+        has_fingerprint: Optional[bool] = Query(None),
+        search: Optional[str] = Query(None, min_length=1, description="Prefijo de nombre o email")
+) -> Any:
     """
-    Obtener todos los usuarios (solo admin)
+    Obtener usuarios paginados, ordenados y filtrados (solo admin)
     """
-    users = db.query(User).all()
-    # Verifica que los usuarios tengan el campo fingerprint_template
-    # print("Users with fingerprints:", [
-    #     (u.id, bool(u.fingerprint_template)) for u in users
-    # ])
+    query = db.query(User)
+    filtered = False
+
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+        filtered = True
+    if has_fingerprint is not None:
+        query = query.filter(
+            User.fingerprint_template.isnot(None) if has_fingerprint
+            else User.fingerprint_template.is_(None)
+        )
+        filtered = True
+    if search:
+        # Prefijo en minúsculas: usa ix_user_email_prefix e ix_user_full_name_lower_prefix
+        prefix = _escape_like(search.strip().lower()) + "%"
+        query = query.filter(or_(
+            User.email.like(prefix, escape="\\"),
+            func.lower(User.full_name).like(prefix, escape="\\")
+        ))
+        filtered = True
+
+    # Total: estimado para la tabla completa si es grande, exacto en otro caso
+    total = None
+    total_is_estimate = False
+    if not filtered:
+        estimate = _estimated_user_count(db)
+        if estimate is not None and estimate >= USER_COUNT_ESTIMATE_THRESHOLD:
+            total, total_is_estimate = estimate, True
+    if total is None:
+        total = query.with_entities(func.count(User.id)).order_by(None).scalar()
+
+    # Orden estable con desempate por id para que las páginas no se solapen
+    sort_column = getattr(User, sort_by.value)
+    if sort_order == SortOrder.desc:
+        order = [sort_column.desc(), User.id.desc()]
+    else:
+        order = [sort_column.asc(), User.id.asc()]
+
+    # hashed_password y fingerprint_template quedan diferidos;
+    # la respuesta solo incluye has_fingerprint
+    users = query.order_by(*order).offset(skip).limit(limit).all()
+
+    return {
+        "items": users,
+        "total": total,
+        "total_is_estimate": total_is_estimate,
+        "skip": skip,
+        "limit": limit
+    }
 
-    return users
 
 @router.get("/users/{user_id}", response_model=user_schemas.User)
 def get_user(
@@ -246,4 +411,5 @@ def update_user(
     db.add(user)
     db.commit()
     db.refresh(user)
+    _invalidate_template_index(user_in)
     return user
\ No newline at end of file
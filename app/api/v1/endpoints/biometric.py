@@ -1,46 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.api import deps
+from app.core.config import get_settings
+from app.core.rate_limit import AdmissionController, AdmissionRejected, build_limiter
 from app.core.security import decrypt_fingerprint, encrypt_fingerprint
-from app.services.fingerprint_service import FingerprintService
+from app.services.access_log_writer import AccessLogWriter, get_access_log_writer
+from app.services.device_cache import get_device_cache
+from app.services.device_heartbeat import DeviceHeartbeatTracker, get_device_heartbeats
+from app.services.enrollment import EnrollmentRejected, EnrollmentService, get_enrollment_service
+from app.services.fingerprint_service import FingerprintService, get_fingerprint_service
 from app.models.user import User
-from app.models.access_log import AccessLog
+from app.models.access_log import AccessLog, DenialReason
+from app.schemas import enrollment as enrollment_schemas
 from app.schemas import user as user_schemas
-from datetime import datetime
+from datetime import datetime, timezone
 
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
 router = APIRouter()
-fingerprint_service = FingerprintService()
+
+device_limiter = build_limiter(
+    settings.VERIFY_RATE_PER_DEVICE, settings.VERIFY_BURST_PER_DEVICE,
+    settings.RATE_LIMIT_REDIS_URL, prefix="verify:device"
+)
+ip_limiter = build_limiter(
+    settings.VERIFY_RATE_PER_IP, settings.VERIFY_BURST_PER_IP,
+    settings.RATE_LIMIT_REDIS_URL, prefix="verify:ip"
+)
+verify_admission = AdmissionController(
+    max_concurrent=settings.VERIFY_MAX_CONCURRENT,
+    queue_timeout=settings.VERIFY_QUEUE_TIMEOUT,
+    max_queued=settings.VERIFY_MAX_QUEUED
+)
+
+
+def _too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+    )
+
+
+async def admit_verification(
+        request: Request,
+        device_id: Optional[str] = Query(None, description="Identificador del lector"),
+        db: Session = Depends(deps.get_db)
+):
+    """
+    Admisión de /verify: límites por IP y por lector registrado, y luego un
+    turno dentro del tope global de verificaciones concurrentes. Con
+    VERIFY_REQUIRE_REGISTERED_DEVICE un lector ausente o desconocido recibe
+    403; sin esa opción solo le aplica el límite de la IP (rotar el código
+    no da cupo nuevo)
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    # La IP va primero: acota también las consultas de lectores desconocidos
+    allowed, retry_after = await ip_limiter.acquire(client_ip)
+    if not allowed:
+        raise _too_many_requests("Demasiadas verificaciones desde esta dirección", retry_after)
+    device_pk = await run_in_threadpool(get_device_cache().id_for, db, device_id, False)
+    if device_pk is None and settings.VERIFY_REQUIRE_REGISTERED_DEVICE:
+        raise HTTPException(status_code=403, detail="Lector no registrado")
+    if device_pk is not None:
+        allowed, retry_after = await device_limiter.acquire(str(device_pk))
+        if not allowed:
+            raise _too_many_requests("Demasiadas verificaciones desde este dispositivo", retry_after)
+
+    try:
+        await verify_admission.acquire()
+    except AdmissionRejected as e:
+        raise _too_many_requests(f"Servicio de verificación saturado: {e}", settings.VERIFY_QUEUE_TIMEOUT)
+    try:
+        yield device_id
+    finally:
+        verify_admission.release()
+
+
+# Código de rechazo del enrolamiento -> estado HTTP
+ENROLLMENT_REJECTION_STATUS = {
+    "user_not_found": 404,
+    "capture_failed": 400,
+    "low_quality": 422,
+    "duplicate": 409,
+}
 
 
 @router.post("/users/{user_id}/fingerprint", response_model=user_schemas.User)
 async def register_fingerprint(
         user_id: int,
+        device_id: Optional[str] = Query(None),
         db: Session = Depends(deps.get_db),
-        current_user: User = Depends(deps.get_current_admin)
+        current_user: User = Depends(deps.get_current_admin),
+        enrollment_service: EnrollmentService = Depends(get_enrollment_service)
 ):
-    """Registrar huella de un usuario (solo admin)"""
+    """Registrar huella de un usuario (solo admin), con control de calidad y de duplicados"""
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="Usuario no encontrado")
-
-        template = await fingerprint_service.register_fingerprint(db, user_id)
-        if not template:
-            raise HTTPException(status_code=400, detail="Error al registrar huella")
-
-        # Encriptar y guardar template
-        encrypted_template = encrypt_fingerprint(template)
-        user.fingerprint_template = encrypted_template
-        db.commit()
-        db.refresh(user)
-        print( "Huella registrada exitosamente")
+        # La captura bloquea hasta que el lector responde
+        user = await run_in_threadpool(enrollment_service.enroll, db, user_id, device_id)
+        logger.info(f"Huella registrada para el usuario {user.id} por {current_user.id}")
 
         return user
 
+    except EnrollmentRejected as e:
+        detail = {"reason": e.reason, "message": e.detail}
+        if e.matched_user_id is not None:
+            detail["matched_user_id"] = e.matched_user_id
+        raise HTTPException(status_code=ENROLLMENT_REJECTION_STATUS[e.reason], detail=detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en el registro de huella: {str(e)}")
 
 
+@router.post(
+    "/enrollment/sessions",
+    response_model=enrollment_schemas.EnrollmentSession,
+    status_code=202
+)
+async def start_enrollment_session(
+        session_in: enrollment_schemas.EnrollmentSessionCreate,
+        current_user: User = Depends(deps.get_current_admin),
+        enrollment_service: EnrollmentService = Depends(get_enrollment_service)
+):
+    """
+    Iniciar un enrolamiento en lote: los usuarios se reparten entre los
+    lectores indicados, que trabajan en paralelo
+    """
+    session = await enrollment_service.start_session(session_in.user_ids, session_in.device_ids)
+    return session.snapshot()
+
+
+@router.get("/enrollment/sessions/{session_id}", response_model=enrollment_schemas.EnrollmentSession)
+async def get_enrollment_session(
+        session_id: str,
+        current_user: User = Depends(deps.get_current_admin),
+        enrollment_service: EnrollmentService = Depends(get_enrollment_service)
+):
+    """Progreso y resultados por usuario de una sesión de enrolamiento (desde cualquier worker)"""
+    snapshot = await enrollment_service.get_snapshot(session_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Sesión de enrolamiento no encontrada")
+    return snapshot
+
+
 # @router.post("/verify")
 # async def verify_fingerprint(
 #         db: Session = Depends(deps.get_db)
@@ -48,7 +153,7 @@ async def register_fingerprint(
 #     """Verificar huella y registrar acceso"""
 #     try:
 #         template = await fingerprint_service.capture_current_fingerprint()
-#         result = await fingerprint_service.verify_fingerprint(db, template)
+#         result = await fingerprint_service.verify_fingerprint(db, template, device_id)
 #
 #         if result.get("is_valid"):
 #             # Registrar acceso exitoso
@@ -73,54 +178,77 @@ async def register_fingerprint(
 
 @router.post("/verify")
 async def verify_fingerprint(
-        db: Session = Depends(deps.get_db)
+        device_id: Optional[str] = Depends(admit_verification),
+        db: Session = Depends(deps.get_db),
+        fingerprint_service: FingerprintService = Depends(get_fingerprint_service),
+        access_log_writer: AccessLogWriter = Depends(get_access_log_writer),
+        heartbeats: DeviceHeartbeatTracker = Depends(get_device_heartbeats)
 ):
-    """Verificar huella y registrar acceso"""
+    """
+    Verificar huella y registrar acceso. Todo el trabajo síncrono (caché de
+    lectores, comparación, commit) va al threadpool dentro del turno de
+    admit_verification, así VERIFY_MAX_CONCURRENT acota la parte costosa
+    sin detener el event loop
+    """
+    # Metadatos del lector desde el caché: uno deshabilitado no verifica (en los
+    # demás workers, una vez vencido DEVICE_CACHE_TTL_SECONDS)
+    device = await run_in_threadpool(get_device_cache().info, db, device_id)
+    if device is not None and not device.is_active:
+        raise HTTPException(status_code=403, detail="Lector deshabilitado")
+
     try:
         template = await fingerprint_service.capture_current_fingerprint()
-        result = await fingerprint_service.verify_fingerprint(db, template)
-
-        if result.get("is_valid"):
-            # Registrar acceso exitoso
-            access_log = AccessLog(
-                user_id=result["user_id"],
-                access_type=result["access_type"],
-                status="success",
-                timestamp=datetime.now()
-            )
-            db.add(access_log)
-            db.commit()
-
-            return {
-                "status": "success",
-                "user_id": result["user_id"],
-                "access_type": result["access_type"]
-            }
-        else:
-            # Registrar intento fallido si hay un usuario_id
-            if "user_id" in result:
-                access_log = AccessLog(
-                    user_id=result["user_id"],
-                    access_type="entry",
-                    status="denied",
-                    reason="Usuario inactivo",
-                    timestamp=datetime.now()
-                )
-                db.add(access_log)
-                db.commit()
+        result = await fingerprint_service.verify_fingerprint(db, template, device_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-            raise HTTPException(
-                status_code=401,
-                detail=result.get("message", "Huella no reconocida")
-            )
+    # Sin autenticación no se dan de alta lectores: uno desconocido se guarda como NULL
+    device_pk = device.id if device is not None else None
+    if device_pk is not None:
+        # Una verificación también indica que el lector está en línea
+        heartbeats.beat(device_pk)
+    if result.get("is_valid"):
+        # Registrar acceso exitoso
+        granted_at = datetime.now(timezone.utc)
+        access_log = AccessLog(
+            user_id=result["user_id"],
+            access_type=result["access_type"],
+            status="success",
+            device_pk=device_pk,
+            timestamp=granted_at
+        )
+        db.add(access_log)
+        await run_in_threadpool(db.commit)
+
+        return {
+            "status": "success",
+            "user_id": result["user_id"],
+            "access_type": result["access_type"]
+        }
+
+    # Registrar el intento denegado (en lote, fuera de la respuesta)
+    reason = DenialReason.from_code(result.get("reason")) or DenialReason.NOT_RECOGNIZED
+    denied_at = datetime.now(timezone.utc)
+    access_log_writer.submit({
+        "user_id": result.get("user_id"),
+        "access_type": "entry",
+        "status": "denied",
+        "reason": int(reason),
+        "device_pk": device_pk,
+        "timestamp": denied_at,
+    })
+
+    raise HTTPException(
+        status_code=401,
+        detail=result.get("message", "Huella no reconocida")
+    )
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/verify-false/{user_id}")
 async def verify_fingerprint_false(
         user_id: int,
         db: Session = Depends(deps.get_db),
+        fingerprint_service: FingerprintService = Depends(get_fingerprint_service)
 ):
     """Verificar huella contra una incorrecta (para pruebas)"""
     is_valid = await fingerprint_service.verify_fingerprint_false(db, user_id)
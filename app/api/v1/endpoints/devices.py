@@ -0,0 +1,168 @@
+from typing import Any, List, Optional
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.core.config import get_settings
+from app.models.access_log import AccessLog
+from app.models.access_policy import door_group_device
+from app.models.device import Device
+from app.models.site import SiteDevice
+from app.models.user import User
+from app.schemas import device as device_schemas
+from app.services.access_policy import bump_policy_version
+from app.services.device_cache import get_device_cache
+from app.services.device_heartbeat import DeviceHeartbeatTracker, get_device_heartbeats
+from app.services.fingerprint_service import get_fingerprint_service
+
+router = APIRouter()
+
+settings = get_settings()
+
+
+def _as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devuelve fechas sin zona; se guardan en UTC
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def _device_out(device: Device, heartbeats: DeviceHeartbeatTracker) -> dict:
+    """Combina el último heartbeat escrito con el que aún está en memoria"""
+    seen = [s for s in (_as_utc(device.last_seen_at), heartbeats.last_seen(device.id)) if s is not None]
+    last_seen_at = max(seen) if seen else None
+    online = last_seen_at is not None and \
+        datetime.now(timezone.utc) - last_seen_at < timedelta(seconds=settings.DEVICE_OFFLINE_AFTER_SECONDS)
+    return {
+        "id": device.id,
+        "device_id": device.device_id,
+        "name": device.name,
+        "location": device.location,
+        "firmware_version": device.firmware_version,
+        "is_active": device.is_active,
+        "last_seen_at": last_seen_at,
+        "online": online,
+        "created_at": device.created_at,
+    }
+
+
+def _get_device(db: Session, device_id: str) -> Device:
+    device = db.query(Device).filter(Device.device_id == device_id).first()
+    if not device:
+        raise HTTPException(status_code=404, detail="Lector no encontrado")
+    return device
+
+
+@router.get("", response_model=List[device_schemas.Device])
+def list_devices(
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        heartbeats: DeviceHeartbeatTracker = Depends(get_device_heartbeats)
+) -> Any:
+    """
+    Listar lectores con su estado en línea
+    """
+    return [_device_out(d, heartbeats) for d in db.query(Device).order_by(Device.device_id)]
+
+
+@router.post("", response_model=device_schemas.Device)
+def create_device(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        heartbeats: DeviceHeartbeatTracker = Depends(get_device_heartbeats),
+        device_in: device_schemas.DeviceCreate
+) -> Any:
+    """
+    Registrar un lector
+    """
+    if db.query(Device.id).filter(Device.device_id == device_in.device_id).first():
+        raise HTTPException(status_code=400, detail="Ya existe un lector con ese identificador")
+    device = Device(**device_in.model_dump())
+    db.add(device)
+    db.commit()
+    db.refresh(device)
+    return _device_out(device, heartbeats)
+
+
+@router.get("/{device_id}", response_model=device_schemas.Device)
+def get_device(
+        device_id: str,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        heartbeats: DeviceHeartbeatTracker = Depends(get_device_heartbeats)
+) -> Any:
+    """
+    Obtener un lector
+    """
+    return _device_out(_get_device(db, device_id), heartbeats)
+
+
+@router.put("/{device_id}", response_model=device_schemas.Device)
+def update_device(
+        device_id: str,
+        device_in: device_schemas.DeviceUpdate,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        heartbeats: DeviceHeartbeatTracker = Depends(get_device_heartbeats)
+) -> Any:
+    """
+    Actualizar los datos de un lector (is_active=false le impide verificar huellas).
+    Este worker aplica el cambio al instante y los demás tras DEVICE_CACHE_TTL_SECONDS
+    """
+    device = _get_device(db, device_id)
+    for field, value in device_in.model_dump(exclude_unset=True).items():
+        setattr(device, field, value)
+    db.commit()
+    db.refresh(device)
+    get_device_cache().invalidate(device_id)
+    return _device_out(device, heartbeats)
+
+
+@router.delete("/{device_id}")
+def delete_device(
+        device_id: str,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Eliminar un lector sin registros de acceso; sale también de su sede y de sus grupos de puertas
+    """
+    device = _get_device(db, device_id)
+    if db.query(AccessLog.id).filter(AccessLog.device_pk == device.id).first():
+        raise HTTPException(
+            status_code=409,
+            detail="El lector tiene registros de acceso; desactívelo en lugar de eliminarlo"
+        )
+    # La FK lo haría en cascada; se borran aquí para saber qué cachés invalidar
+    in_site = db.query(SiteDevice).filter(SiteDevice.device_id == device_id).delete(synchronize_session=False)
+    in_groups = db.execute(delete(door_group_device).where(door_group_device.c.device_id == device_id)).rowcount
+    if in_groups:
+        bump_policy_version(db)
+    db.delete(device)
+    db.commit()
+    get_device_cache().forget(device_id)
+    if in_site:
+        get_fingerprint_service().template_index.invalidate()
+    if in_groups:
+        get_fingerprint_service().policy_engine.invalidate()
+    return {"message": "Lector eliminado"}
+
+
+@router.post("/{device_id}/heartbeat", response_model=device_schemas.DeviceHeartbeatAck)
+def device_heartbeat(
+        device_id: str,
+        heartbeat_in: Optional[device_schemas.DeviceHeartbeat] = None,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        heartbeats: DeviceHeartbeatTracker = Depends(get_device_heartbeats)
+) -> Any:
+    """
+    Heartbeat de un lector registrado: se guarda en memoria y se escribe en lote
+    """
+    info = get_device_cache().info(db, device_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Lector no encontrado")
+    received_at = heartbeats.beat(info.id, heartbeat_in.firmware_version if heartbeat_in else None)
+    return {"device_id": device_id, "received_at": received_at}
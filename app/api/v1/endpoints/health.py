@@ -0,0 +1,38 @@
+import time
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from app.core.config import get_settings
+from app.services.fingerprint_service import get_fingerprint_service
+from app.services.health import HealthChecker
+
+settings = get_settings()
+router = APIRouter()
+
+started_at = time.monotonic()
+health_checker = HealthChecker(
+    get_fingerprint_service,
+    cache_seconds=settings.HEALTH_CACHE_SECONDS,
+    template_index_max_age=settings.HEALTH_TEMPLATE_INDEX_MAX_AGE
+)
+
+
+@router.get("/live")
+async def liveness():
+    """
+    Liveness: el proceso responde. No consulta dependencias externas
+    para que una caída de la base de datos no provoque reinicios.
+    """
+    return {"status": "ok", "uptime_seconds": round(time.monotonic() - started_at, 1)}
+
+
+@router.get("/ready")
+async def readiness(request: Request):
+    """
+    Readiness: base de datos y pool, índice de templates y dispositivo.
+    Responde 503 si alguna comprobación falla o el worker aún no terminó el arranque.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting", "checks": {}})
+
+    result = await health_checker.readiness()
+    return JSONResponse(status_code=200 if result["status"] == "ok" else 503, content=result)
@@ -0,0 +1,126 @@
+import os
+import socket
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from app.api import deps
+from app.models.user import User
+from app.schemas import job as job_schemas
+from app.services.jobs import (
+    FINISHED_STATUSES, STATUS_SUCCEEDED, JobRunner, get_job_handlers, get_job_runner
+)
+
+router = APIRouter()
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+def _get_job(runner: JobRunner, job_id: str):
+    record = runner.store.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return record
+
+
+@router.get("/handlers", response_model=List[job_schemas.JobHandler])
+def list_job_handlers(
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Tipos de trabajo disponibles y sus parámetros
+    """
+    return [
+        {
+            "name": h.name,
+            "queue": h.queue,
+            "description": h.description,
+            "max_attempts": h.max_attempts,
+            "params_schema": h.params_model.model_json_schema() if h.params_model else None,
+        }
+        for h in get_job_handlers().values()
+    ]
+
+
+@router.post("", response_model=job_schemas.Job, status_code=202)
+def create_job(
+        job_in: job_schemas.JobCreate,
+        current_user: User = Depends(deps.get_current_admin),
+        runner: JobRunner = Depends(get_job_runner)
+) -> Any:
+    """
+    Encolar un trabajo; el avance se consulta con GET /jobs/{id}
+    """
+    try:
+        return runner.submit(job_in.name, job_in.params, created_by=current_user.id).as_dict()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("", response_model=List[job_schemas.Job])
+def list_jobs(
+        current_user: User = Depends(deps.get_current_admin),
+        runner: JobRunner = Depends(get_job_runner),
+        status: Optional[JobStatus] = Query(None),
+        queue: Optional[str] = Query(None),
+        limit: int = Query(100, ge=1, le=1000)
+) -> Any:
+    """
+    Listar trabajos, los más recientes primero
+    """
+    return [record.as_dict() for record in runner.store.list(status, queue, limit)]
+
+
+@router.get("/{job_id}", response_model=job_schemas.Job)
+def get_job(
+        job_id: str,
+        current_user: User = Depends(deps.get_current_admin),
+        runner: JobRunner = Depends(get_job_runner)
+) -> Any:
+    """
+    Estado y avance de un trabajo
+    """
+    return _get_job(runner, job_id).as_dict()
+
+
+@router.post("/{job_id}/cancel", response_model=job_schemas.Job)
+def cancel_job(
+        job_id: str,
+        current_user: User = Depends(deps.get_current_admin),
+        runner: JobRunner = Depends(get_job_runner)
+) -> Any:
+    """
+    Cancelar un trabajo: uno pendiente se cancela de inmediato, uno en curso
+    se detiene en su siguiente reporte de avance
+    """
+    if _get_job(runner, job_id).status in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail="El trabajo ya terminó")
+    return runner.cancel(job_id).as_dict()
+
+
+@router.get("/{job_id}/file")
+def download_job_file(
+        job_id: str,
+        current_user: User = Depends(deps.get_current_admin),
+        runner: JobRunner = Depends(get_job_runner)
+) -> Any:
+    """
+    Descargar el archivo generado por un trabajo terminado (p. ej. access_logs_pdf)
+    """
+    record = _get_job(runner, job_id)
+    result = record.result or {}
+    if record.status != STATUS_SUCCEEDED or "file" not in result:
+        raise HTTPException(status_code=409, detail="El trabajo no generó un archivo")
+    if not os.path.exists(result["file"]):
+        host = result.get("host")
+        if host and host != socket.gethostname():
+            # JOB_OUTPUT_DIR no es compartido: el archivo quedó en otro host
+            raise HTTPException(status_code=404, detail=f"El archivo se generó en el host {host}")
+        raise HTTPException(status_code=410, detail="El archivo ya no está disponible")
+    return FileResponse(
+        result["file"],
+        media_type=result.get("media_type", "application/octet-stream"),
+        filename=result.get("filename", os.path.basename(result["file"]))
+    )
@@ -0,0 +1,313 @@
+from typing import Any, List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.models.access_policy import (
+    AccessRule, DoorGroup, Holiday, Schedule, ScheduleWindow, UserAccessException,
+    door_group_device, user_access_rule
+)
+from app.models.device import Device
+from app.models.user import User
+from app.schemas import access_policy as policy_schemas
+from app.services.access_policy import bump_policy_version
+from app.services.fingerprint_service import get_fingerprint_service
+
+router = APIRouter()
+
+
+def _commit_policy_change(db: Session) -> None:
+    """Confirma el cambio y hace que los workers recompilen las políticas"""
+    bump_policy_version(db)
+    db.commit()
+    get_fingerprint_service().policy_engine.invalidate()
+
+
+def _require(db: Session, model, object_id: Optional[int], detail: str) -> None:
+    if object_id is not None and not db.query(model.id).filter(model.id == object_id).first():
+        raise HTTPException(status_code=404, detail=detail)
+
+
+def _door_group_out(db: Session, group: DoorGroup) -> dict:
+    devices = db.query(door_group_device.c.device_id) \
+        .filter(door_group_device.c.door_group_id == group.id) \
+        .order_by(door_group_device.c.device_id)
+    return {"id": group.id, "name": group.name, "device_ids": [d for (d,) in devices]}
+
+
+def _rule_out(db: Session, rule: AccessRule) -> dict:
+    users = db.query(user_access_rule.c.user_id) \
+        .filter(user_access_rule.c.rule_id == rule.id) \
+        .order_by(user_access_rule.c.user_id)
+    return {
+        "id": rule.id,
+        "name": rule.name,
+        "schedule_id": rule.schedule_id,
+        "door_group_id": rule.door_group_id,
+        "applies_to_all": rule.applies_to_all,
+        "user_ids": [u for (u,) in users],
+    }
+
+
+def _set_rule_users(db: Session, rule_id: int, user_ids: List[int]) -> None:
+    user_ids = sorted(set(user_ids))
+    if user_ids and db.query(User.id).filter(User.id.in_(user_ids)).count() != len(user_ids):
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    db.execute(delete(user_access_rule).where(user_access_rule.c.rule_id == rule_id))
+    if user_ids:
+        db.execute(insert(user_access_rule), [{"user_id": u, "rule_id": rule_id} for u in user_ids])
+
+
+@router.get("/schedules", response_model=List[policy_schemas.Schedule])
+def list_schedules(
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Listar horarios con sus franjas
+    """
+    return db.query(Schedule).order_by(Schedule.name).all()
+
+
+@router.post("/schedules", response_model=policy_schemas.Schedule)
+def create_schedule(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        schedule_in: policy_schemas.ScheduleCreate
+) -> Any:
+    """
+    Crear un horario (weekday 7 = festivos)
+    """
+    schedule = Schedule(
+        name=schedule_in.name,
+        windows=[ScheduleWindow(**w.model_dump()) for w in schedule_in.windows]
+    )
+    db.add(schedule)
+    _commit_policy_change(db)
+    db.refresh(schedule)
+    return schedule
+
+
+@router.get("/door-groups", response_model=List[policy_schemas.DoorGroup])
+def list_door_groups(
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Listar grupos de puertas con sus lectores
+    """
+    return [_door_group_out(db, g) for g in db.query(DoorGroup).order_by(DoorGroup.name)]
+
+
+@router.post("/door-groups", response_model=policy_schemas.DoorGroup)
+def create_door_group(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        group_in: policy_schemas.DoorGroupCreate
+) -> Any:
+    """
+    Crear un grupo de puertas
+    """
+    device_ids = sorted(set(group_in.device_ids))
+    registered = {d for (d,) in db.query(Device.device_id).filter(Device.device_id.in_(device_ids))}
+    unknown = [d for d in device_ids if d not in registered]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Lectores no registrados: {', '.join(unknown)}")
+    group = DoorGroup(name=group_in.name)
+    db.add(group)
+    db.flush()
+    if device_ids:
+        db.execute(insert(door_group_device), [{"door_group_id": group.id, "device_id": d} for d in device_ids])
+    _commit_policy_change(db)
+    return _door_group_out(db, group)
+
+
+@router.get("/rules", response_model=List[policy_schemas.AccessRule])
+def list_rules(
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Listar reglas de acceso
+    """
+    return [_rule_out(db, r) for r in db.query(AccessRule).order_by(AccessRule.name)]
+
+
+@router.post("/rules", response_model=policy_schemas.AccessRule)
+def create_rule(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        rule_in: policy_schemas.AccessRuleCreate
+) -> Any:
+    """
+    Crear una regla: horario y grupo de puertas permitidos para sus usuarios
+    """
+    _require(db, Schedule, rule_in.schedule_id, "Horario no encontrado")
+    _require(db, DoorGroup, rule_in.door_group_id, "Grupo de puertas no encontrado")
+    rule = AccessRule(
+        name=rule_in.name,
+        schedule_id=rule_in.schedule_id,
+        door_group_id=rule_in.door_group_id,
+        applies_to_all=rule_in.applies_to_all
+    )
+    db.add(rule)
+    db.flush()
+    _set_rule_users(db, rule.id, rule_in.user_ids)
+    _commit_policy_change(db)
+    return _rule_out(db, rule)
+
+
+@router.put("/rules/{rule_id}/users", response_model=policy_schemas.AccessRule)
+def set_rule_users(
+        rule_id: int,
+        users_in: policy_schemas.RuleUsersUpdate,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Reemplazar los usuarios asignados a una regla
+    """
+    rule = db.query(AccessRule).filter(AccessRule.id == rule_id).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Regla no encontrada")
+    _set_rule_users(db, rule.id, users_in.user_ids)
+    _commit_policy_change(db)
+    return _rule_out(db, rule)
+
+
+@router.delete("/rules/{rule_id}")
+def delete_rule(
+        rule_id: int,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Eliminar una regla
+    """
+    if not db.query(AccessRule).filter(AccessRule.id == rule_id).delete(synchronize_session=False):
+        raise HTTPException(status_code=404, detail="Regla no encontrada")
+    _commit_policy_change(db)
+    return {"message": "Regla eliminada"}
+
+
+@router.get("/holidays", response_model=List[policy_schemas.Holiday])
+def list_holidays(
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Listar festivos
+    """
+    return db.query(Holiday).order_by(Holiday.date).all()
+
+
+@router.post("/holidays", response_model=policy_schemas.Holiday)
+def create_holiday(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        holiday_in: policy_schemas.HolidayCreate
+) -> Any:
+    """
+    Registrar un festivo: ese día se aplican las franjas de weekday 7
+    """
+    if db.query(Holiday.id).filter(Holiday.date == holiday_in.date).first():
+        raise HTTPException(status_code=400, detail="Ya existe un festivo en esa fecha")
+    holiday = Holiday(date=holiday_in.date, name=holiday_in.name)
+    db.add(holiday)
+    _commit_policy_change(db)
+    db.refresh(holiday)
+    return holiday
+
+
+@router.delete("/holidays/{holiday_id}")
+def delete_holiday(
+        holiday_id: int,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Eliminar un festivo
+    """
+    if not db.query(Holiday).filter(Holiday.id == holiday_id).delete(synchronize_session=False):
+        raise HTTPException(status_code=404, detail="Festivo no encontrado")
+    _commit_policy_change(db)
+    return {"message": "Festivo eliminado"}
+
+
+@router.get("/exceptions", response_model=List[policy_schemas.UserAccessException])
+def list_exceptions(
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        user_id: Optional[int] = Query(None)
+) -> Any:
+    """
+    Listar excepciones por usuario
+    """
+    query = db.query(UserAccessException)
+    if user_id is not None:
+        query = query.filter(UserAccessException.user_id == user_id)
+    return query.order_by(UserAccessException.starts_at.desc()).all()
+
+
+@router.post("/exceptions", response_model=policy_schemas.UserAccessException)
+def create_exception(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        exception_in: policy_schemas.UserAccessExceptionCreate
+) -> Any:
+    """
+    Crear una excepción temporal (permitir o denegar) que prevalece sobre las reglas
+    """
+    _require(db, User, exception_in.user_id, "Usuario no encontrado")
+    _require(db, DoorGroup, exception_in.door_group_id, "Grupo de puertas no encontrado")
+    exception = UserAccessException(**exception_in.model_dump())
+    db.add(exception)
+    _commit_policy_change(db)
+    db.refresh(exception)
+    return exception
+
+
+@router.delete("/exceptions/{exception_id}")
+def delete_exception(
+        exception_id: int,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Eliminar una excepción
+    """
+    if not db.query(UserAccessException).filter(UserAccessException.id == exception_id) \
+            .delete(synchronize_session=False):
+        raise HTTPException(status_code=404, detail="Excepción no encontrada")
+    _commit_policy_change(db)
+    return {"message": "Excepción eliminada"}
+
+
+@router.get("/evaluate", response_model=policy_schemas.PolicyDecision)
+def evaluate_policy(
+        user_id: int,
+        device_id: Optional[str] = Query(None),
+        at: Optional[datetime] = Query(None, description="Por defecto, ahora"),
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Evaluar la política compilada para un usuario, lector y momento
+    """
+    engine = get_fingerprint_service().policy_engine
+    engine.ensure_fresh(db)
+    moment = at or datetime.now().astimezone()
+    decision = engine.decide(user_id, device_id, moment)
+    return {
+        "user_id": user_id,
+        "device_id": device_id,
+        "at": moment,
+        "allowed": decision.allowed,
+        "reason": decision.reason,
+    }
@@ -1,52 +1,126 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func
+from sqlalchemy import DateTime, func, text
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import List
+from zoneinfo import ZoneInfo
 
 from app.api import deps
+from app.core.responses import FastJSONResponse
+from app.core.timezones import day_boundaries
 from app.models.user import User
 from app.models.access_log import AccessLog
+from app.services.access_log_queries import REASON_CODE, apply_date_range
+from app.services.device_cache import get_device_cache
 
 router = APIRouter()
 
 
-@router.get("/daily")
+@router.get("/daily", response_class=FastJSONResponse)
 async def get_daily_report(
         start_date: date = Query(None),
         end_date: date = Query(None),
-        db: Session = Depends(deps.get_db),
-        current_user: User = Depends(deps.get_current_admin)
+        db: Session = Depends(deps.get_read_db),
+        current_user: User = Depends(deps.get_current_admin),
+        tz: ZoneInfo = Depends(deps.get_timezone)
 ):
     """
-    Reporte diario de accesos
+    Reporte diario de accesos, por día local de tz
     """
-    query = db.query(
-        func.date(AccessLog.timestamp).label('date'),
-        func.count().label('total_accesses'),
-        func.count(func.distinct(AccessLog.user_id)).label('unique_users')
-    )
+    if start_date is None or end_date is None:
+        first, last = apply_date_range(
+            db.query(func.min(AccessLog.timestamp), func.max(AccessLog.timestamp)), start_date, end_date, tz
+        ).one()
+        if first is None:
+            return []
+        start_date = start_date or first.astimezone(tz).date()
+        end_date = end_date or last.astimezone(tz).date()
+    if end_date < start_date:
+        return []
 
-    if start_date:
-        query = query.filter(func.date(AccessLog.timestamp) >= start_date)
-    if end_date:
-        query = query.filter(func.date(AccessLog.timestamp) <= end_date)
+    # Cada día es un rango [inicio, fin) en UTC calculado aquí (con DST);
+    # width_bucket ubica el timestamp por búsqueda binaria sobre los límites
+    # y el filtro por rango sigue usando el índice
+    boundaries = day_boundaries(start_date, end_date, tz)
+    bucket = func.width_bucket(
+        AccessLog.timestamp, postgresql.array(boundaries, type_=DateTime(timezone=True))
+    ).label('bucket')
+    rows = apply_date_range(
+        db.query(
+            bucket,
+            func.count().label('total_accesses'),
+            func.count(func.distinct(AccessLog.user_id)).label('unique_users')
+        ),
+        start_date, end_date, tz
+    ).group_by(text('bucket')).order_by(text('bucket')).all()
 
-    return query.group_by(func.date(AccessLog.timestamp)).all()
+    return [
+        {
+            "date": start_date + timedelta(days=row.bucket - 1),
+            "total_accesses": row.total_accesses,
+            "unique_users": row.unique_users,
+        }
+        for row in rows
+    ]
 
 
-@router.get("/user-stats")
+@router.get("/user-stats", response_class=FastJSONResponse)
 async def get_user_stats(
-        db: Session = Depends(deps.get_db),
+        db: Session = Depends(deps.get_read_db),
         current_user: User = Depends(deps.get_current_admin)
 ):
     """
     Estadísticas por usuario
     """
-    return db.query(
+    rows = db.query(
         User.id,
         User.full_name,
         func.count(AccessLog.id).label('total_accesses'),
         func.min(AccessLog.timestamp).label('first_access'),
         func.max(AccessLog.timestamp).label('last_access')
     ).join(AccessLog).group_by(User.id).all()
+    return [row._asdict() for row in rows]
+
+
+@router.get("/denials/devices", response_class=FastJSONResponse)
+def get_denial_rate_by_device(
+        start_date: date = Query(None),
+        end_date: date = Query(None),
+        db: Session = Depends(deps.get_read_db),
+        current_user: User = Depends(deps.get_current_admin),
+        tz: ZoneInfo = Depends(deps.get_timezone)
+):
+    """
+    Tasa de denegación por dispositivo, con el desglose por motivo.
+    Ambas consultas filtran por (status, timestamp) y usan ese índice
+    """
+    totals = apply_date_range(
+        db.query(AccessLog.device_pk, AccessLog.status, func.count().label("count"))
+        .filter(AccessLog.status.in_(("success", "denied"))),
+        start_date, end_date, tz
+    ).group_by(AccessLog.device_pk, AccessLog.status)
+
+    reasons = apply_date_range(
+        db.query(AccessLog.device_pk, REASON_CODE, func.count().label("count"))
+        .filter(AccessLog.status == "denied"),
+        start_date, end_date, tz
+    ).group_by(AccessLog.device_pk, AccessLog.reason)
+
+    device_cache = get_device_cache()
+    devices = {}
+    for device_pk, status, count in totals:
+        if device_pk not in devices:
+            devices[device_pk] = {**device_cache.summary(db, device_pk), "total": 0, "denied": 0, "reasons": {}}
+        stats = devices[device_pk]
+        stats["total"] += count
+        if status == "denied":
+            stats["denied"] = count
+    for device_pk, reason, count in reasons:
+        devices[device_pk]["reasons"][reason or "unknown"] = count
+
+    report = list(devices.values())
+    for stats in report:
+        stats["denial_rate"] = round(stats["denied"] / stats["total"], 4) if stats["total"] else 0.0
+    report.sort(key=lambda stats: stats["denial_rate"], reverse=True)
+    return report
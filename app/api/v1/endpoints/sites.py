@@ -0,0 +1,121 @@
+from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.sql import func
+from app.api import deps
+from app.models.device import Device
+from app.models.site import Site, SiteDevice
+from app.models.user import User
+from app.schemas import site as site_schemas
+from app.services.fingerprint_service import get_fingerprint_service
+
+router = APIRouter()
+
+
+def _get_site(db: Session, site_id: int) -> Site:
+    site = db.query(Site).filter(Site.id == site_id).first()
+    if not site:
+        raise HTTPException(status_code=404, detail="Sede no encontrada")
+    return site
+
+
+@router.get("", response_model=List[site_schemas.Site])
+def list_sites(
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Listar sedes con sus lectores asignados
+    """
+    return db.query(Site).options(selectinload(Site.devices)).order_by(Site.code).all()
+
+
+@router.post("", response_model=site_schemas.Site)
+def create_site(
+        *,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin),
+        site_in: site_schemas.SiteCreate
+) -> Any:
+    """
+    Crear una sede
+    """
+    if db.query(Site.id).filter(Site.code == site_in.code).first():
+        raise HTTPException(status_code=400, detail="Ya existe una sede con ese código")
+    site = Site(code=site_in.code, name=site_in.name, timezone=site_in.timezone)
+    db.add(site)
+    db.commit()
+    db.refresh(site)
+    return site
+
+
+@router.put("/{site_id}/devices/{device_id}", response_model=site_schemas.Site)
+def assign_device(
+        site_id: int,
+        device_id: str,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Asignar un lector a la sede: solo comparará contra sus usuarios y los globales
+    """
+    site = _get_site(db, site_id)
+    if not db.query(Device.id).filter(Device.device_id == device_id).first():
+        raise HTTPException(status_code=404, detail="Lector no registrado")
+    device = db.query(SiteDevice).filter(SiteDevice.device_id == device_id).first()
+    if device:
+        device.site_id = site.id
+    else:
+        db.add(SiteDevice(device_id=device_id, site_id=site.id))
+    db.commit()
+    db.refresh(site)
+    get_fingerprint_service().template_index.invalidate()
+    return site
+
+
+@router.delete("/{site_id}/devices/{device_id}", response_model=site_schemas.Site)
+def unassign_device(
+        site_id: int,
+        device_id: str,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Quitar un lector de la sede
+    """
+    site = _get_site(db, site_id)
+    deleted = db.query(SiteDevice) \
+        .filter(SiteDevice.site_id == site.id, SiteDevice.device_id == device_id) \
+        .delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="El lector no está asignado a esta sede")
+    db.commit()
+    db.refresh(site)
+    get_fingerprint_service().template_index.invalidate()
+    return site
+
+
+@router.put("/users/{user_id}", response_model=List[site_schemas.Site])
+def set_user_sites(
+        user_id: int,
+        sites_in: site_schemas.UserSitesUpdate,
+        db: Session = Depends(deps.get_db),
+        current_user: User = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    Definir las sedes de un usuario (lista vacía: válido en todas)
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    site_ids = set(sites_in.site_ids)
+    sites = db.query(Site).filter(Site.id.in_(site_ids)).all() if site_ids else []
+    if len(sites) != len(site_ids):
+        raise HTTPException(status_code=404, detail="Sede no encontrada")
+
+    user.sites = sites
+    # Cambia la firma de la galería para que todos los workers recarguen
+    user.updated_at = func.now()
+    db.commit()
+    get_fingerprint_service().template_index.invalidate()
+    return sites
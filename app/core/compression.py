@@ -0,0 +1,188 @@
+"""
+Middleware ASGI de compresión de respuestas (gzip y, si está instalado, brotli).
+
+Solo comprime respuestas cuyo Content-Type está en la lista permitida y que
+superan un tamaño mínimo. Las respuestas en streaming (more_body=True) se
+comprimen por fragmentos con flush en cada uno, de modo que el cliente sigue
+recibiendo datos de forma incremental.
+"""
+import gzip
+import zlib
+from typing import Iterable, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se ofrece gzip
+    brotli = None
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self._level = level
+        # wbits=31: formato gzip (cabecera + CRC) sobre zlib
+        self._stream = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress_all(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=self._level)
+
+    def compress_chunk(self, data: bytes) -> bytes:
+        return self._stream.compress(data) + self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._stream.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int):
+        self._quality = quality
+        self._stream = brotli.Compressor(quality=quality)
+
+    def compress_all(self, data: bytes) -> bytes:
+        return brotli.compress(data, quality=self._quality)
+
+    def compress_chunk(self, data: bytes) -> bytes:
+        return self._stream.process(data) + self._stream.flush()
+
+    def finish(self) -> bytes:
+        return self._stream.finish()
+
+
+def _accepted_encodings(headers: Headers) -> set:
+    """Codificaciones aceptadas por el cliente (ignora las de q=0)"""
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = 1024,
+            gzip_level: int = 6,
+            brotli_quality: int = 4,
+            content_types: Iterable[str] = ("application/json", "text/")
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # Entradas terminadas en "/" se tratan como prefijo (p. ej. "text/")
+        self.content_types: Tuple[str, ...] = tuple(ct.lower() for ct in content_types)
+
+    def _select_encoder(self, headers: Headers):
+        accepted = _accepted_encodings(headers)
+        if brotli is not None and "br" in accepted:
+            return _BrotliEncoder(self.brotli_quality)
+        if "gzip" in accepted or "*" in accepted:
+            return _GzipEncoder(self.gzip_level)
+        return None
+
+    def _is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if not content_type:
+            return False
+        return any(
+            content_type.startswith(allowed) if allowed.endswith("/") else content_type == allowed
+            for allowed in self.content_types
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoder = self._select_encoder(Headers(scope=scope))
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoder, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoder, send: Send):
+        self.middleware = middleware
+        self.encoder = encoder
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        # None: aún no decidido; True/False una vez visto el primer cuerpo
+        self.compressing: Optional[bool] = None
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            return
+
+        if message_type != "http.response.body":
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressing is None:
+            headers = Headers(raw=self.start_message["headers"])
+            streaming = more_body
+            self.compressing = self.middleware._is_compressible(headers) and (
+                streaming or len(body) >= self.middleware.minimum_size
+            )
+            if not self.compressing:
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+
+            response_headers = MutableHeaders(raw=self.start_message["headers"])
+            response_headers["Content-Encoding"] = self.encoder.name
+            response_headers.add_vary_header("Accept-Encoding")
+
+            if not streaming:
+                # Respuesta completa: se comprime de una vez con Content-Length exacto
+                compressed = self.encoder.compress_all(body)
+                response_headers["Content-Length"] = str(len(compressed))
+                await self.downstream(self.start_message)
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming: la longitud final no se conoce de antemano
+            del response_headers["Content-Length"]
+            await self.downstream(self.start_message)
+            await self.downstream({
+                "type": "http.response.body",
+                "body": self.encoder.compress_chunk(body),
+                "more_body": True
+            })
+            return
+
+        if not self.compressing:
+            await self.downstream(message)
+            return
+
+        if more_body:
+            await self.downstream({
+                "type": "http.response.body",
+                "body": self.encoder.compress_chunk(body),
+                "more_body": True
+            })
+        else:
+            await self.downstream({
+                "type": "http.response.body",
+                "body": self.encoder.compress_chunk(body) + self.encoder.finish()
+                if body else self.encoder.finish()
+            })
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -11,15 +12,178 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     DATABASE_URL: str
 
+    # Pool de conexiones (por worker)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_WARMUP_CONNECTIONS: int = 2
+
+    # Réplicas de lectura para reportes, exportaciones e historiales (vacío = solo primario).
+    # Su usuario necesita pg_read_all_stats (o pg_monitor) para verificar el streaming
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_POOL_SIZE: int = 5
+    DB_REPLICA_CONNECT_TIMEOUT: int = 2
+    # Retraso de replicación tolerado antes de volver al primario
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30.0
+    DB_REPLICA_CHECK_SECONDS: float = 10.0
+
     # JWT
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # Con RS*/ES*/EdDSA: claves PEM (la pública se deriva de la privada si se omite)
+    JWT_PRIVATE_KEY_PATH: Optional[str] = None
+    JWT_PUBLIC_KEY_PATH: Optional[str] = None
+    # Revocación por jti (logout); Redis la comparte entre workers y es
+    # obligatorio con WEB_CONCURRENCY > 1. Si no responde, los tokens se
+    # rechazan con 503 en lugar de aceptarse sin comprobar
+    TOKEN_DENYLIST_MAX_ENTRIES: int = 100000
+    TOKEN_DENYLIST_REDIS_URL: Optional[str] = None
+
+    # Política de hashing de contraseñas ("bcrypt" o "argon2", este último
+    # requiere argon2-cffi). Calibrar con scripts/calibrate_password_hash.py
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+
+    # Throttling de /auth/login: fallos permitidos por cuenta y por IP antes
+    # del retroceso exponencial, y duración mínima de una respuesta fallida
+    LOGIN_MAX_FAILURES_PER_ACCOUNT: int = 5
+    LOGIN_MAX_FAILURES_PER_IP: int = 20
+    LOGIN_BACKOFF_BASE_SECONDS: float = 1.0
+    LOGIN_BACKOFF_MAX_SECONDS: float = 900.0
+    LOGIN_FAILURE_WINDOW_SECONDS: float = 900.0
+    LOGIN_FAILURE_MIN_SECONDS: float = 0.4
 
     ZKTECO_IP: str
     ZKTECO_PORT: int
 
     FINGERPRINT_ENCRYPTION_KEY: str
+    # Códigos de sede cuyas huellas carga este worker (vacío = todas)
+    TEMPLATE_INDEX_SITES: List[str] = []
+    # Intervalo para comprobar si el índice de templates en memoria está al día
+    TEMPLATE_INDEX_REFRESH_SECONDS: float = 5.0
+
+    # Zona horaria local por defecto (horarios, festivos y días de reportes;
+    # una sede puede tener la suya y las consultas aceptan ?tz=)
+    TIMEZONE: str = "America/Bogota"
+
+    # Políticas de acceso: tamaño de franja, decisión para usuarios sin
+    # reglas y frecuencia de comprobación de cambios
+    ACCESS_POLICY_SLOT_MINUTES: int = 15
+    ACCESS_POLICY_DEFAULT_ALLOW: bool = True
+    ACCESS_POLICY_REFRESH_SECONDS: float = 10.0
+
+    # Enrolamiento: calidad mínima (0-100) y sesiones en lote retenidas en memoria por worker
+    # (el progreso se guarda además en enrollment_session)
+    ENROLLMENT_MIN_QUALITY: int = 40
+    ENROLLMENT_MAX_SESSIONS: int = 50
+
+    # Escritura en lote de accesos denegados
+    ACCESS_LOG_WRITER_MAX_BATCH: int = 500
+    ACCESS_LOG_WRITER_FLUSH_SECONDS: float = 1.0
+    ACCESS_LOG_WRITER_MAX_PENDING: int = 50000
+    # Intentos seguidos de un lote ante errores transitorios antes de descartarlo
+    ACCESS_LOG_WRITER_MAX_RETRIES: int = 30
+
+    # Registro de lectores: metadatos en memoria y heartbeats escritos en lote.
+    # Un cambio (p. ej. is_active) llega a los demás workers tras el TTL
+    DEVICE_CACHE_TTL_SECONDS: float = 30.0
+    DEVICE_HEARTBEAT_FLUSH_SECONDS: float = 15.0
+    # Sin heartbeat en este intervalo el lector se reporta fuera de línea
+    DEVICE_OFFLINE_AFTER_SECONDS: int = 120
+
+    # Detección de anomalías sobre los accesos (ventanas en memoria)
+    ANOMALY_TRAVEL_SECONDS: int = 300
+    ANOMALY_DENIAL_BURST_COUNT: int = 5
+    ANOMALY_DENIAL_BURST_SECONDS: int = 60
+    ANOMALY_WORKDAY_START_HOUR: int = 6
+    ANOMALY_WORKDAY_END_HOUR: int = 20
+    ANOMALY_SESSION_HOURS: int = 16
+    ANOMALY_USER_HISTORY: int = 8
+    ANOMALY_MAX_ALERTS: int = 1000
+    # Lectores con ventana de denegaciones en memoria (se descarta el menos reciente)
+    ANOMALY_MAX_DEVICES: int = 10000
+
+    # Trabajos en segundo plano: "database" (tabla job, compartida por los workers)
+    # o "memory" (por proceso, solo con un worker)
+    JOB_STORE: str = "database"
+    # Cola -> trabajos simultáneos por worker
+    JOB_QUEUES: Dict[str, int] = {"default": 1, "exports": 1, "maintenance": 1}
+    JOB_POLL_SECONDS: float = 2.0
+    JOB_RETRY_BACKOFF_SECONDS: float = 30.0
+    JOB_SHUTDOWN_SECONDS: float = 10.0
+    JOB_STALE_SECONDS: float = 600.0
+    JOB_MAX_FINISHED: int = 500
+    # Archivos generados por los trabajos; con varios hosts debe ser un volumen
+    # compartido (NFS, EFS...), si no la descarga solo funciona en el host que lo generó
+    JOB_OUTPUT_DIR: str = "/tmp/biometric-jobs"
+
+    # Exportación columnar / archivo de access_log (app.services.access_archive)
+    ACCESS_ARCHIVE_DIR: str = "archive/access_log"
+    # Filas por lote del cursor y por row group
+    ARCHIVE_BATCH_ROWS: int = 50000
+
+    # Feed incremental de access_log (/access/admin/feed)
+    ACCESS_FEED_POLL_SECONDS: float = 0.5
+    # Espera mínima antes de entregar un id; en Postgres además se espera a que
+    # terminen las transacciones que estaban en curso (ver app.services.access_feed).
+    # Esa espera usa el xmin de todo el cluster: una transacción larga en cualquier
+    # tabla o una sesión "idle in transaction" detiene el feed mientras siga abierta
+    # (conviene acotarlas con idle_in_transaction_session_timeout)
+    ACCESS_FEED_SETTLE_SECONDS: float = 1.0
+    # Segundos con el horizonte bloqueado antes de registrar una advertencia
+    ACCESS_FEED_STALL_WARNING_SECONDS: float = 60.0
+    ACCESS_FEED_MAX_WAIT_SECONDS: float = 30.0
+    ACCESS_FEED_MAX_LIMIT: int = 5000
+
+    # Ingesta en lote de eventos de lectores sin conexión
+    ACCESS_INGEST_MAX_EVENTS: int = 10000
+
+    # Limitación de /biometric/verify: token bucket por dispositivo y por IP,
+    # tope de verificaciones simultáneas y cola con espera máxima.
+    # RATE_LIMIT_REDIS_URL comparte los buckets entre workers (requiere redis)
+    VERIFY_RATE_PER_DEVICE: float = 2.0
+    VERIFY_BURST_PER_DEVICE: int = 5
+    VERIFY_RATE_PER_IP: float = 5.0
+    VERIFY_BURST_PER_IP: int = 10
+    VERIFY_MAX_CONCURRENT: int = 8
+    VERIFY_MAX_QUEUED: int = 32
+    VERIFY_QUEUE_TIMEOUT: float = 2.0
+    # Rechaza /verify sin device_id o con un lector que no está en el registro
+    VERIFY_REQUIRE_REGISTERED_DEVICE: bool = True
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+
+    # Sondas /health: caché del resultado y antigüedad máxima del índice
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_TEMPLATE_INDEX_MAX_AGE: float = 60.0
+
+    # Serialización en bloque (TypeAdapter) para listados grandes
+    FAST_JSON_RESPONSES: bool = True
+
+    # Compresión de respuestas (gzip; brotli si está instalado)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_CONTENT_TYPES: List[str] = [
+        "application/json",
+        "text/",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+    ]
+
+    # Recursos estáticos (app/static). FAVICON_URL es opcional: si no se
+    # define, se sirve el favicon empaquetado sin salir a la red
+    STATIC_MAX_AGE: int = 86400
+    FAVICON_URL: Optional[str] = None
+    STATIC_REMOTE_TIMEOUT: float = 3.0
+    STATIC_REMOTE_TTL: int = 3600
+    STATIC_REMOTE_NEGATIVE_TTL: int = 60
 
     model_config = SettingsConfigDict(env_file='.env')
 
@@ -0,0 +1,70 @@
+"""
+Contadores de fallos de login con retroceso exponencial.
+
+Cada clave (cuenta o IP) admite max_failures fallos dentro de la ventana;
+a partir de ahí queda bloqueada base_delay * 2^n segundos (hasta max_delay).
+La estructura está acotada a max_keys entradas (se descartan las menos
+recientes), así que un ataque con muchas claves distintas no agota memoria.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class _FailureState:
+    __slots__ = ("failures", "last_failure", "locked_until")
+
+    def __init__(self):
+        self.failures = 0
+        self.last_failure = 0.0
+        self.locked_until = 0.0
+
+
+class LoginThrottle:
+    def __init__(
+            self,
+            max_failures: int,
+            base_delay: float = 1.0,
+            max_delay: float = 900.0,
+            window: float = 900.0,
+            max_keys: int = 50000
+    ):
+        self._max_failures = max_failures
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._window = window
+        self._max_keys = max_keys
+        self._states: "OrderedDict[str, _FailureState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retry_after(self, key: str) -> float:
+        """Segundos que faltan para admitir otro intento (0 si está permitido)"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return 0.0
+            if now - state.last_failure > self._window and now >= state.locked_until:
+                del self._states[key]
+                return 0.0
+            return max(0.0, state.locked_until - now)
+
+    def record_failure(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.pop(key, None)
+            if state is None or now - state.last_failure > self._window:
+                state = _FailureState()
+            state.failures += 1
+            state.last_failure = now
+            excess = state.failures - self._max_failures
+            if excess > 0:
+                delay = min(self._max_delay, self._base_delay * (2 ** min(excess - 1, 32)))
+                state.locked_until = now + delay
+            self._states[key] = state
+            while len(self._states) > self._max_keys:
+                self._states.popitem(last=False)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._states.pop(key, None)
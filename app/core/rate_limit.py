@@ -0,0 +1,128 @@
+"""
+Limitación de tasa (token bucket) y control de admisión por concurrencia.
+
+- TokenBucketLimiter: buckets en memoria del proceso, con un número máximo de
+  claves (se descartan las menos usadas recientemente).
+- RedisTokenBucketLimiter: mismo algoritmo en Redis (script Lua atómico) para
+  compartir los límites entre workers; si Redis falla se usa el limitador local.
+- AdmissionController: tope global de peticiones concurrentes con una cola
+  acotada y tiempo máximo de espera.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self._max_keys = max_keys
+        # clave -> (tokens, último instante de recarga)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def acquire(self, key: str) -> Tuple[bool, float]:
+        """Consume un token. Retorna (permitido, segundos hasta el próximo token)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                allowed, retry_after = True, 0.0
+                tokens -= 1
+            else:
+                allowed, retry_after = False, (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(retry)}
+"""
+
+
+class RedisTokenBucketLimiter:
+    def __init__(self, url: str, rate: float, burst: int, prefix: str = "ratelimit"):
+        # redis es opcional: solo se importa si se configura un almacén compartido
+        import redis.asyncio as redis
+
+        self.rate = rate
+        self.burst = burst
+        self._prefix = prefix
+        self._client = redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+        self._fallback = TokenBucketLimiter(rate, burst)
+
+    async def acquire(self, key: str) -> Tuple[bool, float]:
+        try:
+            allowed, retry_after = await self._script(
+                keys=[f"{self._prefix}:{key}"], args=[self.rate, self.burst]
+            )
+            return bool(int(allowed)), float(retry_after)
+        except Exception as e:
+            logger.warning(f"Almacén de rate limit no disponible, se usa el local: {e}")
+            return await self._fallback.acquire(key)
+
+
+def build_limiter(rate: float, burst: int, redis_url: Optional[str] = None, prefix: str = "ratelimit"):
+    """Limitador compartido si hay URL de Redis; en memoria en otro caso"""
+    if redis_url:
+        return RedisTokenBucketLimiter(redis_url, rate, burst, prefix=prefix)
+    return TokenBucketLimiter(rate, burst)
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, queue_timeout: float, max_queued: int):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._queue_timeout = queue_timeout
+        self._capacity = max_concurrent + max_queued
+        # Peticiones en ejecución más las que esperan turno
+        self._pending = 0
+
+    async def acquire(self) -> None:
+        """Obtiene un turno o lanza AdmissionRejected si la cola está llena o expira"""
+        if self._pending >= self._capacity:
+            raise AdmissionRejected("Cola de admisión llena")
+        self._pending += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            self._pending -= 1
+            raise AdmissionRejected("Tiempo de espera en cola agotado")
+        except BaseException:
+            self._pending -= 1
+            raise
+
+    def release(self) -> None:
+        self._pending -= 1
+        self._semaphore.release()
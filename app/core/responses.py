@@ -0,0 +1,51 @@
+"""
+Rutas de serialización rápida para respuestas grandes.
+
+- FastJSONResponse: JSONResponse que codifica con orjson (dependencia fija).
+  Las rutas que la retornan ya construida (p. ej. el feed) no pasan por la
+  validación de response_model, que en ellas solo documenta la respuesta.
+- RowListSerializer: serializa en bloque listas de filas (dicts) con un
+  TypeAdapter sobre un TypedDict, sin construir un modelo Pydantic por fila.
+  El formato (fechas UTC con "Z") es el mismo de la serialización estándar
+  de FastAPI, así que el resultado no depende de FAST_JSON_RESPONSES.
+
+Las filas de RowListSerializer no se validan: las arman las consultas
+proyectadas de app.services.access_log_queries con los tipos del TypedDict.
+"""
+from typing import Any, Generic, Iterable, List, Type, TypeVar
+from fastapi.responses import JSONResponse, Response
+import orjson
+from pydantic import TypeAdapter
+from app.core.config import get_settings
+
+
+settings = get_settings()
+
+RowT = TypeVar("RowT")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        # OPT_UTC_Z: fechas UTC con "Z", igual que Pydantic
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class RowListSerializer(Generic[RowT]):
+    """Serializador en bloque de listas de filas tipadas con un TypedDict"""
+
+    def __init__(self, row_type: Type[RowT]):
+        self._adapter = TypeAdapter(List[row_type])
+
+    def dump(self, rows: Iterable[RowT]) -> bytes:
+        return self._adapter.dump_json(list(rows))
+
+    def response(self, rows: List[RowT]) -> Any:
+        """
+        Retorna la lista ya serializada, o las filas sin serializar si
+        FAST_JSON_RESPONSES está desactivado (validación estándar de FastAPI)
+        """
+        if not settings.FAST_JSON_RESPONSES:
+            return rows
+        return Response(content=self.dump(rows), media_type="application/json")
@@ -1,13 +1,55 @@
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import jwt
+from datetime import timedelta
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 from app.core.config import get_settings
+from app.core.tokens import get_token_service
 from cryptography.fernet import Fernet
 from base64 import b64encode, b64decode
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def build_password_context(
+        scheme: str = "bcrypt",
+        bcrypt_rounds: int = 12,
+        argon2_time_cost: int = 3,
+        argon2_memory_cost: int = 65536,
+        argon2_parallelism: int = 4
+) -> CryptContext:
+    """
+    Política de hashing: el esquema y costo configurados son los vigentes;
+    los hashes con otro esquema u otro costo (mayor o menor, p. ej. tras
+    recalibrar PASSWORD_BCRYPT_ROUNDS) se consideran obsoletos y
+    verify_and_update los regenera al verificar.
+    """
+    schemes = ["bcrypt"]
+    try:
+        import argon2  # noqa: F401  argon2-cffi es opcional
+        schemes.insert(0, "argon2")
+    except ImportError:
+        if scheme == "argon2":
+            raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 requiere el paquete argon2-cffi")
+
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_password_context(
+    scheme=settings.PASSWORD_HASH_SCHEME,
+    bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+    argon2_memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+)
 
 
 # Verifica si una contraseña coincide con su hash
@@ -20,20 +62,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+_dummy_hash: Optional[str] = None
+
+
+# Verifica la contraseña gastando el mismo trabajo aunque el usuario no exista,
+# para que el tiempo de respuesta no revele qué cuentas están registradas.
+# Retorna (válida, nuevo_hash); nuevo_hash no es None si el hash almacenado
+# usa un esquema o costo obsoleto y debe reemplazarse
+def verify_password_or_dummy(
+        plain_password: str,
+        hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    global _dummy_hash
+    if hashed_password:
+        try:
+            return pwd_context.verify_and_update(plain_password, hashed_password)
+        except ValueError:
+            # Hash almacenado no reconocible: se trata como credencial inválida
+            pass
+    if _dummy_hash is None:
+        _dummy_hash = get_password_hash("dummy-password-for-timing")
+    verify_password(plain_password, _dummy_hash)
+    return False, None
+
+
 #  Crea un token JWT para autenticación
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+    return get_token_service().create(data, expires_delta)
 
 
 def get_encryption_key():
@@ -0,0 +1,136 @@
+"""
+Servicio de recursos estáticos (favicon, etc.) desde memoria.
+
+Los recursos empaquetados en app/static se cargan una sola vez por proceso y
+se sirven con ETag y Cache-Control. Si se configura una URL remota para un
+recurso, se descarga con un cliente HTTP compartido (pool de conexiones y
+timeouts) y tanto los aciertos como los fallos se cachean con expiración;
+mientras tanto se sirve la copia empaquetada.
+"""
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from fastapi import Request
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+
+class StaticAsset:
+    def __init__(self, content: bytes, media_type: str):
+        self.content = content
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+class _RemoteEntry:
+    def __init__(self, asset: Optional[StaticAsset], expires_at: float):
+        self.asset = asset
+        self.expires_at = expires_at
+
+
+class StaticAssetStore:
+    def __init__(
+            self,
+            static_dir: Path = STATIC_DIR,
+            max_age: int = 86400,
+            remote_ttl: int = 3600,
+            remote_negative_ttl: int = 60,
+            remote_timeout: float = 3.0
+    ):
+        self._static_dir = static_dir
+        self._max_age = max_age
+        self._remote_ttl = remote_ttl
+        self._remote_negative_ttl = remote_negative_ttl
+        self._remote_timeout = remote_timeout
+        self._local: Dict[str, Optional[StaticAsset]] = {}
+        self._remote: Dict[str, _RemoteEntry] = {}
+        self._remote_locks: Dict[str, asyncio.Lock] = {}
+        # httpx se importa solo si se configura una fuente remota
+        self._client = None
+
+    def local(self, name: str) -> Optional[StaticAsset]:
+        """Recurso empaquetado, leído del disco una sola vez"""
+        if name not in self._local:
+            path = (self._static_dir / name).resolve()
+            if path.parent != self._static_dir or not path.is_file():
+                self._local[name] = None
+            else:
+                media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                self._local[name] = StaticAsset(path.read_bytes(), media_type)
+        return self._local[name]
+
+    def _get_client(self):
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self._remote_timeout),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+                follow_redirects=True
+            )
+        return self._client
+
+    async def remote(self, url: str) -> Optional[StaticAsset]:
+        """
+        Recurso remoto cacheado. Los fallos también se cachean, pero solo
+        durante remote_negative_ttl segundos.
+        """
+        entry = self._remote.get(url)
+        if entry and entry.expires_at > time.monotonic():
+            return entry.asset
+
+        lock = self._remote_locks.setdefault(url, asyncio.Lock())
+        async with lock:
+            # Otra corrutina pudo completar la descarga mientras esperábamos
+            entry = self._remote.get(url)
+            if entry and entry.expires_at > time.monotonic():
+                return entry.asset
+
+            import httpx
+
+            asset = None
+            try:
+                response = await self._get_client().get(url)
+                if response.status_code == 200 and response.content:
+                    media_type = response.headers.get("content-type", "application/octet-stream")
+                    asset = StaticAsset(response.content, media_type.split(";")[0])
+                else:
+                    logger.warning(f"Recurso remoto {url} respondió {response.status_code}")
+            except httpx.HTTPError as e:
+                logger.warning(f"No se pudo descargar el recurso remoto {url}: {e}")
+
+            ttl = self._remote_ttl if asset else self._remote_negative_ttl
+            self._remote[url] = _RemoteEntry(asset, time.monotonic() + ttl)
+            return asset
+
+    async def resolve(self, name: str, remote_url: Optional[str] = None) -> Optional[StaticAsset]:
+        """Recurso remoto si está configurado y disponible; si no, el empaquetado"""
+        if remote_url:
+            asset = await self.remote(remote_url)
+            if asset:
+                return asset
+        return self.local(name)
+
+    def response(self, request: Request, asset: Optional[StaticAsset]) -> Response:
+        if asset is None:
+            return Response(status_code=404)
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": f"public, max-age={self._max_age}",
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        if asset.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=asset.content, media_type=asset.media_type, headers=headers)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,50 @@
+"""
+Zonas horarias de reportes y filtros.
+
+La base de datos trabaja en UTC (timestamptz) y las conexiones no fijan
+zona. Un día local se traduce aquí a su rango [inicio, fin) en UTC y es
+ese rango el que se compara con AccessLog.timestamp, así los filtros usan
+los índices y no dependen de la zona del servidor de la app ni de la base.
+La zona sale de la petición (?tz=, ?tz_site=) o de TIMEZONE.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+@lru_cache(maxsize=64)
+def get_zone(name: Optional[str] = None) -> ZoneInfo:
+    """ZoneInfo de un nombre IANA (por defecto TIMEZONE); ValueError si no existe"""
+    try:
+        return ZoneInfo(name or settings.TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Zona horaria desconocida: {name}")
+
+
+def local_midnight(day: date, tz: ZoneInfo) -> datetime:
+    """Inicio del día local como instante en UTC (con DST incluido)"""
+    return datetime.combine(day, time.min, tzinfo=tz).astimezone(timezone.utc)
+
+
+def utc_range(start_date: Optional[date], end_date: Optional[date],
+              tz: ZoneInfo) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """[inicio de start_date, inicio del día siguiente a end_date) en UTC"""
+    return (
+        local_midnight(start_date, tz) if start_date else None,
+        local_midnight(end_date + timedelta(days=1), tz) if end_date else None,
+    )
+
+
+def day_boundaries(start_date: date, end_date: date, tz: ZoneInfo) -> List[datetime]:
+    """Inicios en UTC de cada día local de start_date a end_date, más el fin del último"""
+    days = (end_date - start_date).days + 1
+    return [local_midnight(start_date + timedelta(days=i), tz) for i in range(days + 1)]
+
+
+def as_aware(moment: datetime, tz: ZoneInfo) -> datetime:
+    """Una hora sin zona (p. ej. la del reloj de un lector) se toma como hora local de tz"""
+    return moment.replace(tzinfo=tz) if moment.tzinfo is None else moment
@@ -0,0 +1,263 @@
+"""
+Emisión y verificación de tokens de acceso (JWT).
+
+Las claves se construyen una sola vez por proceso como objetos Key de
+python-jose, en lugar de reconstruirlas desde settings en cada petición.
+Con algoritmos asimétricos (RS*, ES*, EdDSA) basta la clave pública para
+verificar; se publica como JWKS para que otros servicios validen los tokens
+localmente sin consultar a este backend.
+
+Cada token lleva un jti. El logout lo añade a una lista de revocación que
+conserva cada entrada solo hasta la expiración del token revocado. La lista
+en memoria es del proceso: con varios workers se exige
+TOKEN_DENYLIST_REDIS_URL. Si Redis no responde no se da un token por bueno
+(DenylistUnavailable), porque podría estar revocado en otro worker.
+"""
+import hashlib
+import heapq
+import logging
+import os
+import threading
+import time
+import uuid
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+from jose.constants import ALGORITHMS
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+EDDSA = "EdDSA"
+
+
+class Ed25519Key(Key):
+    """Clave EdDSA (Ed25519) para python-jose, que no la trae de serie"""
+
+    def __init__(self, key: Union[str, bytes, Ed25519PrivateKey, Ed25519PublicKey], algorithm: str):
+        if algorithm != EDDSA:
+            raise JWTError(f"Algoritmo no soportado por Ed25519Key: {algorithm}")
+        self._algorithm = algorithm
+        if isinstance(key, str):
+            key = key.encode()
+        if isinstance(key, bytes):
+            if b"PRIVATE" in key:
+                key = serialization.load_pem_private_key(key, password=None)
+            else:
+                key = serialization.load_pem_public_key(key)
+        if not isinstance(key, (Ed25519PrivateKey, Ed25519PublicKey)):
+            raise JWTError("La clave no es Ed25519")
+        self._key = key
+
+    def sign(self, msg: bytes) -> bytes:
+        if not isinstance(self._key, Ed25519PrivateKey):
+            raise JWTError("Se requiere la clave privada para firmar")
+        return self._key.sign(msg)
+
+    def verify(self, msg: bytes, sig: bytes) -> bool:
+        public = self._key.public_key() if isinstance(self._key, Ed25519PrivateKey) else self._key
+        try:
+            public.verify(sig, msg)
+            return True
+        except InvalidSignature:
+            return False
+
+    def public_key(self) -> "Ed25519Key":
+        if isinstance(self._key, Ed25519PublicKey):
+            return self
+        return Ed25519Key(self._key.public_key(), self._algorithm)
+
+    def to_pem(self) -> bytes:
+        if isinstance(self._key, Ed25519PrivateKey):
+            return self._key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            )
+        return self._key.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+    def to_dict(self) -> Dict[str, str]:
+        public = self.public_key()._key
+        raw = public.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {
+            "kty": "OKP",
+            "crv": "Ed25519",
+            "alg": self._algorithm,
+            "x": urlsafe_b64encode(raw).rstrip(b"=").decode(),
+        }
+
+
+jwk.register_key(EDDSA, Ed25519Key)
+
+
+class TokenKeys:
+    """Material de firma y verificación, construido una vez"""
+
+    def __init__(self, algorithm: str, signing_key: Any, verification_key: Any = None):
+        self.algorithm = algorithm
+        self.is_symmetric = algorithm in ALGORITHMS.HMAC
+        self.signing_key: Key = jwk.construct(signing_key, algorithm)
+        if verification_key is not None:
+            self.verification_key: Key = jwk.construct(verification_key, algorithm)
+        elif self.is_symmetric:
+            self.verification_key = self.signing_key
+        else:
+            self.verification_key = self.signing_key.public_key()
+        self.kid: Optional[str] = None
+        if not self.is_symmetric:
+            self.kid = hashlib.sha256(self.verification_key.to_pem()).hexdigest()[:16]
+
+    @classmethod
+    def from_settings(cls) -> "TokenKeys":
+        """HS* usa SECRET_KEY; RS*/ES*/EdDSA leen las claves PEM configuradas"""
+        if settings.ALGORITHM in ALGORITHMS.HMAC:
+            return cls(settings.ALGORITHM, settings.SECRET_KEY)
+        if not settings.JWT_PRIVATE_KEY_PATH:
+            raise RuntimeError(f"ALGORITHM={settings.ALGORITHM} requiere JWT_PRIVATE_KEY_PATH")
+        with open(settings.JWT_PRIVATE_KEY_PATH, "rb") as f:
+            private_pem = f.read()
+        public_pem = None
+        if settings.JWT_PUBLIC_KEY_PATH:
+            with open(settings.JWT_PUBLIC_KEY_PATH, "rb") as f:
+                public_pem = f.read()
+        return cls(settings.ALGORITHM, private_pem, public_pem)
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Claves públicas en formato JWKS (vacío con algoritmos simétricos)"""
+        if self.is_symmetric:
+            return {"keys": []}
+        key = dict(self.verification_key.to_dict())
+        key.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return {"keys": [key]}
+
+
+class DenylistUnavailable(RuntimeError):
+    """El almacén compartido de revocación no respondió"""
+
+
+class TokenDenylist:
+    """jti revocados en memoria; cada entrada se descarta al expirar su token"""
+
+    def __init__(self, max_entries: int = 100000):
+        self._max_entries = max_entries
+        self._revoked: Dict[str, float] = {}
+        # (expiración, jti) para purgar en orden de expiración
+        self._expiry: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def _purge(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry)
+            self._revoked.pop(jti, None)
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        now = time.time()
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._purge(now)
+            if jti not in self._revoked:
+                heapq.heappush(self._expiry, (expires_at, jti))
+            self._revoked[jti] = expires_at
+            if len(self._revoked) > self._max_entries:
+                # Se sacrifica la revocación más próxima a expirar
+                _, evicted = heapq.heappop(self._expiry)
+                self._revoked.pop(evicted, None)
+                logger.warning("Lista de revocación llena: se descartó la entrada más próxima a expirar")
+
+    async def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+class RedisTokenDenylist:
+    """Lista de revocación compartida entre workers; la copia local solo ahorra consultas"""
+
+    def __init__(self, url: str, max_entries: int = 100000, prefix: str = "revoked"):
+        # redis es opcional: solo se importa si se configura un almacén compartido
+        import redis.asyncio as redis
+
+        self._prefix = prefix
+        self._client = redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._local = TokenDenylist(max_entries)
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        await self._local.revoke(jti, expires_at)
+        ttl = int(expires_at - time.time()) + 1
+        if ttl <= 0:
+            return
+        try:
+            await self._client.set(f"{self._prefix}:{jti}", 1, ex=ttl)
+        except Exception as e:
+            # Revocado solo aquí: los demás workers seguirían aceptando el token
+            logger.error(f"Almacén de revocación no disponible, el token no se revocó en los demás workers: {e}")
+            raise DenylistUnavailable(str(e)) from e
+
+    async def is_revoked(self, jti: str) -> bool:
+        if await self._local.is_revoked(jti):
+            return True
+        try:
+            return bool(await self._client.exists(f"{self._prefix}:{jti}"))
+        except Exception as e:
+            logger.error(f"Almacén de revocación no disponible, se rechaza el token: {e}")
+            raise DenylistUnavailable(str(e)) from e
+
+
+class TokenService:
+    def __init__(self, keys: TokenKeys, denylist=None):
+        self.keys = keys
+        self.denylist = denylist if denylist is not None else TokenDenylist()
+        self._algorithms = [keys.algorithm]
+        self._headers = {"kid": keys.kid} if keys.kid else None
+
+    def create(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
+        now = datetime.utcnow()
+        to_encode = data.copy()
+        to_encode.update({
+            "iat": now,
+            "exp": now + (expires_delta or timedelta(minutes=15)),
+            "jti": uuid.uuid4().hex,
+        })
+        return jwt.encode(to_encode, self.keys.signing_key, algorithm=self.keys.algorithm, headers=self._headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Valida firma y expiración; lanza JWTError si el token no es válido"""
+        return jwt.decode(token, self.keys.verification_key, algorithms=self._algorithms)
+
+    async def revoke(self, claims: Dict[str, Any]) -> None:
+        jti = claims.get("jti")
+        if jti:
+            await self.denylist.revoke(jti, float(claims.get("exp", 0)))
+
+    async def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        jti = claims.get("jti")
+        return bool(jti) and await self.denylist.is_revoked(jti)
+
+
+_token_service: Optional[TokenService] = None
+
+
+def get_token_service() -> TokenService:
+    """Instancia única por proceso, creada en el primer uso"""
+    global _token_service
+    if _token_service is None:
+        if settings.TOKEN_DENYLIST_REDIS_URL:
+            denylist = RedisTokenDenylist(settings.TOKEN_DENYLIST_REDIS_URL, settings.TOKEN_DENYLIST_MAX_ENTRIES)
+        else:
+            # Cada worker tendría su propia lista: un logout solo valdría en uno de ellos
+            if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+                raise RuntimeError("Con varios workers la revocación de tokens requiere TOKEN_DENYLIST_REDIS_URL")
+            denylist = TokenDenylist(settings.TOKEN_DENYLIST_MAX_ENTRIES)
+        _token_service = TokenService(TokenKeys.from_settings(), denylist)
+    return _token_service
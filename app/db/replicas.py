@@ -0,0 +1,159 @@
+"""
+Réplicas de lectura para reportes, exportaciones e historiales.
+
+Con DATABASE_REPLICA_URLS configurado, las rutas de solo lectura piden su
+sesión a get_read_db (app.api.deps), que la enlaza a una réplica elegida
+en round robin entre las sanas. Una réplica deja de usarse si no responde
+o si su retraso de replicación supera DB_REPLICA_MAX_LAG_SECONDS; el estado
+se comprueba como mucho una vez cada DB_REPLICA_CHECK_SECONDS. Sin réplicas
+disponibles la lectura va al primario.
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Retraso en segundos; 0 si la réplica ya aplicó todo lo recibido (un primario
+# sin escrituras no hace avanzar pg_last_xact_replay_timestamp). NULL si no hay
+# WAL receiver o si su estado no es streaming: sin conexión al primario "aplicó
+# todo lo recibido" no dice nada. La fila del receiver es visible para todos,
+# pero su estado solo con pg_read_all_stats (o pg_monitor); sin ese permiso el
+# estado es NULL y se usa solo la comparación de LSN. La segunda columna indica
+# si el usuario tiene el permiso
+_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver) THEN NULL "
+    "WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status <> 'streaming') THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END, "
+    "pg_has_role('pg_read_all_stats', 'USAGE')"
+)
+
+
+class _Replica:
+    __slots__ = ("engine", "name", "healthy", "lag", "error", "warned")
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        # Aviso de permisos ya registrado
+        self.warned = False
+
+
+class ReplicaRouter:
+    def __init__(self, engines: Sequence[Engine], max_lag: float = 30.0, check_interval: float = 10.0):
+        self._replicas = [_Replica(engine) for engine in engines]
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+        self._cycle = itertools.cycle(self._replicas) if self._replicas else None
+        self._check_lock = threading.Lock()
+        self.checked_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._replicas)
+
+    def _check(self, replica: _Replica) -> None:
+        try:
+            with replica.engine.connect() as conn:
+                lag, can_read_stats = conn.execute(_LAG_QUERY).one()
+            if not can_read_stats and not replica.warned:
+                replica.warned = True
+                logger.warning(
+                    f"Réplica {replica.name}: el usuario no tiene pg_read_all_stats; no se puede "
+                    f"comprobar que el WAL receiver esté en streaming, solo su existencia y el LSN"
+                )
+            if lag is None:
+                replica.healthy = False
+                replica.lag = None
+                replica.error = "La réplica no está recibiendo WAL del primario"
+                return
+            replica.lag = float(lag)
+            replica.error = None
+            replica.healthy = replica.lag <= self._max_lag
+        except Exception as e:
+            replica.healthy = False
+            replica.lag = None
+            replica.error = str(e)
+
+    def refresh(self, force: bool = False) -> None:
+        """Comprueba conexión y retraso de cada réplica si el estado caducó"""
+        if not force and time.monotonic() - self.checked_at < self._check_interval:
+            return
+        # Una sola comprobación a la vez; el resto usa el último estado conocido
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            for replica in self._replicas:
+                was_healthy = replica.healthy
+                self._check(replica)
+                if was_healthy != replica.healthy:
+                    logger.warning(
+                        f"Réplica {replica.name} {'disponible' if replica.healthy else 'fuera de servicio'} "
+                        f"(retraso: {replica.lag}, error: {replica.error})"
+                    )
+            self.checked_at = time.monotonic()
+        finally:
+            self._check_lock.release()
+
+    def pick(self) -> Optional[Engine]:
+        """Engine de una réplica sana, o None para usar el primario"""
+        if not self._replicas:
+            return None
+        self.refresh()
+        for _ in range(len(self._replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def mark_down(self, engine: Engine, error: Exception) -> None:
+        """Excluye una réplica que falló al conectar hasta la próxima comprobación"""
+        for replica in self._replicas:
+            if replica.engine is engine:
+                replica.healthy = False
+                replica.error = str(error)
+                logger.warning(f"Réplica {replica.name} fuera de servicio: {error}")
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"replica": r.name, "healthy": r.healthy, "lag_seconds": r.lag, "error": r.error}
+            for r in self._replicas
+        ]
+
+    def dispose(self) -> None:
+        for replica in self._replicas:
+            replica.engine.dispose()
+
+
+def create_replica_router() -> ReplicaRouter:
+    """Engines de las réplicas configuradas (pool propio, timeout de conexión corto)"""
+    engines = [
+        create_engine(
+            url,
+            pool_size=settings.DB_REPLICA_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={"connect_timeout": settings.DB_REPLICA_CONNECT_TIMEOUT}
+        )
+        for url in settings.DATABASE_REPLICA_URLS
+    ]
+    return ReplicaRouter(
+        engines,
+        max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.DB_REPLICA_CHECK_SECONDS
+    )
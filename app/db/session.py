@@ -1,15 +1,108 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+"""
+El engine no se crea al importar el módulo: en app.main lo crea y lo libera
+el lifespan de cada worker (init_engine / dispose_engine), de modo que un
+proceso maestro con preload nunca comparte sockets con los workers tras el
+fork. Los scripts que usan SessionLocal() directamente lo crean bajo demanda.
+"""
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import get_settings
+from app.db.replicas import ReplicaRouter, create_replica_router
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"options": "-c timezone=America/Bogota"}
-)
+_engine: Optional[Engine] = None
+_replica_router: Optional[ReplicaRouter] = None
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker que crea el engine en la primera sesión si aún no existe"""
+
+    def __call__(self, **local_kw):
+        if _engine is None:
+            init_engine()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+
+
+def init_engine() -> Engine:
+    """Crea el engine del proceso actual (y los de las réplicas) y enlaza SessionLocal"""
+    global _engine, _replica_router
+    if _replica_router is None:
+        _replica_router = create_replica_router()
+    if _engine is None:
+        _engine = create_engine(
+            settings.DATABASE_URL,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_engine() -> Engine:
+    return _engine if _engine is not None else init_engine()
+
+
+def get_replica_router() -> ReplicaRouter:
+    if _replica_router is None:
+        init_engine()
+    return _replica_router
+
+
+def dispose_engine() -> None:
+    """Cierra las conexiones del pool del proceso actual"""
+    global _engine, _replica_router
+    if _replica_router is not None:
+        _replica_router.dispose()
+        _replica_router = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+        SessionLocal.configure(bind=None)
+
+
+def open_read_session() -> Session:
+    """
+    Sesión de solo lectura: una réplica sana si hay configuradas, el primario
+    si no. La conexión se abre de inmediato para poder volver al primario
+    cuando la réplica no responde
+    """
+    router = get_replica_router()
+    engine = router.pick()
+    if engine is None:
+        return SessionLocal()
+    db = SessionLocal(bind=engine)
+    try:
+        db.connection()
+    except OperationalError as e:
+        db.close()
+        router.mark_down(engine, e)
+        return SessionLocal()
+    return db
+
+
+def warm_pool(connections: int) -> None:
+    """Abre y valida conexiones del pool antes de aceptar tráfico"""
+    engine = get_engine()
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        # Al cerrarlas vuelven al pool y quedan disponibles
+        for conn in opened:
+            conn.close()
 
 
 def get_db():
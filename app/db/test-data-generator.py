@@ -1,9 +1,10 @@
 # test_data_generator.py
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import random
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.access_log import AccessLog
+from app.services.device_cache import get_device_cache
 from app.core.security import encrypt_fingerprint
 
 def generate_test_data(db: Session):
@@ -64,8 +65,8 @@ def generate_test_data(db: Session):
         created_users.append(user)
     
     # 2. Generar registros de acceso históricos
-    start_date = datetime.now() - timedelta(days=30)  # Último mes
-    end_date = datetime.now()
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=30)  # Último mes
     
     access_types = ["entry", "exit"]
     devices = ["MAIN_DOOR", "SIDE_DOOR", "GARAGE"]
@@ -88,7 +89,7 @@ def generate_test_data(db: Session):
             access_log = AccessLog(
                 user_id=user.id,
                 access_type=random.choice(access_types),
-                device_id=random.choice(devices),
+                device_pk=get_device_cache().id_for(db, random.choice(devices)),
                 status=status,
                 timestamp=random_timestamp
             )
@@ -0,0 +1,19 @@
+"""INSERT ... ON CONFLICT DO NOTHING para los dialectos soportados"""
+from typing import Sequence, Union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+
+def insert_ignoring_conflicts(bind: Union[Session, Connection, Engine], table, index_elements: Sequence[str]):
+    """Sentencia INSERT que descarta las filas que violan la restricción única indicada"""
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+    else:
+        raise RuntimeError(f"ON CONFLICT DO NOTHING no soportado para {dialect}")
+    return stmt.on_conflict_do_nothing(index_elements=list(index_elements))
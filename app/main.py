@@ -1,17 +1,83 @@
-from fastapi import FastAPI, Response
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
+from app.core.compression import CompressionMiddleware
+from app.core.static_assets import StaticAssetStore
+from app.core.tokens import get_token_service
 from app.api.v1.api import api_router
-import httpx
-from fastapi.responses import Response
-from async_lru import alru_cache
+from app.api.v1.endpoints import health
+from app.db.session import SessionLocal, init_engine, dispose_engine, warm_pool
+from app.services.access_feed import get_access_feed
+from app.services.access_log_writer import get_access_log_writer
+from app.services.anomaly_detection import get_detector_feed
+from app.services.device_cache import get_device_cache
+from app.services.device_heartbeat import get_device_heartbeats
+from app.services.fingerprint_service import get_fingerprint_service
+from app.services import job_handlers  # noqa: F401  (registra los tipos de trabajo)
+from app.services.jobs import get_job_runner
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+static_assets = StaticAssetStore(
+    max_age=settings.STATIC_MAX_AGE,
+    remote_ttl=settings.STATIC_REMOTE_TTL,
+    remote_negative_ttl=settings.STATIC_REMOTE_NEGATIVE_TTL,
+    remote_timeout=settings.STATIC_REMOTE_TIMEOUT,
+)
+
+
+def _warmup() -> None:
+    """Pool de conexiones, dispositivo, índice de templates y caché de lectores del worker"""
+    warm_pool(settings.DB_POOL_WARMUP_CONNECTIONS)
+    # Falla al arrancar si la revocación de tokens no está bien configurada
+    get_token_service()
+    db = SessionLocal()
+    try:
+        get_fingerprint_service().start(db)
+        get_device_cache().load(db)
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Se ejecuta en cada worker tras el fork: engine y dispositivo propios
+    started = time.perf_counter()
+    app.state.ready = False
+    init_engine()
+    await run_in_threadpool(_warmup)
+    get_access_log_writer().start()
+    get_device_heartbeats().start()
+    get_job_runner().start()
+    get_access_feed().start()
+    get_detector_feed().start()
+    app.state.ready = True
+    logger.info(f"Worker listo en {(time.perf_counter() - started) * 1000:.1f} ms")
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await static_assets.close()
+        get_fingerprint_service().stop()
+        await get_detector_feed().stop()
+        await get_access_feed().stop()
+        await get_job_runner().stop()
+        # Escribe los registros pendientes antes de cerrar el pool
+        await run_in_threadpool(get_access_log_writer().stop)
+        await run_in_threadpool(get_device_heartbeats().stop)
+        dispose_engine()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -22,26 +88,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        content_types=settings.COMPRESSION_CONTENT_TYPES,
+    )
 
-
-@alru_cache(maxsize=1)
-async def get_favicon():
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://res.cloudinary.com/dv2xu8dwr/image/upload/v1733373523/fingerprint_zn7t8z.png"
-        )
-        return response.content if response.status_code == 200 else None
+app.include_router(api_router, prefix=settings.API_V1_STR)
+# Sondas del orquestador fuera del prefijo versionado
+app.include_router(health.router, prefix="/health", tags=["health"])
 
 
 @app.get("/favicon.ico", include_in_schema=False)
-async def favicon():
-    favicon_content = await get_favicon()
-    if favicon_content:
-        return Response(content=favicon_content, media_type="image/x-icon")
-    return Response(status_code=404)
+async def favicon(request: Request):
+    asset = await static_assets.resolve("favicon.png", settings.FAVICON_URL)
+    return static_assets.response(request, asset)
 
 
+# Se mantiene por compatibilidad; para sondas usar /health/live y /health/ready
 @app.get("/", include_in_schema=False)
 async def root():
     return {"Mensaje": "Backend Biometric running"}
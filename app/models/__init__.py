@@ -1,6 +1,16 @@
 from app.models.base_class import Base
+from app.models.device import Device
 from app.models.user import User
 from app.models.access_log import AccessLog
+from app.models.job import Job
+from app.models.enrollment import EnrollmentSessionRecord
+from app.models.site import Site, SiteDevice, user_site
+from app.models.access_policy import (
+    AccessPolicyState, AccessRule, DoorGroup, Holiday, Schedule, ScheduleWindow,
+    UserAccessException, door_group_device, user_access_rule
+)
 
 # Exportar los modelos para que estén disponibles al importar desde app.models
-__all__ = ["Base", "User", "AccessLog"]
+__all__ = ["Base", "Device", "User", "AccessLog", "Job", "EnrollmentSessionRecord", "Site", "SiteDevice", "user_site",
+           "AccessPolicyState", "AccessRule", "DoorGroup", "Holiday", "Schedule", "ScheduleWindow",
+           "UserAccessException", "door_group_device", "user_access_rule"]
@@ -1,7 +1,36 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from enum import IntEnum
+from typing import Optional
+from sqlalchemy import (
+    CheckConstraint, Column, Index, Integer, SmallInteger, String, DateTime, ForeignKey, UniqueConstraint, select
+)
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from app.models.base_class import Base
+from app.models.device import Device
+from app.models.types import CodedString
+
+# Códigos smallint de access_type y status (no reordenar: están en la base de datos)
+ACCESS_TYPE_CODES = {"entry": 1, "exit": 2}
+ACCESS_STATUS_CODES = {"success": 1, "denied": 2}
+
+
+class DenialReason(IntEnum):
+    """Motivo de un acceso denegado; se guarda como smallint y se expone por su código"""
+    NOT_RECOGNIZED = 1
+    INACTIVE_USER = 2
+    OUTSIDE_SCHEDULE = 3
+    DOOR_NOT_ALLOWED = 4
+    HOLIDAY = 5
+    EXCEPTION_DENY = 6
+    NO_POLICY = 7
+
+    @property
+    def code(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def from_code(cls, code: Optional[str]) -> Optional["DenialReason"]:
+        return cls.__members__.get(code.upper()) if code else None
 
 
 class AccessLog(Base):
@@ -9,11 +38,34 @@ class AccessLog(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("user.id"))
-    access_type = Column(String)  # "entry" o "exit"
-    status = Column(String)  # "success" o "denied"
+    access_type = Column(CodedString(ACCESS_TYPE_CODES))  # "entry" o "exit"
+    status = Column(CodedString(ACCESS_STATUS_CODES))  # "success" o "denied"
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    device_id = Column(String)
+    # Lector en la dimensión device; el código se resuelve con app.services.device_cache
+    device_pk = Column(Integer, ForeignKey("device.id"), nullable=True)
+    # Clave de idempotencia asignada por el lector a cada evento (ingesta en lote)
+    idempotency_key = Column(String(64), nullable=True)
+    # DenialReason de los accesos denegados (NULL en los exitosos)
+    reason = Column(SmallInteger, nullable=True)
 
     # Relación con User
     # user = relationship("User", back_populates="access_logs")
-    user = relationship("User", back_populates="access_logs", lazy="joined")
+    # Carga diferida: los listados usan consultas proyectadas
+    # (app.services.access_log_queries) en lugar de un JOIN implícito
+    user = relationship("User", back_populates="access_logs", lazy="select")
+
+    __table_args__ = (
+        # Un mismo evento reenviado por el lector se descarta (ON CONFLICT DO NOTHING)
+        UniqueConstraint("device_pk", "idempotency_key", name="uq_access_log_device_idempotency_key"),
+        # Reportes de denegaciones por rango de fechas
+        Index("ix_access_log_status_timestamp", "status", "timestamp"),
+        CheckConstraint("access_type IN (1, 2)", name="ck_access_log_access_type"),
+        CheckConstraint("status IN (1, 2)", name="ck_access_log_status"),
+    )
+
+
+# Código del lector al cargar entidades AccessLog; los listados proyectados
+# hacen JOIN con device en su lugar (app.services.access_log_queries)
+AccessLog.device_id = column_property(
+    select(Device.device_id).where(Device.id == AccessLog.device_pk).scalar_subquery()
+)
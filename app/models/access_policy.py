@@ -0,0 +1,105 @@
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, ForeignKey, Integer, SmallInteger, String, Table, CheckConstraint
+)
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.models.base_class import Base
+
+# Día de la semana reservado para los festivos en ScheduleWindow.weekday
+HOLIDAY_WEEKDAY = 7
+
+# Lectores (device_id) que forman cada grupo de puertas
+door_group_device = Table(
+    "door_group_device",
+    Base.metadata,
+    Column("door_group_id", Integer, ForeignKey("door_group.id", ondelete="CASCADE"), primary_key=True),
+    Column("device_id", String, ForeignKey("device.device_id", ondelete="CASCADE"), primary_key=True),
+)
+
+# Reglas asignadas explícitamente a cada usuario
+user_access_rule = Table(
+    "user_access_rule",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True),
+    Column("rule_id", Integer, ForeignKey("access_rule.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
+
+class Schedule(Base):
+    __tablename__ = 'schedule'
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+
+    windows = relationship("ScheduleWindow", back_populates="schedule", lazy="selectin",
+                           cascade="all, delete-orphan")
+
+
+class ScheduleWindow(Base):
+    """Franja permitida: weekday 0=lunes ... 6=domingo, 7=festivo; minutos desde medianoche"""
+    __tablename__ = 'schedule_window'
+    __table_args__ = (
+        CheckConstraint("weekday BETWEEN 0 AND 7", name="ck_schedule_window_weekday"),
+        CheckConstraint("start_minute >= 0 AND end_minute <= 1440 AND start_minute < end_minute",
+                        name="ck_schedule_window_range"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("schedule.id", ondelete="CASCADE"), nullable=False, index=True)
+    weekday = Column(SmallInteger, nullable=False)
+    start_minute = Column(SmallInteger, nullable=False)
+    end_minute = Column(SmallInteger, nullable=False)
+
+    schedule = relationship("Schedule", back_populates="windows", lazy="select")
+
+
+class DoorGroup(Base):
+    __tablename__ = 'door_group'
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class AccessRule(Base):
+    """Permite el acceso por las puertas del grupo durante el horario (None = sin restricción)"""
+    __tablename__ = 'access_rule'
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    schedule_id = Column(Integer, ForeignKey("schedule.id", ondelete="RESTRICT"), nullable=True)
+    door_group_id = Column(Integer, ForeignKey("door_group.id", ondelete="RESTRICT"), nullable=True)
+    # Se aplica a todos los usuarios, además de los asignados explícitamente
+    applies_to_all = Column(Boolean, default=False, nullable=False)
+
+
+class Holiday(Base):
+    __tablename__ = 'holiday'
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, unique=True, nullable=False)
+    name = Column(String, nullable=False)
+
+
+class UserAccessException(Base):
+    """Excepción temporal de un usuario que prevalece sobre sus reglas"""
+    __tablename__ = 'user_access_exception'
+    __table_args__ = (
+        CheckConstraint("effect IN ('allow', 'deny')", name="ck_user_access_exception_effect"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    effect = Column(String(5), nullable=False)  # "allow" o "deny"
+    door_group_id = Column(Integer, ForeignKey("door_group.id", ondelete="CASCADE"), nullable=True)
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)
+    note = Column(String, nullable=True)
+
+
+class AccessPolicyState(Base):
+    """Fila única con la versión de las políticas; cada cambio la incrementa"""
+    __tablename__ = 'access_policy_state'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,10 +1,20 @@
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
+from app.models.device import Device
 from app.models.user import User
 from app.models.access_log import AccessLog
+from app.models.job import Job
+from app.models.enrollment import EnrollmentSessionRecord
+from app.models.site import Site, SiteDevice, user_site
+from app.models.access_policy import (
+    AccessPolicyState, AccessRule, DoorGroup, Holiday, Schedule, ScheduleWindow,
+    UserAccessException, door_group_device, user_access_rule
+)
 
 # Configurar las relaciones después de que ambos modelos existan
 # User.access_logs = relationship("AccessLog", back_populates="user", lazy="dynamic")
 # AccessLog.user = relationship("User", back_populates="access_logs")
 
-__all__ = ["Base", "User", "AccessLog"]
\ No newline at end of file
+__all__ = ["Base", "Device", "User", "AccessLog", "Job", "EnrollmentSessionRecord", "Site", "SiteDevice", "user_site",
+           "AccessPolicyState", "AccessRule", "DoorGroup", "Holiday", "Schedule", "ScheduleWindow",
+           "UserAccessException", "door_group_device", "user_access_rule"]
\ No newline at end of file
@@ -0,0 +1,20 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.models.base_class import Base
+
+
+class Device(Base):
+    """Registro de lectores: access_log guarda solo el id entero"""
+    __tablename__ = 'device'
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Identificador externo con el que el lector se presenta (p. ej. ZKTECO_SIMULATOR_001)
+    device_id = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=True)
+    location = Column(String, nullable=True)
+    firmware_version = Column(String, nullable=True)
+    # Un lector deshabilitado no puede verificar huellas
+    is_active = Column(Boolean, default=True, nullable=False)
+    # Último heartbeat escrito; el más reciente puede estar aún en memoria
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
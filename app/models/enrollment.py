@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, Integer, JSON, String
+from app.models.base_class import Base
+
+
+class EnrollmentSessionRecord(Base):
+    """Progreso de una sesión de enrolamiento en lote; ver app.services.enrollment"""
+    __tablename__ = 'enrollment_session'
+
+    id = Column(String(32), primary_key=True)
+    # running, completed o failed
+    status = Column(String(16), nullable=False)
+    device_ids = Column(JSON, nullable=False)
+    total = Column(Integer, nullable=False)
+    results = Column(JSON, nullable=False, default=list)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
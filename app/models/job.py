@@ -0,0 +1,34 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, JSON, SmallInteger, String, Text
+from sqlalchemy.sql import func
+from app.models.base_class import Base
+
+
+class Job(Base):
+    """Trabajo en segundo plano (con JOB_STORE=database); ver app.services.jobs"""
+    __tablename__ = 'job'
+    __table_args__ = (
+        # Los runners reclaman el siguiente pendiente de su cola
+        Index("ix_job_queue_status_run_after", "queue", "status", "run_after"),
+    )
+
+    id = Column(String(32), primary_key=True)
+    name = Column(String, nullable=False)
+    queue = Column(String, nullable=False)
+    # queued, running, succeeded, failed o cancelled
+    status = Column(String(16), nullable=False)
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    message = Column(String, nullable=True)
+    attempts = Column(SmallInteger, nullable=False, default=0)
+    max_attempts = Column(SmallInteger, nullable=False, default=1)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    created_by = Column(Integer, ForeignKey("user.id", ondelete="SET NULL"), nullable=True)
+    # Proceso que lo ejecuta (host:pid)
+    worker = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    run_after = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
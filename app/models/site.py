@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.models.base_class import Base
+
+# Sedes en las que un usuario está enrolado; un usuario sin sedes es global
+# (se compara en todos los lectores)
+user_site = Table(
+    "user_site",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True),
+    Column("site_id", Integer, ForeignKey("site.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
+
+class Site(Base):
+    __tablename__ = 'site'
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    # Zona horaria IANA de la sede; NULL usa TIMEZONE
+    timezone = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    devices = relationship("SiteDevice", back_populates="site", lazy="select", cascade="all, delete-orphan")
+
+
+class SiteDevice(Base):
+    """Lector instalado en una sede: define el subconjunto de la galería que compara"""
+    __tablename__ = 'site_device'
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String, ForeignKey("device.device_id", ondelete="CASCADE"), unique=True, index=True,
+                       nullable=False)
+    site_id = Column(Integer, ForeignKey("site.id", ondelete="CASCADE"), nullable=False)
+    # Cambia al reasignar el lector: forma parte de la firma de la galería
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    site = relationship("Site", back_populates="devices", lazy="select")
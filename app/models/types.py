@@ -0,0 +1,34 @@
+from typing import Dict, Optional
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+
+class CodedString(TypeDecorator):
+    """
+    Columna smallint que la aplicación ve como texto: traduce con un mapa fijo
+    en memoria al escribir (y en los filtros) y al leer. Un valor fuera del
+    mapa se rechaza antes de llegar a la base de datos.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, codes: Dict[str, int]):
+        super().__init__()
+        # Tupla hashable: forma parte de la clave del caché de sentencias
+        self.codes = tuple(sorted(codes.items()))
+        self._to_code = dict(self.codes)
+        self._to_value = {code: value for value, code in self.codes}
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        try:
+            return self._to_code[value]
+        except KeyError:
+            raise ValueError(f"Valor no permitido: {value!r} (se espera uno de {sorted(self._to_code)})")
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[str]:
+        return None if value is None else self._to_value.get(value)
+
+    def process_literal_param(self, value: Optional[str], dialect) -> str:
+        return "NULL" if value is None else str(self._to_code[value])
@@ -1,18 +1,31 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Integer, SmallInteger, String, DateTime, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, column_property
 from app.models.base_class import Base
+from app.models.site import user_site
 
 
 class User(Base):
     __tablename__ = 'user'  # Especificamos el nombre de la tabla
+    # Índices para el listado paginado de /auth/users; el índice funcional
+    # lower(full_name) se crea en la migración 5a84895a32b9
+    __table_args__ = (
+        Index('ix_user_email_prefix', 'email', postgresql_ops={'email': 'text_pattern_ops'}),
+        Index('ix_user_is_active', 'is_active'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
     full_name = Column(String)
     employee_id = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
-    fingerprint_template = Column(String, nullable=True)
+    # Columnas pesadas/sensibles diferidas: solo se cargan con undefer()
+    # en el login (hashed_password) y en la ruta biométrica (fingerprint_template)
+    hashed_password = deferred(Column(String))
+    fingerprint_template = deferred(Column(String, nullable=True))
+    # Metadatos del enrolamiento de la huella (calidad 0-100 reportada por el lector)
+    fingerprint_quality = Column(SmallInteger, nullable=True)
+    fingerprint_device_id = Column(String, nullable=True)
+    fingerprint_enrolled_at = Column(DateTime(timezone=True), nullable=True)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -21,3 +34,10 @@ class User(Base):
     # Relación con AccessLog
     #access_logs = relationship("AccessLog", back_populates="user")
     access_logs = relationship("AccessLog", back_populates="user", lazy="select")
+    sites = relationship("Site", secondary=user_site, lazy="select")
+
+
+# Indicador calculado en SQL para no transferir el template cifrado
+User.has_fingerprint = column_property(
+    User.__table__.c.fingerprint_template.isnot(None)
+)
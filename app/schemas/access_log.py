@@ -1,7 +1,8 @@
 # schemas/access_log.py
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
+from typing_extensions import TypedDict
 
 
 
@@ -15,21 +16,23 @@ class UserBase(BaseModel):
 
 
 class AccessLogBase(BaseModel):
-    access_type: str  # "entry" o "exit"
-    device_id: str = "default"  # Valor por defecto si no se especifica
+    access_type: Literal["entry", "exit"]
+    device_id: Optional[str] = None  # NULL si el lector no estaba registrado
 
     model_config = ConfigDict(from_attributes=True)
 
 
 class AccessLogCreate(AccessLogBase):
-    pass  # Ya no necesitamos user_id ni status aquí, se manejan internamente
+    # Ya no necesitamos user_id ni status aquí, se manejan internamente
+    device_id: str = "default"  # Valor por defecto si no se especifica
 
 
 class AccessLog(AccessLogBase):
     id: int
-    user_id: int
+    user_id: Optional[int]  # NULL en los intentos con huella no reconocida
     status: str
     timestamp: datetime
+    reason: Optional[str] = None  # Código de DenialReason en los denegados
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -38,3 +41,61 @@ class AccessLogWithUser(AccessLog):
     user: Optional[UserBase]
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# Filas proyectadas (dicts) para la serialización en bloque de listados
+# grandes; reflejan los campos de AccessLog / AccessLogWithUser
+class UserSummaryRow(TypedDict):
+    email: str
+    full_name: Optional[str]
+    employee_id: Optional[str]
+
+
+class AccessLogRow(TypedDict):
+    id: int
+    user_id: Optional[int]
+    access_type: Optional[str]
+    status: Optional[str]
+    timestamp: datetime
+    device_id: Optional[str]
+    reason: Optional[str]
+
+
+class AccessLogWithUserRow(AccessLogRow):
+    user: Optional[UserSummaryRow]
+
+
+# Ingesta en lote de eventos almacenados por lectores sin conexión
+class AccessEventIn(BaseModel):
+    idempotency_key: str = Field(min_length=1, max_length=64)
+    user_id: int
+    access_type: Literal["entry", "exit"]
+    status: Literal["success", "denied"] = "success"
+    timestamp: datetime  # Hora registrada por el lector
+
+
+class AccessEventBatch(BaseModel):
+    device_id: str = "default"
+    events: List[AccessEventIn]
+
+
+class AccessEventResult(TypedDict):
+    idempotency_key: str
+    result: Literal["created", "duplicate", "rejected"]
+    id: Optional[int]
+    error: Optional[str]
+
+
+class AccessEventBatchResult(TypedDict):
+    created: int
+    duplicates: int
+    rejected: int
+    results: List[AccessEventResult]
+
+
+# Página del feed incremental; cada evento es una lista en el orden de fields
+class AccessFeedPage(TypedDict):
+    next_cursor: int
+    has_more: bool
+    fields: List[str]
+    events: List[list]
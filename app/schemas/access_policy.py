@@ -0,0 +1,94 @@
+# schemas/access_policy.py
+from typing import List, Literal, Optional
+from datetime import date, datetime
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class ScheduleWindow(BaseModel):
+    weekday: int = Field(ge=0, le=7)  # 0=lunes ... 6=domingo, 7=festivo
+    start_minute: int = Field(ge=0, le=1439)
+    end_minute: int = Field(ge=1, le=1440)
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="after")
+    def validate_range(self):
+        if self.start_minute >= self.end_minute:
+            raise ValueError("start_minute debe ser menor que end_minute")
+        return self
+
+
+class ScheduleCreate(BaseModel):
+    name: str = Field(min_length=1)
+    windows: List[ScheduleWindow]
+
+
+class Schedule(ScheduleCreate):
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DoorGroupCreate(BaseModel):
+    name: str = Field(min_length=1)
+    device_ids: List[str] = []
+
+
+class DoorGroup(DoorGroupCreate):
+    id: int
+
+
+class AccessRuleCreate(BaseModel):
+    name: str = Field(min_length=1)
+    schedule_id: Optional[int] = None  # Sin horario: a cualquier hora
+    door_group_id: Optional[int] = None  # Sin grupo: todas las puertas
+    applies_to_all: bool = False
+    user_ids: List[int] = []
+
+
+class AccessRule(AccessRuleCreate):
+    id: int
+
+
+class RuleUsersUpdate(BaseModel):
+    user_ids: List[int]
+
+
+class HolidayCreate(BaseModel):
+    date: date
+    name: str = Field(min_length=1)
+
+
+class Holiday(HolidayCreate):
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserAccessExceptionCreate(BaseModel):
+    user_id: int
+    effect: Literal["allow", "deny"]
+    door_group_id: Optional[int] = None
+    starts_at: datetime
+    ends_at: datetime
+    note: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_range(self):
+        if self.starts_at >= self.ends_at:
+            raise ValueError("starts_at debe ser anterior a ends_at")
+        return self
+
+
+class UserAccessException(UserAccessExceptionCreate):
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PolicyDecision(BaseModel):
+    user_id: int
+    device_id: Optional[str]
+    at: datetime
+    allowed: bool
+    reason: Optional[str] = None
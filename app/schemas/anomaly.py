@@ -0,0 +1,39 @@
+# schemas/anomaly.py
+from typing import Dict, List, Optional
+from datetime import date, datetime
+from pydantic import BaseModel, Field
+
+
+class AnomalyAlert(BaseModel):
+    kind: str
+    user_id: Optional[int] = None
+    device_id: Optional[str] = None
+    timestamp: datetime
+    detail: str
+
+
+class AnomalyStats(BaseModel):
+    events: int
+    alerts: Dict[str, int]
+    tracked_users: int
+    tracked_devices: int
+    avg_event_us: float
+
+
+class AnomalyReplayRequest(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    # Umbrales a probar; los omitidos toman la configuración actual
+    travel_seconds: Optional[int] = Field(None, gt=0)
+    burst_count: Optional[int] = Field(None, ge=2)
+    burst_seconds: Optional[int] = Field(None, gt=0)
+    workday_start_hour: Optional[int] = Field(None, ge=0, le=23)
+    workday_end_hour: Optional[int] = Field(None, ge=1, le=24)
+    session_hours: Optional[int] = Field(None, gt=0)
+    user_history: Optional[int] = Field(None, ge=1)
+    limit: int = Field(100, ge=0, le=10000)
+
+
+class AnomalyReplayResult(BaseModel):
+    stats: AnomalyStats
+    alerts: List[AnomalyAlert]
@@ -0,0 +1,39 @@
+# schemas/device.py
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class DeviceBase(BaseModel):
+    name: Optional[str] = None
+    location: Optional[str] = None
+    firmware_version: Optional[str] = None
+
+
+class DeviceCreate(DeviceBase):
+    device_id: str = Field(min_length=1, max_length=100)
+
+
+class DeviceUpdate(DeviceBase):
+    is_active: Optional[bool] = None
+
+
+class Device(DeviceBase):
+    id: int
+    device_id: str
+    is_active: bool
+    last_seen_at: Optional[datetime] = None
+    # Heartbeat dentro de DEVICE_OFFLINE_AFTER_SECONDS
+    online: bool = False
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DeviceHeartbeat(BaseModel):
+    firmware_version: Optional[str] = None
+
+
+class DeviceHeartbeatAck(BaseModel):
+    device_id: str
+    received_at: datetime
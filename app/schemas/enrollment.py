@@ -0,0 +1,32 @@
+# schemas/enrollment.py
+from typing import List, Literal, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class EnrollmentSessionCreate(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=1000)
+    device_ids: List[str] = Field(min_length=1, max_length=50)
+
+
+class EnrollmentResult(BaseModel):
+    user_id: int
+    device_id: str
+    status: Literal["enrolled", "rejected", "error"]
+    quality: Optional[int] = None
+    reason: Optional[str] = None  # user_not_found, capture_failed, low_quality, duplicate
+    detail: Optional[str] = None
+    matched_user_id: Optional[int] = None
+    elapsed_ms: float
+
+
+class EnrollmentSession(BaseModel):
+    id: str
+    status: Literal["running", "completed", "failed"]
+    device_ids: List[str]
+    total: int
+    completed: int
+    enrolled: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    results: List[EnrollmentResult]
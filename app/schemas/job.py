@@ -0,0 +1,40 @@
+# schemas/job.py
+from typing import Any, Dict, Optional
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+
+
+class JobCreate(BaseModel):
+    name: str
+    params: Dict[str, Any] = {}
+
+
+class Job(BaseModel):
+    id: str
+    name: str
+    queue: str
+    status: str
+    params: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progress: float
+    message: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    cancel_requested: bool
+    created_by: Optional[int] = None
+    worker: Optional[str] = None
+    created_at: Optional[datetime] = None
+    run_after: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobHandler(BaseModel):
+    name: str
+    queue: str
+    description: str
+    max_attempts: int
+    params_schema: Optional[Dict[str, Any]] = None
@@ -0,0 +1,40 @@
+# schemas/site.py
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from app.core.timezones import get_zone
+
+
+class SiteCreate(BaseModel):
+    code: str = Field(min_length=1, max_length=50)
+    name: str = Field(min_length=1)
+    timezone: Optional[str] = None  # Zona IANA; por defecto TIMEZONE
+
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            get_zone(value)
+        return value
+
+
+class SiteDevice(BaseModel):
+    device_id: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class Site(BaseModel):
+    id: int
+    code: str
+    name: str
+    timezone: Optional[str] = None
+    created_at: datetime
+    devices: List[SiteDevice] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserSitesUpdate(BaseModel):
+    # Lista vacía: usuario global, válido en todas las sedes
+    site_ids: List[int]
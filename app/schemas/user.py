@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, ConfigDict, field_validator
-from typing import Optional
+from typing import List, Optional
 import re
 from datetime import datetime
 from app.core.validation_utils import InputValidator
@@ -88,8 +88,19 @@ class UserUpdate(BaseModel):
 class User(UserBase):
     id: int
     is_superuser: bool
-    fingerprint_template: Optional[str] = None
+    has_fingerprint: bool = False
+    fingerprint_quality: Optional[int] = None
+    fingerprint_enrolled_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# Página de usuarios para el listado administrativo
+class UserPage(BaseModel):
+    items: List[User]
+    total: int
+    total_is_estimate: bool = False
+    skip: int
+    limit: int
@@ -0,0 +1,257 @@
+"""
+Exportación columnar de access_log (Parquet o Arrow IPC) para BI y archivo.
+
+Cada fila lleva ya unidas las dimensiones de usuario y lector, así el
+archivo se consulta sin Postgres (DuckDB, pandas, Spark, pyarrow.dataset).
+Los datos se leen mes a mes con un cursor del lado del servidor (yield_per)
+y cada lote se escribe como un row group, de modo que la memoria queda
+acotada por ARCHIVE_BATCH_ROWS y no por el tamaño del historial.
+
+Estructura en disco (particiones estilo Hive, un directorio por mes local):
+
+    <directorio>/month=2025-01/part-<etiqueta>.parquet
+
+export_access_logs() solo escribe; con delete_archived=True además borra
+de access_log las filas de cada mes ya escrito (archivo de meses antiguos):
+exactamente los ids exportados, una vez cerrado el archivo y en lotes de
+batch_rows con un commit por lote, así no hay una transacción gigante ni se
+borra una fila que entró después de leer el mes.
+
+Un archivo de partición nunca se sobrescribe. Al reintentar un trabajo
+(resume_prefix), un mes que ya tiene archivo de un intento anterior no se
+vuelve a exportar: solo se terminan de borrar los ids que ese archivo
+contiene, así un fallo a mitad del borrado no deja un archivo parcial.
+"""
+import glob
+import os
+from array import array
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app.core.timezones import get_zone, local_midnight
+from app.models.access_log import AccessLog, DenialReason
+from app.models.device import Device
+from app.models.user import User
+
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+FORMATS = {FORMAT_PARQUET: ".parquet", FORMAT_ARROW: ".arrow"}
+
+_REASON_CODES = {int(reason): reason.code for reason in DenialReason}
+
+
+def _schema():
+    # pyarrow se importa aquí: es pesado y solo lo usan las exportaciones
+    import pyarrow as pa
+
+    # Las columnas de pocos valores distintos van como diccionario
+    codes = pa.dictionary(pa.int16(), pa.string())
+    return pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("access_type", codes),
+        ("status", codes),
+        ("reason", codes),
+        ("user_id", pa.int32()),
+        ("employee_id", pa.string()),
+        ("full_name", pa.string()),
+        ("device_id", codes),
+        ("device_name", codes),
+        ("device_location", codes),
+    ])
+
+
+def _month_starts(first: date, last: date) -> Iterator[date]:
+    current = first.replace(day=1)
+    while current <= last:
+        yield current
+        current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+
+
+def _local_bounds(month: date, tz: ZoneInfo) -> Tuple[datetime, datetime]:
+    """[inicio, fin) del mes en hora local, como instantes con zona"""
+    following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return local_midnight(month, tz), local_midnight(following, tz)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite devuelve fechas sin zona; se guardan en UTC
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def _rows_query(start: datetime, end: datetime):
+    return select(
+        AccessLog.id,
+        AccessLog.timestamp,
+        AccessLog.access_type,
+        AccessLog.status,
+        AccessLog.reason,
+        AccessLog.user_id,
+        User.employee_id,
+        User.full_name,
+        Device.device_id,
+        Device.name.label("device_name"),
+        Device.location.label("device_location"),
+    ).select_from(AccessLog) \
+        .outerjoin(User, AccessLog.user_id == User.id) \
+        .outerjoin(Device, AccessLog.device_pk == Device.id) \
+        .where(AccessLog.timestamp >= start, AccessLog.timestamp < end) \
+        .order_by(AccessLog.timestamp, AccessLog.id)
+
+
+def _record_batch(rows: List, schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    columns[1] = [_as_utc(moment) for moment in columns[1]]
+    columns[4] = [_REASON_CODES.get(reason) for reason in columns[4]]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+class _PartitionWriter:
+    """Un archivo por mes; se escribe en .tmp y se renombra al cerrarlo"""
+
+    def __init__(self, path: str, file_format: str, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if os.path.exists(path):
+            raise FileExistsError(f"La partición ya existe: {path}")
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if file_format == FORMAT_PARQUET:
+            self._writer = pq.ParquetWriter(self._tmp_path, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(
+                self._tmp_path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+            )
+
+    def write(self, batch) -> None:
+        # En Parquet cada lote es un row group
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+        if os.path.exists(self.path):
+            os.remove(self._tmp_path)
+            raise FileExistsError(f"La partición ya existe: {self.path}")
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._writer.close()
+        os.remove(self._tmp_path)
+
+
+def _read_ids(path: str, file_format: str) -> array:
+    """Ids de access_log contenidos en un archivo de partición"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if file_format == FORMAT_PARQUET:
+        column = pq.read_table(path, columns=["id"]).column("id")
+    else:
+        with pa.memory_map(path) as source:
+            column = pa.ipc.open_file(source).read_all().column("id")
+    return array("q", column.to_pylist())
+
+
+def _previous_parts(directory: str, month: date, prefix: str, file_format: str) -> List[str]:
+    pattern = f"part-{glob.escape(prefix)}-*{FORMATS[file_format]}"
+    return sorted(glob.glob(os.path.join(glob.escape(directory), f"month={month:%Y-%m}", pattern)))
+
+
+def _delete_ids(db: Session, ids: array, batch_rows: int) -> None:
+    """Borra las filas exportadas en lotes, confirmando cada uno"""
+    for offset in range(0, len(ids), batch_rows):
+        db.execute(
+            delete(AccessLog)
+            .where(AccessLog.id.in_(ids[offset:offset + batch_rows].tolist()))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def access_log_months(db: Session, start_date: Optional[date] = None,
+                      end_date: Optional[date] = None) -> List[date]:
+    """Meses (día 1) con registros entre start_date y end_date, en hora local"""
+    tz = get_zone()
+    if start_date is None or end_date is None:
+        first, last = db.query(func.min(AccessLog.timestamp), func.max(AccessLog.timestamp)).one()
+        if first is None:
+            return []
+        start_date = start_date or _as_utc(first).astimezone(tz).date()
+        end_date = end_date or _as_utc(last).astimezone(tz).date()
+    return list(_month_starts(start_date, end_date))
+
+
+def export_access_logs(
+        db: Session,
+        directory: str,
+        months: List[date],
+        file_format: str = FORMAT_PARQUET,
+        label: str = "0",
+        batch_rows: int = 50000,
+        delete_archived: bool = False,
+        on_month: Optional[Callable[[int, int], None]] = None,
+        resume_prefix: Optional[str] = None
+) -> Dict:
+    """
+    Escribe los meses indicados en directory y retorna el manifiesto
+    ({"files": [{"month", "path", "rows"}], "rows"}). on_month(i, filas)
+    se llama al terminar cada mes; puede lanzar JobCancelled. Con
+    resume_prefix, los meses con un part-<resume_prefix>-* ya escrito se
+    toman de ese archivo en lugar de exportarse de nuevo.
+    """
+    schema = _schema()
+    tz = get_zone()
+    files = []
+    for position, month in enumerate(months):
+        start, end = _local_bounds(month, tz)
+        path = os.path.join(directory, f"month={month:%Y-%m}", f"part-{label}{FORMATS[file_format]}")
+        previous = _previous_parts(directory, month, resume_prefix, file_format) if resume_prefix else []
+        if previous:
+            rows = 0
+            for previous_path in previous:
+                ids = _read_ids(previous_path, file_format)
+                rows += len(ids)
+                if delete_archived:
+                    # Los ya borrados no coinciden: el borrado es idempotente
+                    _delete_ids(db, ids, batch_rows)
+                files.append({"month": f"{month:%Y-%m}", "path": previous_path, "rows": len(ids)})
+            if on_month is not None:
+                on_month(position, rows)
+            continue
+        writer: Optional[_PartitionWriter] = None
+        rows = 0
+        exported = array("q")
+        try:
+            # Cursor del lado del servidor: llegan lotes de batch_rows filas
+            result = db.execute(_rows_query(start, end).execution_options(yield_per=batch_rows))
+            for partition in result.partitions():
+                if writer is None:
+                    writer = _PartitionWriter(path, file_format, schema)
+                writer.write(_record_batch(partition, schema))
+                rows += len(partition)
+                if delete_archived:
+                    exported.extend(row.id for row in partition)
+            result.close()
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        if writer is not None:
+            writer.close()
+            files.append({"month": f"{month:%Y-%m}", "path": path, "rows": rows})
+            db.commit()
+            if delete_archived:
+                _delete_ids(db, exported, batch_rows)
+        if on_month is not None:
+            on_month(position, rows)
+    return {"files": files, "rows": sum(f["rows"] for f in files)}
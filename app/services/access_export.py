@@ -0,0 +1,83 @@
+"""
+Exportación de registros de acceso a PDF.
+
+La usan la ruta /access/admin/export-pdf (en línea) y el job
+access_logs_pdf (en segundo plano, fuera del tráfico de puertas).
+"""
+from datetime import date, timezone
+from typing import Callable, List, Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy.orm import Query, Session
+from app.models.access_log import AccessLog
+from app.models.device import Device
+from app.models.user import User
+from app.services.access_log_queries import apply_date_range
+
+
+def access_logs_export_query(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                             employee_id: Optional[str] = None, full_name: Optional[str] = None,
+                             tz: Optional[ZoneInfo] = None) -> Query:
+    """Solo las columnas que se imprimen en el PDF"""
+    query = db.query(
+        AccessLog.timestamp,
+        User.full_name,
+        AccessLog.access_type,
+        Device.device_id,
+        AccessLog.status
+    ).select_from(AccessLog).join(User, AccessLog.user_id == User.id) \
+        .outerjoin(Device, AccessLog.device_pk == Device.id)
+    query = apply_date_range(query, start_date, end_date, tz)
+
+    if employee_id:
+        query = query.filter(User.employee_id == employee_id)
+    if full_name:
+        query = query.filter(User.full_name.ilike(f"%{full_name}%"))
+    return query.order_by(AccessLog.timestamp.desc())
+
+
+def _local(moment, tz: ZoneInfo):
+    # Sin zona (SQLite) se toma como UTC, que es como se guarda
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).astimezone(tz)
+
+
+def write_access_logs_pdf(path: str, logs: List, tz: ZoneInfo,
+                          on_row: Optional[Callable[[int], None]] = None) -> int:
+    """Escribe la tabla de registros en path (horas locales de tz); on_row recibe cada índice procesado"""
+    # reportlab se importa aquí: es pesado y solo lo usa la exportación
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+    doc = SimpleDocTemplate(path, pagesize=letter)
+    elements = []
+
+    # Crear tabla
+    data = [['Fecha', 'Usuario', 'Tipo', 'Dispositivo', 'Estado']]
+    for position, log in enumerate(logs):
+        data.append([
+            _local(log.timestamp, tz).strftime('%Y-%m-%d %H:%M:%S'),
+            log.full_name,
+            log.access_type,
+            log.device_id,
+            log.status
+        ])
+        if on_row is not None:
+            on_row(position)
+
+    table = Table(data)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(table)
+    doc.build(elements)
+    return len(logs)
@@ -0,0 +1,225 @@
+"""
+Feed incremental de access_log para sistemas que sincronizan (nómina, SIEM).
+
+El consumidor guarda el cursor (último id recibido) y pide lo posterior;
+con wait > 0 la petición espera hasta que haya eventos nuevos (long-poll).
+
+Los ids salen de una secuencia y una transacción puede confirmar un id
+menor después de que otra confirmó uno mayor. Para no saltarse esas filas
+el feed solo entrega ids hasta el horizonte. Cada muestra guarda max(id)
+junto con el xmax de la instantánea de Postgres (el primer xid aún no
+asignado); ese max(id) pasa a ser el horizonte cuando el xmin actual lo
+alcanza, es decir, cuando terminó toda transacción que estaba en curso al
+tomar la muestra, por larga que fuera. Además deben pasar settle_seconds,
+que cubren el instante entre el nextval y la asignación del xid. Mientras
+una transacción de escritura siga abierta el horizonte no avanza. El xmin
+es de todo el cluster: cualquier transacción larga (un reporte, una
+migración, una sesión "idle in transaction"), aunque no toque access_log,
+detiene el feed. Si el horizonte lleva stall_warning segundos bloqueado se
+registra una advertencia y el readiness lo muestra en access_feed. En otras
+bases (SQLite en pruebas) solo se aplica settle_seconds.
+
+Una tarea por proceso consulta el estado cada poll_interval mientras hay
+consumidores esperando; las esperas comparten esa consulta en lugar de
+hacer cada una la suya.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.access_log import AccessLog, DenialReason
+from app.models.device import Device
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Orden de los valores de cada evento en la respuesta
+FEED_FIELDS = (
+    "id", "timestamp", "user_id", "employee_id", "access_type", "status", "reason", "device_id"
+)
+
+_REASON_CODES = {int(reason): reason.code for reason in DenialReason}
+
+# max(id) con el xmin y el xmax de la misma instantánea (Postgres 13+)
+_STATE_QUERY = text(
+    "SELECT (SELECT max(id) FROM access_log), "
+    "pg_snapshot_xmin(pg_current_snapshot())::text::bigint, "
+    "pg_snapshot_xmax(pg_current_snapshot())::text::bigint"
+)
+
+
+class AccessFeed:
+    def __init__(self, session_factory: Callable[[], Session], poll_interval: float = 0.5,
+                 settle_seconds: float = 1.0, stall_warning: float = 60.0):
+        self._session_factory = session_factory
+        self._poll_interval = poll_interval
+        self._settle_seconds = settle_seconds
+        self._stall_warning = stall_warning
+        # Desde cuándo la muestra más antigua espera solo al xmin
+        self._blocked_since: Optional[float] = None
+        self._stall_warned = False
+        # (momento, max id, xmax) de las consultas aún no asentadas
+        self._samples: Deque[Tuple[float, int, Optional[int]]] = deque()
+        self.horizon = 0
+        self._waiters = 0
+        self._changed: Optional[asyncio.Condition] = None
+        self._demand: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _state(self) -> Tuple[int, Optional[int], Optional[int]]:
+        """max(id) de access_log y xmin/xmax de la misma instantánea (None fuera de Postgres)"""
+        db = self._session_factory()
+        try:
+            if db.get_bind().dialect.name != "postgresql":
+                return db.execute(select(func.max(AccessLog.id))).scalar() or 0, None, None
+            # Una sola sentencia: max(id) y la instantánea se leen juntos
+            max_id, xmin, xmax = db.execute(_STATE_QUERY).one()
+            return max_id or 0, xmin, xmax
+        finally:
+            db.close()
+
+    def _advance(self, now: float, xmin: Optional[int]) -> bool:
+        """Mueve el horizonte al último max id asentado (ver el docstring del módulo)"""
+        advanced = False
+        while self._samples and now - self._samples[0][0] >= self._settle_seconds:
+            _, max_id, xmax = self._samples[0]
+            if xmax is not None and (xmin is None or xmin < xmax):
+                self._note_blocked(now, xmin, xmax)
+                break
+            if self._stall_warned:
+                logger.info(f"Feed de access_log reanudado tras {now - self._blocked_since:.0f} s bloqueado")
+            self._blocked_since = None
+            self._stall_warned = False
+            self._samples.popleft()
+            if max_id > self.horizon:
+                self.horizon = max_id
+                advanced = True
+        return advanced
+
+    def _note_blocked(self, now: float, xmin: Optional[int], xmax: int) -> None:
+        if self._blocked_since is None:
+            self._blocked_since = now
+        elif not self._stall_warned and now - self._blocked_since >= self._stall_warning:
+            self._stall_warned = True
+            logger.warning(
+                f"Feed de access_log detenido hace {now - self._blocked_since:.0f} s: una transacción "
+                f"abierta (xmin {xmin} < {xmax}) impide avanzar el horizonte; revisar pg_stat_activity"
+            )
+
+    def status(self) -> Dict:
+        """Horizonte y segundos que lleva bloqueado por una transacción abierta (None si no lo está)"""
+        stalled = None
+        if self._blocked_since is not None:
+            stalled = round(time.monotonic() - self._blocked_since, 1)
+        return {"horizon": self.horizon, "pending_samples": len(self._samples), "stalled_seconds": stalled}
+
+    async def sample(self) -> None:
+        max_id, xmin, xmax = await run_in_threadpool(self._state)
+        now = time.monotonic()
+        if max_id > self.horizon and (not self._samples or max_id > self._samples[-1][1]):
+            self._samples.append((now, max_id, xmax))
+        if self._advance(now, xmin):
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _run(self) -> None:
+        while True:
+            await self._demand.wait()
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.error(f"No se pudo consultar el último id de access_log: {e}")
+            await asyncio.sleep(self._poll_interval)
+            if not self._waiters and not self._samples:
+                self._demand.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._changed = asyncio.Condition()
+            self._demand = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait_for(self, cursor: int, timeout: float) -> int:
+        """Horizonte actual; si no pasa de cursor espera hasta timeout segundos"""
+        self.start()
+        self._demand.set()
+        if self.horizon > cursor or timeout <= 0:
+            return self.horizon
+        self._waiters += 1
+        try:
+            async with self._changed:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.horizon > cursor), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters -= 1
+        return self.horizon
+
+    def read(self, cursor: int, horizon: int, limit: int) -> Dict:
+        """Eventos con cursor < id <= horizon, en orden de id, como listas de FEED_FIELDS"""
+        db = self._session_factory()
+        try:
+            rows = db.execute(
+                select(
+                    AccessLog.id,
+                    AccessLog.timestamp,
+                    AccessLog.user_id,
+                    User.employee_id,
+                    AccessLog.access_type,
+                    AccessLog.status,
+                    AccessLog.reason,
+                    Device.device_id,
+                ).select_from(AccessLog)
+                .outerjoin(User, AccessLog.user_id == User.id)
+                .outerjoin(Device, AccessLog.device_pk == Device.id)
+                .where(AccessLog.id > cursor, AccessLog.id <= horizon)
+                .order_by(AccessLog.id)
+                .limit(limit)
+            ).all()
+        finally:
+            db.close()
+        events: List[list] = [list(row) for row in rows]
+        for event in events:
+            event[6] = _REASON_CODES.get(event[6])
+        full = len(events) == limit
+        # Sin página llena no hay más filas hasta el horizonte (los huecos se saltan)
+        next_cursor = events[-1][0] if full else max(horizon, cursor)
+        return {
+            "next_cursor": next_cursor,
+            "has_more": next_cursor < horizon,
+            "fields": FEED_FIELDS,
+            "events": events,
+        }
+
+
+_access_feed: Optional[AccessFeed] = None
+
+
+def get_access_feed() -> AccessFeed:
+    """Instancia única por proceso; el lifespan arranca y detiene su tarea"""
+    global _access_feed
+    if _access_feed is None:
+        _access_feed = AccessFeed(
+            SessionLocal,
+            poll_interval=settings.ACCESS_FEED_POLL_SECONDS,
+            settle_seconds=settings.ACCESS_FEED_SETTLE_SECONDS,
+            stall_warning=settings.ACCESS_FEED_STALL_WARNING_SECONDS
+        )
+    return _access_feed
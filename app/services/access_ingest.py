@@ -0,0 +1,97 @@
+"""
+Ingesta en lote de eventos de acceso enviados por lectores que estuvieron
+sin conexión.
+
+Cada evento trae una clave de idempotencia; la restricción única
+(device_pk, idempotency_key) descarta los reenvíos con ON CONFLICT DO
+NOTHING, de modo que el lector puede repetir un lote completo sin duplicar
+registros. La inserción se hace con un único executemany (SQLAlchemy lo
+agrupa en sentencias INSERT ... VALUES de varias filas con RETURNING).
+"""
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from app.core.timezones import as_aware, get_zone
+from app.db.upsert import insert_ignoring_conflicts
+from app.models.access_log import AccessLog
+from app.models.site import Site, SiteDevice
+from app.models.user import User
+from app.schemas.access_log import AccessEventBatchResult, AccessEventIn, AccessEventResult
+from app.services.device_cache import get_device_cache
+
+# Límite de parámetros por IN (...) al buscar los duplicados existentes
+_LOOKUP_CHUNK = 1000
+
+
+def _insert_ignoring_duplicates(db: Session):
+    return insert_ignoring_conflicts(db, AccessLog, ["device_pk", "idempotency_key"]) \
+        .returning(AccessLog.id, AccessLog.idempotency_key)
+
+
+def ingest_access_events(db: Session, device_id: str, events: List[AccessEventIn]) -> AccessEventBatchResult:
+    """Inserta los eventos nuevos y retorna el resultado de cada uno, en orden"""
+    device_pk = get_device_cache().id_for(db, device_id)
+    user_ids = {event.user_id for event in events}
+    known_users = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))} if user_ids else set()
+    # Las horas sin zona del reloj del lector son hora local de su sede
+    tz = None
+    if any(event.timestamp.tzinfo is None for event in events):
+        tz = get_zone(
+            db.query(Site.timezone).join(SiteDevice).filter(SiteDevice.device_id == device_id).scalar()
+        )
+
+    results: List[AccessEventResult] = []
+    # Resultados por clave: el primero inserta, los repetidos del lote son duplicados
+    by_key: Dict[str, List[AccessEventResult]] = defaultdict(list)
+    rows: Dict[str, dict] = {}
+    for event in events:
+        result: AccessEventResult = {
+            "idempotency_key": event.idempotency_key,
+            "result": "rejected",
+            "id": None,
+            "error": None,
+        }
+        results.append(result)
+        if event.user_id not in known_users:
+            result["error"] = "Usuario no encontrado"
+            continue
+        by_key[event.idempotency_key].append(result)
+        rows.setdefault(event.idempotency_key, {
+            "user_id": event.user_id,
+            "access_type": event.access_type,
+            "status": event.status,
+            "timestamp": as_aware(event.timestamp, tz) if tz else event.timestamp,
+            "device_pk": device_pk,
+            "idempotency_key": event.idempotency_key,
+        })
+
+    inserted: Dict[str, int] = {}
+    if rows:
+        for log_id, key in db.execute(_insert_ignoring_duplicates(db), list(rows.values())):
+            inserted[key] = log_id
+
+    # Ids de los eventos que ya existían, para que el lector pueda conciliar
+    existing: Dict[str, int] = {}
+    missing = [key for key in rows if key not in inserted]
+    for start in range(0, len(missing), _LOOKUP_CHUNK):
+        chunk = missing[start:start + _LOOKUP_CHUNK]
+        existing.update(
+            (key, log_id) for key, log_id in db.query(AccessLog.idempotency_key, AccessLog.id)
+            .filter(AccessLog.device_pk == device_pk, AccessLog.idempotency_key.in_(chunk))
+        )
+    db.commit()
+
+    for key, key_results in by_key.items():
+        log_id = inserted.get(key, existing.get(key))
+        for position, result in enumerate(key_results):
+            result["result"] = "created" if position == 0 and key in inserted else "duplicate"
+            result["id"] = log_id
+
+    created = len(inserted)
+    rejected = sum(1 for result in results if result["result"] == "rejected")
+    return {
+        "created": created,
+        "duplicates": len(results) - created - rejected,
+        "rejected": rejected,
+        "results": results,
+    }
@@ -0,0 +1,104 @@
+"""
+Consultas proyectadas sobre access_log.
+
+Seleccionan solo las columnas que devuelven los esquemas de respuesta, de modo
+que los listados no hidratan filas completas de User (hashed_password,
+fingerprint_template) ni repiten el JOIN de la relación.
+"""
+from datetime import date
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import case
+from sqlalchemy.orm import Session, Query
+from app.core.timezones import get_zone, utc_range
+from app.models.access_log import AccessLog, DenialReason
+from app.models.device import Device
+from app.models.user import User
+
+
+# Código del motivo resuelto en SQL, sin convertir fila a fila en Python
+REASON_CODE = case(
+    {reason.value: reason.code for reason in DenialReason},
+    value=AccessLog.reason
+).label("reason")
+
+# Columnas que expone schemas.access_log.AccessLog
+ACCESS_LOG_COLUMNS = (
+    AccessLog.id,
+    AccessLog.user_id,
+    AccessLog.access_type,
+    AccessLog.status,
+    AccessLog.timestamp,
+    Device.device_id.label("device_id"),
+    REASON_CODE,
+)
+
+# Columnas que expone schemas.access_log.UserBase
+USER_SUMMARY_COLUMNS = (
+    User.email.label("user_email"),
+    User.full_name.label("user_full_name"),
+    User.employee_id.label("user_employee_id"),
+)
+
+
+def with_device(query: Query) -> Query:
+    """JOIN con la dimensión device para proyectar el código del lector"""
+    return query.outerjoin(Device, AccessLog.device_pk == Device.id)
+
+
+def access_log_query(db: Session) -> Query:
+    """Consulta de access_log sin datos del usuario"""
+    return with_device(db.query(*ACCESS_LOG_COLUMNS).select_from(AccessLog))
+
+
+def access_log_with_user_query(db: Session, outer: bool = False) -> Query:
+    """
+    Consulta de access_log con el resumen del usuario en un único JOIN.
+    Con outer=True se conservan los registros sin usuario asociado.
+    """
+    query = with_device(db.query(*ACCESS_LOG_COLUMNS, *USER_SUMMARY_COLUMNS).select_from(AccessLog))
+    if outer:
+        return query.outerjoin(User, AccessLog.user_id == User.id)
+    return query.join(User, AccessLog.user_id == User.id)
+
+
+def apply_date_range(
+        query: Query,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        tz: Optional[ZoneInfo] = None
+) -> Query:
+    """
+    Filtra por rango de fechas locales de tz (inclusive; por defecto TIMEZONE)
+    sobre AccessLog.timestamp. Compara el timestamp con los límites en UTC
+    [inicio, fin + 1 día) en lugar de date(timestamp), para que el filtro
+    pueda usar los índices
+    """
+    start, end = utc_range(start_date, end_date, tz or get_zone())
+    if start is not None:
+        query = query.filter(AccessLog.timestamp >= start)
+    if end is not None:
+        query = query.filter(AccessLog.timestamp < end)
+    return query
+
+
+def to_access_log_with_user(row: Any) -> Dict[str, Any]:
+    """Convierte una fila proyectada al formato de AccessLogWithUser"""
+    data = row._mapping
+    user = None
+    if data["user_email"] is not None:
+        user = {
+            "email": data["user_email"],
+            "full_name": data["user_full_name"],
+            "employee_id": data["user_employee_id"],
+        }
+    return {
+        "id": data["id"],
+        "user_id": data["user_id"],
+        "access_type": data["access_type"],
+        "status": data["status"],
+        "timestamp": data["timestamp"],
+        "device_id": data["device_id"],
+        "reason": data["reason"],
+        "user": user,
+    }
@@ -0,0 +1,159 @@
+"""
+Escritura en lote de registros de acceso.
+
+Los intentos denegados pueden llegar en ráfagas (una huella no reconocida
+reintentada, un ataque contra un lector); escribirlos con un commit por
+intento compite por conexiones con la verificación. El writer los acumula
+en memoria y un hilo los inserta con un único executemany cada
+flush_interval segundos o al reunir max_batch filas. El buffer está
+acotado: si la base de datos no da abasto se descartan las filas más
+antiguas y se registra cuántas.
+
+Si el lote viola una restricción (IntegrityError/DataError, p. ej. un
+user_id ya eliminado) se reintenta fila por fila y solo se descartan las
+inválidas: reencolarlo entero bloquearía la escritura para siempre. Otros
+errores (base caída) reencolan el lote, hasta max_retries intentos
+seguidos; después ese lote se descarta.
+"""
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.access_log import AccessLog
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class AccessLogWriter:
+    def __init__(self, session_factory: Callable[[], Session], max_batch: int = 500,
+                 flush_interval: float = 1.0, max_pending: int = 50000, max_retries: int = 30):
+        self._session_factory = session_factory
+        self._max_retries = max_retries
+        self._failures = 0
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval
+        self._pending: Deque[Dict[str, Any]] = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        """Encola un registro; sin hilo activo (scripts) se escribe de inmediato"""
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(row)
+            full = len(self._pending) >= self._max_batch
+        if not self.is_running:
+            self.flush()
+        elif full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Inserta todo lo pendiente en lotes de max_batch; retorna las filas escritas"""
+        written = 0
+        while True:
+            with self._lock:
+                batch: List[Dict[str, Any]] = [
+                    self._pending.popleft() for _ in range(min(self._max_batch, len(self._pending)))
+                ]
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                logger.warning(f"Buffer de registros de acceso lleno: se descartaron {dropped} registros")
+            if not batch:
+                return written
+            db = self._session_factory()
+            try:
+                db.execute(insert(AccessLog), batch)
+                db.commit()
+                written += len(batch)
+                self._failures = 0
+            except (IntegrityError, DataError) as e:
+                db.rollback()
+                logger.error(f"Lote de {len(batch)} registros de acceso rechazado, se escribe fila por fila: {e}")
+                written += self._write_rows(db, batch)
+            except Exception as e:
+                db.rollback()
+                self._failures += 1
+                if self._failures >= self._max_retries:
+                    logger.error(
+                        f"Se descartan {len(batch)} registros de acceso tras {self._failures} intentos: {e}"
+                    )
+                    self._failures = 0
+                    continue
+                logger.error(f"No se pudieron escribir {len(batch)} registros de acceso: {e}")
+                with self._lock:
+                    # Se reintentan en el próximo ciclo, delante de los nuevos
+                    self._pending.extendleft(reversed(batch))
+                return written
+            finally:
+                db.close()
+
+    @staticmethod
+    def _write_rows(db: Session, batch: List[Dict[str, Any]]) -> int:
+        """Inserta cada fila en su propio savepoint y descarta las que violan restricciones"""
+        written = 0
+        for row in batch:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(AccessLog), [row])
+                written += 1
+            except (IntegrityError, DataError) as e:
+                logger.error(f"Registro de acceso descartado {row}: {e}")
+        db.commit()
+        return written
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo y escribe lo pendiente"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+_access_log_writer: Optional[AccessLogWriter] = None
+
+
+def get_access_log_writer() -> AccessLogWriter:
+    """Instancia única por proceso; el lifespan arranca y detiene su hilo"""
+    global _access_log_writer
+    if _access_log_writer is None:
+        _access_log_writer = AccessLogWriter(
+            SessionLocal,
+            max_batch=settings.ACCESS_LOG_WRITER_MAX_BATCH,
+            flush_interval=settings.ACCESS_LOG_WRITER_FLUSH_SECONDS,
+            max_pending=settings.ACCESS_LOG_WRITER_MAX_PENDING,
+            max_retries=settings.ACCESS_LOG_WRITER_MAX_RETRIES
+        )
+    return _access_log_writer
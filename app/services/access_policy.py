@@ -0,0 +1,259 @@
+"""
+Motor de políticas de acceso compilado en memoria.
+
+Las reglas (horarios, grupos de puertas, festivos y excepciones por usuario)
+se guardan en la base de datos y se compilan a una tabla de bits:
+
+- Los usuarios con el mismo conjunto de reglas comparten un perfil.
+- La semana se divide en franjas de slot_minutes minutos; los festivos
+  usan una fila de franjas propia (weekday 7).
+- Para cada puerta y franja hay un entero cuyo bit p indica si el perfil
+  p tiene acceso.
+
+Así cada decisión es una consulta a diccionario y un desplazamiento de
+bits, sin importar cuántas reglas existan. Las excepciones temporales se
+revisan antes de la tabla. La compilación se repite cuando cambia la
+versión de las políticas (access_policy_state), comprobada como mucho una
+vez cada refresh_interval segundos.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy.orm import Session
+from app.models.access_policy import (
+    HOLIDAY_WEEKDAY, AccessPolicyState, AccessRule, DoorGroup, Holiday, Schedule,
+    ScheduleWindow, UserAccessException, door_group_device, user_access_rule
+)
+
+logger = logging.getLogger(__name__)
+
+# Códigos de motivo de denegación
+REASON_OUTSIDE_SCHEDULE = "outside_schedule"
+REASON_DOOR_NOT_ALLOWED = "door_not_allowed"
+REASON_HOLIDAY = "holiday"
+REASON_EXCEPTION_DENY = "exception_deny"
+REASON_NO_POLICY = "no_policy"
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    reason: Optional[str] = None
+
+
+ALLOW = Decision(True)
+
+
+class _Exception(NamedTuple):
+    starts_at: datetime
+    ends_at: datetime
+    allow: bool
+    doors: Optional[FrozenSet[int]]  # None = todas las puertas
+
+
+class CompiledPolicy:
+    def __init__(self, slot_minutes: int, default_allow: bool):
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = 1440 // slot_minutes
+        self.default_allow = default_allow
+        self.version: Optional[int] = None
+        # Índice de puerta por device_id; los lectores sin grupo usan other_door
+        self.door_index: Dict[str, int] = {}
+        self.other_door = 0
+        self.user_profile: Dict[int, int] = {}
+        # Perfil de los usuarios sin reglas propias (reglas applies_to_all)
+        self.default_profile: Optional[int] = None
+        # allowed[puerta][franja] -> bits de perfiles con acceso
+        self.allowed: List[List[int]] = []
+        # door_mask[puerta] -> bits de perfiles con acceso en alguna franja
+        self.door_mask: List[int] = []
+        self.holidays: FrozenSet[date] = frozenset()
+        self.exceptions: Dict[int, List[_Exception]] = {}
+        self.is_empty = True
+
+    def _slot(self, local: datetime) -> Tuple[int, bool]:
+        is_holiday = local.date() in self.holidays
+        day = HOLIDAY_WEEKDAY if is_holiday else local.weekday()
+        minute = local.hour * 60 + local.minute
+        return day * self.slots_per_day + minute // self.slot_minutes, is_holiday
+
+    def decide(self, user_id: int, device_id: Optional[str], local: datetime) -> Decision:
+        """Decisión para un usuario en un lector a la hora local dada"""
+        door = self.door_index.get(device_id, self.other_door) if device_id else self.other_door
+
+        for exc in self.exceptions.get(user_id, ()):
+            if exc.starts_at <= local < exc.ends_at and (exc.doors is None or door in exc.doors):
+                return ALLOW if exc.allow else Decision(False, REASON_EXCEPTION_DENY)
+
+        if self.is_empty:
+            return ALLOW if self.default_allow else Decision(False, REASON_NO_POLICY)
+        profile = self.user_profile.get(user_id, self.default_profile)
+        if profile is None:
+            return ALLOW if self.default_allow else Decision(False, REASON_NO_POLICY)
+
+        bit = 1 << profile
+        slot, is_holiday = self._slot(local)
+        if self.allowed[door][slot] & bit:
+            return ALLOW
+        if not self.door_mask[door] & bit:
+            return Decision(False, REASON_DOOR_NOT_ALLOWED)
+        return Decision(False, REASON_HOLIDAY if is_holiday else REASON_OUTSIDE_SCHEDULE)
+
+
+def _iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _current_version(db: Session) -> int:
+    state = db.query(AccessPolicyState.version).filter(AccessPolicyState.id == 1).first()
+    return state[0] if state else 0
+
+
+def bump_policy_version(db: Session) -> None:
+    """Marca las políticas como modificadas; se confirma con la transacción del llamador"""
+    state = db.query(AccessPolicyState).filter(AccessPolicyState.id == 1).with_for_update().first()
+    if state is None:
+        db.add(AccessPolicyState(id=1, version=1))
+    else:
+        state.version += 1
+
+
+def compile_policy(db: Session, slot_minutes: int, default_allow: bool, tz: ZoneInfo) -> CompiledPolicy:
+    """Lee las políticas y construye la tabla de bits"""
+    compiled = CompiledPolicy(slot_minutes, default_allow)
+    compiled.version = _current_version(db)
+    slots_per_day = compiled.slots_per_day
+    week_slots = (HOLIDAY_WEEKDAY + 1) * slots_per_day
+    all_slots = (1 << week_slots) - 1
+
+    # Horario -> bits de franjas permitidas
+    schedule_slots: Dict[int, int] = {}
+    for schedule_id, weekday, start, end in db.query(
+            ScheduleWindow.schedule_id, ScheduleWindow.weekday,
+            ScheduleWindow.start_minute, ScheduleWindow.end_minute
+    ):
+        first = weekday * slots_per_day + start // slot_minutes
+        last = weekday * slots_per_day + -(-end // slot_minutes)  # techo
+        span = ((1 << (last - first)) - 1) << first
+        schedule_slots[schedule_id] = schedule_slots.get(schedule_id, 0) | span
+    # Horarios sin franjas no permiten nada
+    for (schedule_id,) in db.query(Schedule.id):
+        schedule_slots.setdefault(schedule_id, 0)
+
+    # Puertas: una por device_id agrupado, más "otras" para los lectores sin grupo
+    group_doors: Dict[int, Set[int]] = {gid: set() for (gid,) in db.query(DoorGroup.id)}
+    for group_id, device_id in db.query(door_group_device.c.door_group_id, door_group_device.c.device_id):
+        door = compiled.door_index.setdefault(device_id, len(compiled.door_index))
+        group_doors[group_id].add(door)
+    compiled.other_door = len(compiled.door_index)
+    door_count = compiled.other_door + 1
+    every_door = frozenset(range(door_count))
+
+    # Regla -> (puertas, franjas)
+    rules: Dict[int, Tuple[FrozenSet[int], int]] = {}
+    general_rules: Set[int] = set()
+    for rule_id, schedule_id, group_id, applies_to_all in db.query(
+            AccessRule.id, AccessRule.schedule_id, AccessRule.door_group_id, AccessRule.applies_to_all
+    ):
+        doors = every_door if group_id is None else frozenset(group_doors.get(group_id, ()))
+        slots = all_slots if schedule_id is None else schedule_slots.get(schedule_id, 0)
+        rules[rule_id] = (doors, slots)
+        if applies_to_all:
+            general_rules.add(rule_id)
+
+    # Perfiles: conjuntos de reglas distintos
+    user_rules: Dict[int, Set[int]] = {}
+    for user_id, rule_id in db.query(user_access_rule.c.user_id, user_access_rule.c.rule_id):
+        user_rules.setdefault(user_id, set(general_rules)).add(rule_id)
+    profiles: Dict[FrozenSet[int], int] = {}
+    for user_id, rule_ids in user_rules.items():
+        compiled.user_profile[user_id] = profiles.setdefault(frozenset(rule_ids), len(profiles))
+    if general_rules:
+        compiled.default_profile = profiles.setdefault(frozenset(general_rules), len(profiles))
+
+    compiled.allowed = [[0] * week_slots for _ in range(door_count)]
+    compiled.door_mask = [0] * door_count
+    for rule_ids, profile in profiles.items():
+        bit = 1 << profile
+        door_slots: Dict[int, int] = {}
+        for rule_id in rule_ids:
+            doors, slots = rules[rule_id]
+            for door in doors:
+                door_slots[door] = door_slots.get(door, 0) | slots
+        for door, slots in door_slots.items():
+            row = compiled.allowed[door]
+            for slot in _iter_bits(slots):
+                row[slot] |= bit
+            if slots:
+                compiled.door_mask[door] |= bit
+    compiled.is_empty = not rules
+
+    compiled.holidays = frozenset(d for (d,) in db.query(Holiday.date))
+
+    now = datetime.now(tz)
+    for user_id, effect, group_id, starts_at, ends_at in db.query(
+            UserAccessException.user_id, UserAccessException.effect, UserAccessException.door_group_id,
+            UserAccessException.starts_at, UserAccessException.ends_at
+    ).filter(UserAccessException.ends_at > now):
+        # Se comparan en hora local sin zona, igual que la hora de la decisión
+        starts_at = starts_at.astimezone(tz).replace(tzinfo=None) if starts_at.tzinfo else starts_at
+        ends_at = ends_at.astimezone(tz).replace(tzinfo=None) if ends_at.tzinfo else ends_at
+        doors = None if group_id is None else frozenset(group_doors.get(group_id, ()))
+        compiled.exceptions.setdefault(user_id, []).append(
+            _Exception(starts_at, ends_at, effect == "allow", doors)
+        )
+    return compiled
+
+
+class AccessPolicyEngine:
+    def __init__(self, slot_minutes: int = 15, default_allow: bool = True,
+                 timezone: str = "America/Bogota", refresh_interval: float = 10.0):
+        if 1440 % slot_minutes:
+            raise ValueError("slot_minutes debe dividir el día en franjas exactas")
+        self._slot_minutes = slot_minutes
+        self._default_allow = default_allow
+        self._tz = ZoneInfo(timezone)
+        self._refresh_interval = refresh_interval
+        self._policy = CompiledPolicy(slot_minutes, default_allow)
+        self._lock = threading.Lock()
+        self.checked_at = 0.0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._policy.version is not None
+
+    def load(self, db: Session) -> None:
+        started = time.perf_counter()
+        policy = compile_policy(db, self._slot_minutes, self._default_allow, self._tz)
+        with self._lock:
+            self._policy = policy
+            self.checked_at = time.monotonic()
+        logger.info(
+            f"Políticas de acceso compiladas (versión {policy.version}): "
+            f"{len(policy.user_profile)} usuarios, {len(policy.door_index)} puertas "
+            f"en {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Recompila si la versión de las políticas cambió"""
+        if self.is_loaded and time.monotonic() - self.checked_at < self._refresh_interval:
+            return
+        if not self.is_loaded or _current_version(db) != self._policy.version:
+            self.load(db)
+        else:
+            self.checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self.checked_at = 0.0
+
+    def decide(self, user_id: int, device_id: Optional[str], at: Optional[datetime] = None) -> Decision:
+        """Decisión O(1) con la política compilada vigente"""
+        local = (at or datetime.now(self._tz))
+        if local.tzinfo is not None:
+            local = local.astimezone(self._tz).replace(tzinfo=None)
+        return self._policy.decide(user_id, device_id, local)
@@ -0,0 +1,315 @@
+"""
+Detección de anomalías sobre el flujo de accesos.
+
+Cada registro nuevo de access_log pasa por observe(), que mantiene ventanas
+deslizantes en memoria y emite alertas. Los eventos no llegan desde las
+rutas sino del feed de access_log (app.services.access_feed), en orden de
+id: así cada worker procesa todos los accesos, incluidos los que atendió
+otro worker, y todos llegan a las mismas ventanas y alertas. Al arrancar se
+releen los accesos de las últimas session_hours para poblar las ventanas.
+
+- impossible_travel: accesos exitosos del mismo usuario en lectores de
+  sedes distintas con menos de travel_seconds entre ellos.
+- denial_burst: burst_count denegaciones en un mismo lector dentro de
+  burst_seconds.
+- after_hours: entradas exitosas fuera de [workday_start_hour, workday_end_hour).
+- exit_without_entry: una salida cuyo acceso exitoso anterior conocido fue
+  otra salida o una entrada de hace más de session_hours. Sin historial
+  del usuario (p. ej. tras reiniciar) no se alerta.
+
+Las ventanas son buffers circulares (deque con maxlen) por usuario y por
+lector, así que cada evento cuesta unos pocos microsegundos y la memoria
+queda acotada; los lectores seguidos se limitan a max_devices (se descarta
+el de denegación más antigua). Un evento anterior al último conocido de su
+usuario o lector (p. ej. un lote tardío de la ingesta) solo se evalúa para
+after_hours: no entra en las ventanas ni se compara con ellas.
+
+replay() pasa eventos históricos por un detector nuevo con otros umbrales,
+sin tocar el del proceso, para ajustarlos.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.access_log import AccessLog
+from app.services.access_feed import AccessFeed, get_access_feed
+from app.services.fingerprint_service import get_fingerprint_service
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ALERT_IMPOSSIBLE_TRAVEL = "impossible_travel"
+ALERT_DENIAL_BURST = "denial_burst"
+ALERT_AFTER_HOURS = "after_hours"
+ALERT_EXIT_WITHOUT_ENTRY = "exit_without_entry"
+
+ALERT_KINDS = (ALERT_IMPOSSIBLE_TRAVEL, ALERT_DENIAL_BURST, ALERT_AFTER_HOURS, ALERT_EXIT_WITHOUT_ENTRY)
+
+
+class AccessEvent(NamedTuple):
+    user_id: Optional[int]
+    device_id: Optional[str]
+    access_type: str
+    status: str
+    timestamp: datetime
+
+
+class Alert(NamedTuple):
+    kind: str
+    user_id: Optional[int]
+    device_id: Optional[str]
+    timestamp: datetime
+    detail: str
+
+
+class AnomalyThresholds(NamedTuple):
+    travel_seconds: int = 300
+    burst_count: int = 5
+    burst_seconds: int = 60
+    workday_start_hour: int = 6
+    workday_end_hour: int = 20
+    session_hours: int = 16
+    user_history: int = 8
+
+    @classmethod
+    def from_settings(cls) -> "AnomalyThresholds":
+        return cls(
+            travel_seconds=settings.ANOMALY_TRAVEL_SECONDS,
+            burst_count=settings.ANOMALY_DENIAL_BURST_COUNT,
+            burst_seconds=settings.ANOMALY_DENIAL_BURST_SECONDS,
+            workday_start_hour=settings.ANOMALY_WORKDAY_START_HOUR,
+            workday_end_hour=settings.ANOMALY_WORKDAY_END_HOUR,
+            session_hours=settings.ANOMALY_SESSION_HOURS,
+            user_history=settings.ANOMALY_USER_HISTORY,
+        )
+
+
+class AnomalyDetector:
+    def __init__(self, thresholds: AnomalyThresholds,
+                 site_of: Callable[[Optional[str]], Optional[int]] = lambda device_id: None,
+                 timezone: str = "America/Bogota", max_alerts: int = 1000, max_devices: int = 10000):
+        self.thresholds = thresholds
+        self._site_of = site_of
+        self._tz = ZoneInfo(timezone)
+        self._travel = timedelta(seconds=thresholds.travel_seconds)
+        self._burst = timedelta(seconds=thresholds.burst_seconds)
+        self._session = timedelta(hours=thresholds.session_hours)
+        # Accesos exitosos recientes por usuario
+        self._users: Dict[int, Deque[AccessEvent]] = {}
+        # Momentos de las denegaciones recientes por lector
+        self._denials: "OrderedDict[Optional[str], Deque[datetime]]" = OrderedDict()
+        self._max_devices = max_devices
+        self._alerts: Deque[Alert] = deque(maxlen=max_alerts)
+        self._counts: Counter = Counter()
+        self._events = 0
+        self._elapsed_ns = 0
+        self._lock = threading.Lock()
+
+    def _local(self, moment: datetime) -> datetime:
+        # Se compara en hora local sin zona, igual que el motor de políticas
+        return moment.astimezone(self._tz).replace(tzinfo=None) if moment.tzinfo else moment
+
+    def _alert(self, kind: str, event: AccessEvent, at: datetime, detail: str) -> Alert:
+        alert = Alert(kind, event.user_id, event.device_id, at, detail)
+        self._alerts.append(alert)
+        self._counts[kind] += 1
+        return alert
+
+    def _check_denial(self, event: AccessEvent, at: datetime) -> List[Alert]:
+        window = self._denials.get(event.device_id)
+        if window is None:
+            window = self._denials[event.device_id] = deque(maxlen=self.thresholds.burst_count)
+            if len(self._denials) > self._max_devices:
+                self._denials.popitem(last=False)
+        elif window and at < window[-1]:
+            return []
+        self._denials.move_to_end(event.device_id)
+        window.append(at)
+        if len(window) == window.maxlen and at - window[0] <= self._burst:
+            seconds = (at - window[0]).total_seconds()
+            window.clear()  # Una alerta por ráfaga
+            return [self._alert(
+                ALERT_DENIAL_BURST, event, at, f"{self.thresholds.burst_count} denegaciones en {seconds:.0f} s"
+            )]
+        return []
+
+    def _check_success(self, event: AccessEvent, at: datetime) -> List[Alert]:
+        alerts: List[Alert] = []
+        thresholds = self.thresholds
+        if event.access_type == "entry" and not thresholds.workday_start_hour <= at.hour < thresholds.workday_end_hour:
+            alerts.append(self._alert(ALERT_AFTER_HOURS, event, at, f"Entrada a las {at:%H:%M}"))
+        if event.user_id is None:
+            return alerts
+
+        history = self._users.get(event.user_id)
+        if history is None:
+            history = self._users[event.user_id] = deque(maxlen=thresholds.user_history)
+        elif history and at < history[-1].timestamp:
+            # Llegó tarde: compararlo con accesos posteriores daría intervalos negativos
+            return alerts
+        elif history:
+            site = self._site_of(event.device_id)
+            if site is not None:
+                for previous in reversed(history):
+                    if at - previous.timestamp > self._travel:
+                        break
+                    previous_site = self._site_of(previous.device_id)
+                    if previous_site is not None and previous_site != site:
+                        seconds = (at - previous.timestamp).total_seconds()
+                        alerts.append(self._alert(
+                            ALERT_IMPOSSIBLE_TRAVEL, event, at,
+                            f"{previous.device_id} -> {event.device_id} en {seconds:.0f} s"
+                        ))
+                        break
+            last = history[-1]
+            if event.access_type == "exit" and (
+                    last.access_type == "exit" or at - last.timestamp > self._session):
+                alerts.append(self._alert(
+                    ALERT_EXIT_WITHOUT_ENTRY, event, at,
+                    f"Acceso anterior: {last.access_type} a las {last.timestamp:%Y-%m-%d %H:%M}"
+                ))
+        history.append(event._replace(timestamp=at))
+        return alerts
+
+    def observe(self, event: AccessEvent) -> List[Alert]:
+        """Procesa un acceso y retorna las alertas que genera"""
+        started = time.perf_counter_ns()
+        at = self._local(event.timestamp)
+        with self._lock:
+            if event.status == "denied":
+                alerts = self._check_denial(event, at)
+            elif event.status == "success":
+                alerts = self._check_success(event, at)
+            else:
+                alerts = []
+            self._events += 1
+            self._elapsed_ns += time.perf_counter_ns() - started
+        return alerts
+
+    def observe_many(self, events: Iterable[AccessEvent]) -> int:
+        """Procesa eventos en orden cronológico; retorna cuántas alertas generaron"""
+        return sum(len(self.observe(event)) for event in sorted(events, key=lambda e: self._local(e.timestamp)))
+
+    def alerts(self, kind: Optional[str] = None, limit: int = 100) -> List[Alert]:
+        """Alertas más recientes primero"""
+        with self._lock:
+            alerts = list(self._alerts)
+        selected = [a for a in reversed(alerts) if kind is None or a.kind == kind]
+        return selected[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "events": self._events,
+                "alerts": {kind: self._counts[kind] for kind in ALERT_KINDS},
+                "tracked_users": len(self._users),
+                "tracked_devices": len(self._denials),
+                "avg_event_us": round(self._elapsed_ns / self._events / 1000, 2) if self._events else 0.0,
+            }
+
+
+def replay(events: Iterable[AccessEvent], thresholds: AnomalyThresholds,
+           site_of: Callable[[Optional[str]], Optional[int]], max_alerts: int = 1000) -> AnomalyDetector:
+    """Procesa eventos históricos (ya ordenados) con un detector nuevo"""
+    detector = AnomalyDetector(thresholds, site_of, settings.TIMEZONE, max_alerts)
+    for event in events:
+        detector.observe(event)
+    return detector
+
+
+class DetectorFeed:
+    """Tarea por proceso que pasa al detector los accesos del feed de access_log"""
+
+    def __init__(self, detector: AnomalyDetector, feed: AccessFeed,
+                 session_factory: Callable[[], Session], batch_size: int = 1000, wait: float = 30.0):
+        self._detector = detector
+        self._feed = feed
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._wait = wait
+        self._task: Optional[asyncio.Task] = None
+        self.cursor = 0
+
+    def _start_cursor(self) -> int:
+        """Id previo al primer acceso de las últimas session_hours (o el último id)"""
+        cutoff = datetime.now().astimezone() - timedelta(hours=self._detector.thresholds.session_hours)
+        db = self._session_factory()
+        try:
+            first = db.execute(select(func.min(AccessLog.id)).where(AccessLog.timestamp >= cutoff)).scalar()
+            if first is not None:
+                return first - 1
+            return db.execute(select(func.max(AccessLog.id))).scalar() or 0
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        self.cursor = await run_in_threadpool(self._start_cursor)
+        while True:
+            try:
+                horizon = await self._feed.wait_for(self.cursor, self._wait)
+                if horizon <= self.cursor:
+                    continue
+                page = await run_in_threadpool(self._feed.read, self.cursor, horizon, self._batch_size)
+                # Campos en el orden de FEED_FIELDS
+                self._detector.observe_many(
+                    AccessEvent(user_id, device_id, access_type, status, timestamp)
+                    for _, timestamp, user_id, _, access_type, status, _, device_id in page["events"]
+                )
+                self.cursor = page["next_cursor"]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"No se pudieron leer accesos para el detector de anomalías: {e}")
+                await asyncio.sleep(self._wait / 10)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_anomaly_detector: Optional[AnomalyDetector] = None
+_detector_feed: Optional[DetectorFeed] = None
+
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """Instancia única por proceso; las sedes se toman del índice de templates"""
+    global _anomaly_detector
+    if _anomaly_detector is None:
+        _anomaly_detector = AnomalyDetector(
+            AnomalyThresholds.from_settings(),
+            site_of=get_fingerprint_service().template_index.site_for_device,
+            timezone=settings.TIMEZONE,
+            max_alerts=settings.ANOMALY_MAX_ALERTS,
+            max_devices=settings.ANOMALY_MAX_DEVICES
+        )
+    return _anomaly_detector
+
+
+def get_detector_feed() -> DetectorFeed:
+    """Instancia única por proceso; el lifespan arranca y detiene su tarea"""
+    global _detector_feed
+    if _detector_feed is None:
+        _detector_feed = DetectorFeed(
+            get_anomaly_detector(), get_access_feed(), SessionLocal,
+            batch_size=settings.ACCESS_FEED_MAX_LIMIT
+        )
+    return _detector_feed
@@ -6,10 +6,10 @@ from datetime import datetime
 
 
 class MockZKTeco:
-    def __init__(self):
+    def __init__(self, device_id: str = "ZKTECO_SIMULATOR_001"):
         self._stored_templates = {}
         self._device_status = True
-        self._device_id = "ZKTECO_SIMULATOR_001"
+        self._device_id = device_id
         # Simulamos una huella "real" que siempre será la misma en verificación
         self._simulation_template = self._generate_template("fixed_simulation_key")
 
@@ -27,6 +27,10 @@ class MockZKTeco:
         """Simula la desconexión del dispositivo"""
         return True
 
+    def ping(self) -> bool:
+        """Simula una comprobación de alcance del dispositivo"""
+        return self._device_status
+
     def get_device_info(self) -> dict:
         """Retorna información simulada del dispositivo"""
         return {
@@ -48,6 +52,10 @@ class MockZKTeco:
             # Para registro, genera una nueva
             return self._generate_template(f"user_template_{datetime.now().timestamp()}")
 
+    def template_quality(self, template: str) -> int:
+        """Simula la puntuación de calidad (0-100) que el lector asigna a una captura"""
+        return 50 + hashlib.sha256(template.encode()).digest()[0] % 51
+
     def verify_fingerprint(self, stored_template: str, current_template: str) -> bool:
         """Simula la verificación de una huella"""
         # Para propósitos de simulación, consideramos válida la huella simulada
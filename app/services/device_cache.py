@@ -0,0 +1,148 @@
+"""
+Caché en proceso del registro de lectores (tabla device).
+
+access_log guarda el lector como id entero; la API sigue recibiendo y
+devolviendo el código (device_id). Este caché traduce en ambos sentidos sin
+consultar la tabla en cada petición y da de alta los lectores nuevos la
+primera vez que aparecen. Las filas de device nunca cambian de id, así que
+esas entradas no caducan; los metadatos (nombre, ubicación, firmware,
+habilitado) sí pueden cambiar y se releen pasados ttl segundos o cuando el
+registro los invalida.
+"""
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+from sqlalchemy import false, select
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.db.upsert import insert_ignoring_conflicts
+from app.models.access_log import AccessLog
+from app.models.device import Device
+
+settings = get_settings()
+
+
+class DeviceInfo(NamedTuple):
+    id: int
+    device_id: str
+    name: Optional[str]
+    location: Optional[str]
+    firmware_version: Optional[str]
+    is_active: bool
+
+
+_INFO_COLUMNS = (
+    Device.id, Device.device_id, Device.name, Device.location, Device.firmware_version, Device.is_active
+)
+
+
+class DeviceCache:
+    def __init__(self, ttl: float = 30.0):
+        self._ttl = ttl
+        self._ids: Dict[str, int] = {}
+        self._codes: Dict[int, str] = {}
+        # id -> (momento de carga, metadatos)
+        self._info: Dict[int, Tuple[float, DeviceInfo]] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, device_id: str, pk: int) -> None:
+        with self._lock:
+            self._ids[device_id] = pk
+            self._codes[pk] = device_id
+
+    def _remember_info(self, info: DeviceInfo) -> DeviceInfo:
+        self._remember(info.device_id, info.id)
+        with self._lock:
+            self._info[info.id] = (time.monotonic(), info)
+        return info
+
+    def load(self, db: Session) -> None:
+        for row in db.query(*_INFO_COLUMNS):
+            self._remember_info(DeviceInfo(*row))
+
+    def id_for(self, db: Session, device_id: Optional[str], create: bool = True) -> Optional[int]:
+        """Id del lector; con create=True lo registra si no existe"""
+        if device_id is None:
+            return None
+        pk = self._ids.get(device_id)
+        if pk is not None:
+            return pk
+        pk = db.query(Device.id).filter(Device.device_id == device_id).scalar()
+        if pk is None:
+            if not create:
+                return None
+            # Transacción propia: el alta no depende del commit del llamador
+            with db.get_bind().connect() as conn:
+                conn.execute(
+                    insert_ignoring_conflicts(conn, Device, ["device_id"]).values(device_id=device_id)
+                )
+                pk = conn.execute(select(Device.id).where(Device.device_id == device_id)).scalar_one()
+                conn.commit()
+        self._remember(device_id, pk)
+        return pk
+
+    def code_for(self, db: Session, pk: Optional[int]) -> Optional[str]:
+        """Código del lector; los registrados por otro proceso se leen una vez"""
+        if pk is None:
+            return None
+        device_id = self._codes.get(pk)
+        if device_id is None:
+            device_id = db.query(Device.device_id).filter(Device.id == pk).scalar()
+            if device_id is not None:
+                self._remember(device_id, pk)
+        return device_id
+
+    def info(self, db: Session, device_id: Optional[str]) -> Optional[DeviceInfo]:
+        """Metadatos del lector (None si no está registrado)"""
+        pk = self.id_for(db, device_id, create=False)
+        if pk is None:
+            return None
+        cached = self._info.get(pk)
+        if cached is not None and time.monotonic() - cached[0] < self._ttl:
+            return cached[1]
+        row = db.query(*_INFO_COLUMNS).filter(Device.id == pk).first()
+        if row is None:
+            self.forget(device_id)
+            return None
+        return self._remember_info(DeviceInfo(*row))
+
+    def summary(self, db: Session, pk: Optional[int]) -> Dict[str, Optional[str]]:
+        """Código, nombre y ubicación de un id de lector, para reportes"""
+        device = self.info(db, self.code_for(db, pk))
+        return {
+            "device_id": device.device_id if device else None,
+            "name": device.name if device else None,
+            "location": device.location if device else None,
+        }
+
+    def invalidate(self, device_id: Optional[str] = None) -> None:
+        """Descarta los metadatos de un lector (o de todos); los ids se conservan"""
+        with self._lock:
+            if device_id is None:
+                self._info.clear()
+            elif device_id in self._ids:
+                self._info.pop(self._ids[device_id], None)
+
+    def forget(self, device_id: str) -> None:
+        """Olvida un lector eliminado del registro"""
+        with self._lock:
+            pk = self._ids.pop(device_id, None)
+            if pk is not None:
+                self._codes.pop(pk, None)
+                self._info.pop(pk, None)
+
+    def filter_for(self, db: Session, device_id: str):
+        """Condición sobre AccessLog.device_pk para un código (falsa si el lector no existe)"""
+        pk = self.id_for(db, device_id, create=False)
+        return AccessLog.device_pk == pk if pk is not None else false()
+
+
+_device_cache: Optional[DeviceCache] = None
+
+
+def get_device_cache() -> DeviceCache:
+    """Instancia única por proceso"""
+    global _device_cache
+    if _device_cache is None:
+        _device_cache = DeviceCache(ttl=settings.DEVICE_CACHE_TTL_SECONDS)
+    return _device_cache
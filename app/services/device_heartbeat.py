@@ -0,0 +1,131 @@
+"""
+Seguimiento de heartbeats de lectores.
+
+Cada lector reporta cada pocos segundos; escribir device.last_seen_at en
+cada heartbeat sería una transacción por lector y por intervalo. El tracker
+guarda el último heartbeat de cada lector en memoria (es lo que consulta el
+estado en línea) y un hilo escribe solo el más reciente de cada uno con un
+único executemany cada flush_interval segundos.
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, NamedTuple, Optional
+from sqlalchemy import bindparam, func, or_, update
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.device import Device
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_device = Device.__table__
+
+# Solo avanza last_seen_at; el firmware se conserva si el heartbeat no lo trae
+_UPDATE_LAST_SEEN = (
+    update(_device)
+    .where(_device.c.id == bindparam("pk"))
+    .where(or_(_device.c.last_seen_at.is_(None), _device.c.last_seen_at < bindparam("seen")))
+    .values(
+        last_seen_at=bindparam("seen"),
+        firmware_version=func.coalesce(bindparam("firmware"), _device.c.firmware_version)
+    )
+)
+
+
+class Heartbeat(NamedTuple):
+    seen: datetime
+    firmware: Optional[str]
+
+
+class DeviceHeartbeatTracker:
+    def __init__(self, session_factory: Callable[[], Session], flush_interval: float = 15.0):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval
+        # Último heartbeat recibido por este proceso, por id de lector
+        self._seen: Dict[int, datetime] = {}
+        # Pendientes de escribir (solo el más reciente de cada lector)
+        self._pending: Dict[int, Heartbeat] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def beat(self, device_pk: int, firmware_version: Optional[str] = None,
+             at: Optional[datetime] = None) -> datetime:
+        """Registra un heartbeat en memoria; retorna su momento"""
+        seen = at or datetime.now(timezone.utc)
+        with self._lock:
+            self._seen[device_pk] = max(seen, self._seen.get(device_pk, seen))
+            previous = self._pending.get(device_pk)
+            self._pending[device_pk] = Heartbeat(
+                max(seen, previous.seen) if previous else seen,
+                firmware_version or (previous.firmware if previous else None)
+            )
+        return seen
+
+    def last_seen(self, device_pk: int) -> Optional[datetime]:
+        return self._seen.get(device_pk)
+
+    def flush(self) -> int:
+        """Escribe los heartbeats pendientes; retorna cuántos lectores se actualizaron"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        db = self._session_factory()
+        try:
+            db.connection().execute(_UPDATE_LAST_SEEN, [
+                {"pk": pk, "seen": beat.seen, "firmware": beat.firmware}
+                for pk, beat in pending.items()
+            ])
+            db.commit()
+            return len(pending)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"No se pudieron escribir {len(pending)} heartbeats: {e}")
+            with self._lock:
+                # Se reintentan, salvo los que ya tienen uno más reciente
+                for pk, beat in pending.items():
+                    self._pending.setdefault(pk, beat)
+            return 0
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self._flush_interval):
+            self.flush()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="device-heartbeats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo y escribe lo pendiente"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+_device_heartbeats: Optional[DeviceHeartbeatTracker] = None
+
+
+def get_device_heartbeats() -> DeviceHeartbeatTracker:
+    """Instancia única por proceso; el lifespan arranca y detiene su hilo"""
+    global _device_heartbeats
+    if _device_heartbeats is None:
+        _device_heartbeats = DeviceHeartbeatTracker(
+            SessionLocal,
+            flush_interval=settings.DEVICE_HEARTBEAT_FLUSH_SECONDS
+        )
+    return _device_heartbeats
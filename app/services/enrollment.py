@@ -0,0 +1,284 @@
+"""
+Enrolamiento de huellas.
+
+Antes de guardar un template se comprueba su calidad y se compara con toda
+la galería usando el mismo matcher de la verificación 1:N: si el dedo ya
+está enrolado a otro usuario se rechaza, porque la identificación dejaría
+de ser unívoca. La comprobación de duplicado y la escritura se serializan
+entre todos los workers con un advisory lock de Postgres (y dentro del
+proceso con un threading.Lock), para que dos lectores no enrolen el mismo
+dedo a la vez. La galería completa se carga antes de tomar el lock; ya con
+él solo se recarga si otro worker enroló entretanto.
+
+Las sesiones de enrolamiento en lote reparten una lista de usuarios entre
+varios lectores; cada lector atiende su cola en paralelo con los demás.
+Las colas y las tareas viven en el worker que creó la sesión, pero el
+progreso se guarda en la tabla enrollment_session tras cada usuario, así
+cualquier worker puede consultarlo. Si ese worker se reinicia la sesión se
+queda en running con los resultados que alcanzó a guardar.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.core.security import encrypt_fingerprint
+from app.db.session import SessionLocal
+from app.models.enrollment import EnrollmentSessionRecord
+from app.models.user import User
+from app.services.biometric import validate_template_format, verify_templates_match
+from app.services.fingerprint_service import FingerprintService, get_fingerprint_service
+from app.services.template_index import TemplateIndex
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Clave del advisory lock que serializa los enrolamientos ("enro")
+_ENROLLMENT_LOCK_KEY = 0x656E726F
+
+
+class EnrollmentRejected(Exception):
+    """Enrolamiento rechazado; reason es un código estable para el cliente"""
+
+    def __init__(self, reason: str, detail: str, matched_user_id: Optional[int] = None):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.matched_user_id = matched_user_id
+
+
+class EnrollmentSession:
+    def __init__(self, user_ids: List[int], device_ids: List[str]):
+        self.id = uuid.uuid4().hex
+        self.device_ids = device_ids
+        self.total = len(user_ids)
+        self.status = "running"
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.results: List[Dict[str, Any]] = []
+        self.queue: "asyncio.Queue[int]" = asyncio.Queue()
+        for user_id in user_ids:
+            self.queue.put_nowait(user_id)
+        self.task: Optional[asyncio.Task] = None
+        # Serializa los guardados para que uno viejo no pise a uno más nuevo
+        self.save_lock = asyncio.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return _snapshot(self.id, self.status, self.device_ids, self.total, list(self.results),
+                         self.created_at, self.finished_at)
+
+
+def _snapshot(session_id: str, status: str, device_ids: List[str], total: int,
+              results: List[Dict[str, Any]], created_at: datetime,
+              finished_at: Optional[datetime]) -> Dict[str, Any]:
+    return {
+        "id": session_id,
+        "status": status,
+        "device_ids": device_ids,
+        "total": total,
+        "completed": len(results),
+        "enrolled": sum(1 for r in results if r["status"] == "enrolled"),
+        "created_at": created_at,
+        "finished_at": finished_at,
+        "results": results,
+    }
+
+
+class EnrollmentService:
+    def __init__(self, fingerprint_service: FingerprintService, min_quality: int, max_sessions: int = 50):
+        self._fingerprint_service = fingerprint_service
+        self._min_quality = min_quality
+        self._max_sessions = max_sessions
+        self._lock = threading.Lock()
+        # Galería completa para los workers con índice parcial (solo algunas sedes)
+        self._full_gallery: Optional[TemplateIndex] = None
+        self._sessions: "OrderedDict[str, EnrollmentSession]" = OrderedDict()
+
+    def _gallery(self) -> TemplateIndex:
+        """Índice con todas las sedes: el del worker, o uno propio si el suyo es parcial"""
+        index = self._fingerprint_service.template_index
+        if not index.is_partial:
+            return index
+        if self._full_gallery is None:
+            self._full_gallery = TemplateIndex()
+        return self._full_gallery
+
+    @staticmethod
+    def _lock_gallery(db: Session) -> None:
+        """Advisory lock de la transacción actual; se libera con el commit o el rollback"""
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ENROLLMENT_LOCK_KEY})
+
+    def find_duplicate(self, db: Session, template: str, exclude_user_id: Optional[int] = None) -> Optional[int]:
+        """Usuario cuya huella coincide con el template en cualquier sede, si existe"""
+        gallery = self._gallery()
+        gallery.ensure_fresh(db)
+        for entry in gallery.entries():
+            if entry.user_id != exclude_user_id and verify_templates_match(template, entry.template):
+                return entry.user_id
+        return None
+
+    def enroll(self, db: Session, user_id: int, device_id: Optional[str] = None) -> User:
+        """Captura, valida y guarda la huella de un usuario; lanza EnrollmentRejected"""
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise EnrollmentRejected("user_not_found", "Usuario no encontrado")
+
+        reader = self._fingerprint_service.get_reader(device_id)
+        template = reader.capture_fingerprint(for_verification=False)
+        if not template or not validate_template_format(template):
+            raise EnrollmentRejected("capture_failed", "Error al capturar la huella")
+
+        quality = reader.template_quality(template)
+        if quality < self._min_quality:
+            raise EnrollmentRejected(
+                "low_quality", f"Calidad de la huella insuficiente ({quality} < {self._min_quality})"
+            )
+
+        index = self._fingerprint_service.template_index
+        index.ensure_fresh(db)
+        # La carga completa (la más lenta) va antes del lock
+        gallery = self._gallery()
+        gallery.ensure_fresh(db)
+        with self._lock:
+            self._lock_gallery(db)
+            # Ya con el lock: solo se recarga si otro worker enroló desde la carga
+            gallery.invalidate()
+            duplicate = self.find_duplicate(db, template, exclude_user_id=user.id)
+            if duplicate is not None:
+                db.rollback()
+                raise EnrollmentRejected(
+                    "duplicate", "La huella ya está registrada para otro usuario", matched_user_id=duplicate
+                )
+            user.fingerprint_template = encrypt_fingerprint(template)
+            user.fingerprint_quality = quality
+            user.fingerprint_device_id = reader.get_device_info()["device_id"]
+            user.fingerprint_enrolled_at = datetime.now(timezone.utc)
+            db.commit()
+            db.refresh(user)
+            index.upsert(user.id, template, user.is_active, [site.id for site in user.sites])
+
+        logger.info(f"Huella enrolada para el usuario {user.id} (calidad {quality})")
+        return user
+
+    def _enroll_one(self, user_id: int, device_id: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"user_id": user_id, "device_id": device_id}
+        db = SessionLocal()
+        try:
+            user = self.enroll(db, user_id, device_id)
+            result.update({"status": "enrolled", "quality": user.fingerprint_quality})
+        except EnrollmentRejected as e:
+            result.update({"status": "rejected", "reason": e.reason, "detail": e.detail})
+            if e.matched_user_id is not None:
+                result["matched_user_id"] = e.matched_user_id
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error enrolando al usuario {user_id} en {device_id}: {e}")
+            result.update({"status": "error", "detail": str(e)})
+        finally:
+            db.close()
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def _reader_worker(self, session: EnrollmentSession, device_id: str) -> None:
+        while True:
+            try:
+                user_id = session.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # La captura bloquea hasta que el lector responde: se ejecuta fuera del event loop
+            session.results.append(await run_in_threadpool(self._enroll_one, user_id, device_id))
+            await self._save(session)
+
+    async def _run_session(self, session: EnrollmentSession) -> None:
+        try:
+            await asyncio.gather(*(self._reader_worker(session, d) for d in session.device_ids))
+            session.status = "completed"
+        except Exception as e:
+            logger.error(f"Sesión de enrolamiento {session.id} interrumpida: {e}")
+            session.status = "failed"
+        finally:
+            session.finished_at = datetime.now(timezone.utc)
+            await self._save(session)
+
+    @staticmethod
+    def _write(snapshot: Dict[str, Any]) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(EnrollmentSessionRecord(
+                id=snapshot["id"],
+                status=snapshot["status"],
+                device_ids=snapshot["device_ids"],
+                total=snapshot["total"],
+                results=snapshot["results"],
+                created_at=snapshot["created_at"],
+                finished_at=snapshot["finished_at"],
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    async def _save(self, session: EnrollmentSession) -> None:
+        async with session.save_lock:
+            try:
+                await run_in_threadpool(self._write, session.snapshot())
+            except Exception as e:
+                # El enrolamiento sigue; el próximo guardado lo reintenta
+                logger.error(f"No se pudo guardar la sesión de enrolamiento {session.id}: {e}")
+
+    @staticmethod
+    def _read(session_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            record = db.get(EnrollmentSessionRecord, session_id)
+            if record is None:
+                return None
+            return _snapshot(record.id, record.status, record.device_ids, record.total,
+                             record.results, record.created_at, record.finished_at)
+        finally:
+            db.close()
+
+    async def start_session(self, user_ids: List[int], device_ids: List[str]) -> EnrollmentSession:
+        """Crea y guarda la sesión y lanza un worker por lector en el event loop actual"""
+        # Sin duplicados y conservando el orden recibido
+        session = EnrollmentSession(list(dict.fromkeys(user_ids)), list(dict.fromkeys(device_ids)))
+        await run_in_threadpool(self._write, session.snapshot())
+        session.task = asyncio.get_running_loop().create_task(self._run_session(session))
+        self._sessions[session.id] = session
+        # Se descartan las sesiones terminadas más antiguas por encima del límite
+        for old_id in [sid for sid, s in self._sessions.items() if s.finished_at is not None]:
+            if len(self._sessions) <= self._max_sessions:
+                break
+            del self._sessions[old_id]
+        return session
+
+    async def get_snapshot(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Estado de la sesión: en memoria si corre en este worker, si no el guardado"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return session.snapshot()
+        return await run_in_threadpool(self._read, session_id)
+
+
+_enrollment_service: Optional[EnrollmentService] = None
+
+
+def get_enrollment_service() -> EnrollmentService:
+    """Instancia única por proceso, creada en el primer uso"""
+    global _enrollment_service
+    if _enrollment_service is None:
+        _enrollment_service = EnrollmentService(
+            get_fingerprint_service(),
+            min_quality=settings.ENROLLMENT_MIN_QUALITY,
+            max_sessions=settings.ENROLLMENT_MAX_SESSIONS
+        )
+    return _enrollment_service
@@ -1,14 +1,54 @@
+import logging
 from typing import Optional, Dict
 from sqlalchemy.orm import Session
-from app.models.user import User
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.services.access_policy import AccessPolicyEngine
 from app.services.biometric import MockZKTeco
-from app.core.security import encrypt_fingerprint, decrypt_fingerprint
+from app.services.template_index import TemplateIndex
 from .biometric import MockZKTeco, verify_templates_match, validate_template_format
 
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
 
 class FingerprintService:
     def __init__(self):
         self.device = MockZKTeco()
+        # Lectores adicionales por device_id (enrolamiento en varios lectores)
+        self._readers: Dict[str, MockZKTeco] = {self.device.get_device_info()["device_id"]: self.device}
+        self.template_index = TemplateIndex(
+            refresh_interval=settings.TEMPLATE_INDEX_REFRESH_SECONDS,
+            sites=settings.TEMPLATE_INDEX_SITES
+        )
+        self.policy_engine = AccessPolicyEngine(
+            slot_minutes=settings.ACCESS_POLICY_SLOT_MINUTES,
+            default_allow=settings.ACCESS_POLICY_DEFAULT_ALLOW,
+            timezone=settings.TIMEZONE,
+            refresh_interval=settings.ACCESS_POLICY_REFRESH_SECONDS
+        )
+
+    def start(self, db: Session) -> None:
+        """Conecta el dispositivo y precarga el índice de templates y las políticas"""
+        self.device.connect()
+        self.template_index.load(db)
+        self.policy_engine.load(db)
+
+    def stop(self) -> None:
+        """Libera la conexión con los dispositivos"""
+        for reader in self._readers.values():
+            reader.disconnect()
+
+    def get_reader(self, device_id: Optional[str] = None) -> MockZKTeco:
+        """Lector por id; sin id, el lector por defecto"""
+        if device_id is None:
+            return self.device
+        reader = self._readers.get(device_id)
+        if reader is None:
+            reader = self._readers.setdefault(device_id, MockZKTeco(device_id))
+            reader.connect()
+        return reader
 
     async def register_fingerprint(self, db: Session, user_id: int) -> Optional[str]:
         """Registra la huella de un usuario"""
@@ -18,35 +58,68 @@ class FingerprintService:
         return None
 
     async def capture_current_fingerprint(self) -> str:
-        """Captura la huella actual para verificación"""
-        return self.device.capture_fingerprint(for_verification=True)
+        """Captura la huella actual para verificación (bloquea hasta que el lector responde)"""
+        return await run_in_threadpool(self.device.capture_fingerprint, for_verification=True)
+
+    async def verify_fingerprint(self, db: Session, template: str, device_id: Optional[str] = None) -> Dict:
+        """match() fuera del event loop: recarga del índice, comparación y consultas son síncronas"""
+        return await run_in_threadpool(self.match, db, template, device_id)
 
-    async def verify_fingerprint(self, db: Session, template: str) -> Dict:
-        """Verifica una huella contra la base de datos"""
+    def match(self, db: Session, template: str, device_id: Optional[str] = None) -> Dict:
+        """
+        Verifica una huella contra el índice de templates en memoria,
+        limitado a la sede del lector si está asignado a una
+        """
         if not validate_template_format(template):
             raise ValueError("Formato de huella inválido")
 
-        users = db.query(User).filter(User.fingerprint_template.isnot(None)).all()
+        self.template_index.ensure_fresh(db)
 
-        for user in users:
-            # Asegúrate de que user.fingerprint_template se resuelva en una cadena
-            stored_template = decrypt_fingerprint(str(user.fingerprint_template))
-            if verify_templates_match(template, stored_template):
+        for entry in self.template_index.candidates(device_id):
+            if verify_templates_match(template, entry.template):
                 # Verificar si el usuario está activo
-                if not user.is_active:
+                if not entry.is_active:
                     return {
                         "is_valid": False,
+                        "user_id": entry.user_id,
+                        "reason": "inactive_user",
                         "message": "Usuario inactivo"
                     }
 
+                # Horarios, puertas, festivos y excepciones del usuario
+                self.policy_engine.ensure_fresh(db)
+                decision = self.policy_engine.decide(entry.user_id, device_id)
+                if not decision.allowed:
+                    logger.warning(
+                        f"Acceso denegado por política: usuario={entry.user_id} "
+                        f"dispositivo={device_id} motivo={decision.reason}"
+                    )
+                    return {
+                        "is_valid": False,
+                        "user_id": entry.user_id,
+                        "reason": decision.reason,
+                        "message": "Acceso no permitido en este horario o puerta"
+                    }
+
                 return {
                     "is_valid": True,
-                    "user_id": user.id,
+                    "user_id": entry.user_id,
                     "access_type": "entry"  # Lógica para determinar entry/exit
                 }
 
-        return {"is_valid": False}
+        return {"is_valid": False, "reason": "not_recognized"}
 
     async def verify_fingerprint_false(self, db: Session, user_id: int) -> bool:
         """Simula una verificación fallida"""
         return False
+
+
+_fingerprint_service: Optional[FingerprintService] = None
+
+
+def get_fingerprint_service() -> FingerprintService:
+    """Instancia única por proceso, creada en el primer uso (o en el lifespan)"""
+    global _fingerprint_service
+    if _fingerprint_service is None:
+        _fingerprint_service = FingerprintService()
+    return _fingerprint_service
@@ -0,0 +1,116 @@
+"""
+Comprobaciones de salud de las dependencias del worker.
+
+Cada comprobación retorna su estado y la latencia medida. El resultado
+completo se cachea durante cache_seconds para que sondas frecuentes del
+orquestador (o varias réplicas del balanceador) no generen carga extra.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.db.session import SessionLocal, get_engine, get_replica_router
+from app.services.access_feed import get_access_feed
+from app.services.fingerprint_service import FingerprintService
+
+settings = get_settings()
+
+
+def _timed(check: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        result = check()
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def check_database() -> Dict[str, Any]:
+    """Conectividad (SELECT 1) y margen disponible en el pool"""
+    engine = get_engine()
+    pool = engine.pool
+    result: Dict[str, Any] = {"status": "ok"}
+    # Solo QueuePool expone tamaño y conexiones en uso
+    if hasattr(pool, "checkedout"):
+        capacity = pool.size() + max(settings.DB_MAX_OVERFLOW, 0)
+        in_use = pool.checkedout()
+        result.update({"pool_size": pool.size(), "in_use": in_use, "headroom": capacity - in_use})
+        if capacity - in_use <= 0:
+            # Sin margen: no se espera pool_timeout por una conexión para la sonda
+            result["status"] = "degraded"
+            return result
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return result
+
+
+def check_template_index(service: FingerprintService, max_age: float) -> Dict[str, Any]:
+    """Índice de templates cargado y sincronizado con la galería"""
+    index = service.template_index
+    db = SessionLocal()
+    try:
+        index.ensure_fresh(db)
+    finally:
+        db.close()
+    age = time.monotonic() - index.checked_at if index.is_loaded else None
+    return {
+        "status": "ok" if index.is_loaded and age <= max_age else "stale",
+        "templates": len(index),
+        "checked_seconds_ago": round(age, 1) if age is not None else None,
+    }
+
+
+def check_device(service: FingerprintService) -> Dict[str, Any]:
+    """Alcance del lector biométrico"""
+    info = service.device.get_device_info()
+    return {
+        "status": "ok" if service.device.ping() else "unreachable",
+        "device_id": info["device_id"],
+    }
+
+
+class HealthChecker:
+    def __init__(self, service_getter: Callable[[], FingerprintService],
+                 cache_seconds: float = 2.0, template_index_max_age: float = 60.0):
+        self._service_getter = service_getter
+        self._cache_seconds = cache_seconds
+        self._template_index_max_age = template_index_max_age
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _run_checks(self) -> Dict[str, Any]:
+        service = self._service_getter()
+        checks = {
+            "database": _timed(check_database),
+            "template_index": _timed(lambda: check_template_index(service, self._template_index_max_age)),
+            "device": _timed(lambda: check_device(service)),
+        }
+        result = {
+            "status": "ok" if all(c["status"] == "ok" for c in checks.values()) else "fail",
+            "checks": checks,
+        }
+        # Informativo: sin réplicas las lecturas vuelven al primario
+        router = get_replica_router()
+        if router.enabled:
+            router.refresh()
+            result["replicas"] = router.status()
+        # Informativo: stalled_seconds indica una transacción larga que frena el feed
+        result["access_feed"] = get_access_feed().status()
+        return result
+
+    async def readiness(self) -> Dict[str, Any]:
+        """Resultado de las comprobaciones, cacheado durante cache_seconds"""
+        if self._cached and time.monotonic() - self._cached_at < self._cache_seconds:
+            return self._cached
+        async with self._lock:
+            # Una sola ejecución aunque lleguen varias sondas a la vez
+            if self._cached and time.monotonic() - self._cached_at < self._cache_seconds:
+                return self._cached
+            self._cached = await run_in_threadpool(self._run_checks)
+            self._cached_at = time.monotonic()
+            return self._cached
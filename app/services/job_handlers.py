@@ -0,0 +1,183 @@
+"""
+Tipos de trabajo en segundo plano. Importar este módulo los registra en
+app.services.jobs (lo hace app.main al arrancar).
+"""
+import os
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, field_validator
+from sqlalchemy import delete, func, select, update
+from app.core.config import get_settings
+from app.core.timezones import get_zone
+from app.db.session import SessionLocal, open_read_session
+from app.models.access_log import AccessLog, DenialReason
+from app.services.access_archive import FORMAT_PARQUET, access_log_months, export_access_logs
+from app.services.access_export import access_logs_export_query, write_access_logs_pdf
+from app.services.jobs import JobContext, job_handler
+
+settings = get_settings()
+
+
+class AccessLogsPdfParams(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    employee_id: Optional[str] = None
+    full_name: Optional[str] = None
+    tz: Optional[str] = None  # Zona IANA de las fechas; por defecto TIMEZONE
+
+    @field_validator("tz")
+    @classmethod
+    def known_timezone(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            get_zone(value)
+        return value
+
+
+@job_handler("access_logs_pdf", queue="exports", params=AccessLogsPdfParams)
+def export_access_logs_pdf(ctx: JobContext, params: AccessLogsPdfParams) -> dict:
+    """Exportar registros de acceso a PDF; se descarga con GET /jobs/{id}/file"""
+    tz = get_zone(params.tz)
+    db = open_read_session()
+    try:
+        logs = access_logs_export_query(
+            db, params.start_date, params.end_date, params.employee_id, params.full_name, tz
+        ).all()
+    finally:
+        db.close()
+    ctx.progress(0.1, f"{len(logs)} registros")
+
+    os.makedirs(settings.JOB_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_OUTPUT_DIR, f"{ctx.job_id}.pdf")
+    total = max(len(logs), 1)
+    write_access_logs_pdf(path, logs, tz, on_row=lambda i: ctx.progress(0.1 + 0.8 * i / total))
+    return {
+        "file": path,
+        "filename": f'access_logs_{datetime.now(tz).strftime("%Y%m%d")}.pdf',
+        "media_type": "application/pdf",
+        "rows": len(logs),
+    }
+
+
+class RetentionParams(BaseModel):
+    days: int = Field(ge=30)
+    batch_size: int = Field(5000, ge=100, le=50000)
+
+
+@job_handler("access_log_retention", queue="maintenance", params=RetentionParams)
+def purge_old_access_logs(ctx: JobContext, params: RetentionParams) -> dict:
+    """Eliminar registros de acceso más antiguos que days, en lotes"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=params.days)
+    db = SessionLocal()
+    try:
+        total = db.query(func.count(AccessLog.id)).filter(AccessLog.timestamp < cutoff).scalar()
+        deleted = 0
+        while True:
+            ids = [i for (i,) in db.execute(
+                select(AccessLog.id).where(AccessLog.timestamp < cutoff).order_by(AccessLog.id).limit(params.batch_size)
+            )]
+            if not ids:
+                break
+            db.execute(delete(AccessLog).where(AccessLog.id.in_(ids)))
+            # Un commit por lote: las transacciones cortas no bloquean la escritura de accesos
+            db.commit()
+            deleted += len(ids)
+            ctx.progress(deleted / total if total else 1.0, f"{deleted} de {total} eliminados")
+        return {"deleted": deleted, "cutoff": cutoff.isoformat()}
+    finally:
+        db.close()
+
+
+class ReasonBackfillParams(BaseModel):
+    batch_size: int = Field(10000, ge=100, le=100000)
+
+
+@job_handler("access_log_reason_backfill", queue="maintenance", params=ReasonBackfillParams, max_attempts=3)
+def backfill_denial_reason(ctx: JobContext, params: ReasonBackfillParams) -> dict:
+    """Asignar not_recognized a los accesos denegados anteriores al motivo de denegación"""
+    db = SessionLocal()
+    try:
+        pending = (AccessLog.status == "denied") & AccessLog.reason.is_(None)
+        low, high = db.query(func.min(AccessLog.id), func.max(AccessLog.id)).filter(pending).one()
+        if low is None:
+            return {"updated": 0}
+        updated = 0
+        # Rangos de id: cada lote usa la clave primaria y es idempotente si se reintenta
+        for start in range(low, high + 1, params.batch_size):
+            updated += db.execute(
+                update(AccessLog)
+                .where(pending, AccessLog.id >= start, AccessLog.id < start + params.batch_size)
+                .values(reason=int(DenialReason.NOT_RECOGNIZED))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            ctx.progress((start + params.batch_size - low) / (high - low + 1), f"{updated} actualizados")
+        return {"updated": updated}
+    finally:
+        db.close()
+
+
+class ColumnarExportParams(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    format: Literal["parquet", "arrow"] = FORMAT_PARQUET
+
+
+@job_handler("access_logs_columnar", queue="exports", params=ColumnarExportParams)
+def export_access_logs_columnar(ctx: JobContext, params: ColumnarExportParams) -> dict:
+    """Exportar registros de acceso con datos de usuario y lector a Parquet o Arrow, por mes"""
+    directory = os.path.join(settings.JOB_OUTPUT_DIR, ctx.job_id)
+    db = open_read_session()
+    try:
+        months = access_log_months(db, params.start_date, params.end_date)
+        manifest = export_access_logs(
+            db, directory, months, params.format, batch_rows=settings.ARCHIVE_BATCH_ROWS,
+            on_month=lambda i, rows: ctx.progress(0.9 * (i + 1) / len(months), f"{months[i]:%Y-%m}: {rows} registros")
+        )
+    finally:
+        db.close()
+
+    # Un solo archivo para descargar; sin recomprimir (los archivos ya van en zstd)
+    path = f"{directory}.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for entry in manifest["files"]:
+            archive.write(entry["path"], os.path.relpath(entry["path"], directory))
+    return {
+        "file": path,
+        "filename": f'access_logs_{params.format}_{datetime.now(get_zone()).strftime("%Y%m%d")}.zip',
+        "media_type": "application/zip",
+        "rows": manifest["rows"],
+        "months": [entry["month"] for entry in manifest["files"]],
+    }
+
+
+class ArchiveParams(BaseModel):
+    # Se archivan los meses completos anteriores a hoy - days
+    days: int = Field(ge=30)
+    format: Literal["parquet", "arrow"] = FORMAT_PARQUET
+    delete: bool = True
+
+
+@job_handler("access_log_archive", queue="maintenance", params=ArchiveParams, max_attempts=3)
+def archive_access_logs(ctx: JobContext, params: ArchiveParams) -> dict:
+    """Archivar meses antiguos de access_log en ACCESS_ARCHIVE_DIR y borrarlos de la base"""
+    cutoff = (datetime.now(get_zone()).date() - timedelta(days=params.days)).replace(day=1)
+    db = SessionLocal()
+    try:
+        # Se lee del primario: lo que se borra tiene que ser exactamente lo escrito
+        months = [m for m in access_log_months(db, end_date=cutoff - timedelta(days=1)) if m < cutoff]
+        # Un archivo por intento; un reintento retoma los meses que ya se escribieron
+        manifest = export_access_logs(
+            db, settings.ACCESS_ARCHIVE_DIR, months, params.format, label=f"{ctx.job_id}-{ctx.attempt}",
+            batch_rows=settings.ARCHIVE_BATCH_ROWS, delete_archived=params.delete,
+            on_month=lambda i, rows: ctx.progress((i + 1) / len(months), f"{months[i]:%Y-%m}: {rows} archivados"),
+            resume_prefix=ctx.job_id
+        )
+    finally:
+        db.close()
+    return {
+        "directory": settings.ACCESS_ARCHIVE_DIR,
+        "rows": manifest["rows"],
+        "deleted": manifest["rows"] if params.delete else 0,
+        "files": [entry["path"] for entry in manifest["files"]],
+    }
@@ -0,0 +1,573 @@
+"""
+Ejecución de trabajos largos en segundo plano (exportaciones, backfills,
+retención) fuera de las rutas de la API.
+
+- Los tipos de trabajo se registran con @job_handler: nombre, cola, modelo
+  de parámetros y número de intentos. Ver app.services.job_handlers.
+- Cada cola tiene un número fijo de tareas consumidoras (JOB_QUEUES), así
+  una exportación pesada no ocupa más que su cupo. Los handlers síncronos
+  corren en un pool de hilos propio, no en el de las rutas.
+- Un fallo se reintenta con espera exponencial hasta max_attempts.
+- El handler reporta avance con ctx.progress(); ahí mismo se comprueba la
+  cancelación, que es cooperativa.
+- Con JOB_STORE=database (por defecto) se guardan en la tabla job:
+  cualquier worker reclama los pendientes de sus colas (FOR UPDATE SKIP
+  LOCKED) y el estado es visible desde todos. Con JOB_STORE=memory viven en
+  el proceso; solo sirve con un worker (WEB_CONCURRENCY=1).
+- Al apagar se pide a los handlers que se detengan (ctx.progress() lanza
+  JobCancelled) y se espera shutdown_timeout; luego se espera otro tanto a
+  que terminen sus hilos. Solo un trabajo cuyo hilo ya terminó vuelve a la
+  cola: si siguiera corriendo, otro worker podría reclamarlo y ejecutarlo
+  dos veces a la vez. Los que no terminaron se marcan como fallidos.
+- Los archivos de salida (JOB_OUTPUT_DIR) se escriben en el host que
+  ejecutó el trabajo; con varios hosts ese directorio debe ser compartido.
+  El resultado guarda el host (result["host"]) para poder diagnosticarlo.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+# Intervalo mínimo entre escrituras de avance (y consultas de cancelación)
+_PROGRESS_SAVE_SECONDS = 1.0
+
+_WORKER_NAME = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobCancelled(Exception):
+    """La lanza ctx.progress() / ctx.check_cancelled() cuando se pidió cancelar"""
+
+
+class JobHandler(NamedTuple):
+    name: str
+    func: Callable
+    queue: str
+    params_model: Optional[Type[BaseModel]]
+    max_attempts: int
+    description: str
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(name: str, queue: str = "default", params: Optional[Type[BaseModel]] = None,
+                max_attempts: int = 1):
+    """Registra una función (ctx, params) -> dict como tipo de trabajo"""
+    def decorator(func: Callable) -> Callable:
+        _handlers[name] = JobHandler(
+            name, func, queue, params, max_attempts, (inspect.getdoc(func) or "").split("\n")[0]
+        )
+        return func
+    return decorator
+
+
+def get_job_handlers() -> Dict[str, JobHandler]:
+    return _handlers
+
+
+class JobRecord:
+    __slots__ = (
+        "id", "name", "queue", "status", "params", "result", "error", "progress", "message",
+        "attempts", "max_attempts", "cancel_requested", "created_by", "worker",
+        "created_at", "run_after", "started_at", "finished_at", "updated_at",
+    )
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def new(cls, name: str, queue: str, params: dict, max_attempts: int,
+            created_by: Optional[int]) -> "JobRecord":
+        now = _now()
+        return cls(
+            id=uuid.uuid4().hex, name=name, queue=queue, status=STATUS_QUEUED, params=params,
+            progress=0.0, attempts=0, max_attempts=max_attempts, cancel_requested=False,
+            created_by=created_by, created_at=now, run_after=now, updated_at=now,
+        )
+
+    def copy(self) -> "JobRecord":
+        return JobRecord(**self.as_dict())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MemoryJobStore:
+    """Trabajos del proceso; conserva los max_finished terminados más recientes"""
+
+    def __init__(self, max_finished: int = 500):
+        self._jobs: "OrderedDict[str, JobRecord]" = OrderedDict()
+        self._max_finished = max_finished
+        self._lock = threading.Lock()
+
+    def add(self, record: JobRecord) -> None:
+        with self._lock:
+            self._jobs[record.id] = record.copy()
+
+    def claim(self, queue: str) -> Optional[JobRecord]:
+        now = _now()
+        with self._lock:
+            for record in self._jobs.values():
+                if record.queue == queue and record.status == STATUS_QUEUED and record.run_after <= now:
+                    record.status = STATUS_RUNNING
+                    record.attempts += 1
+                    record.worker = _WORKER_NAME
+                    record.started_at = record.updated_at = now
+                    return record.copy()
+        return None
+
+    def save(self, record: JobRecord) -> None:
+        record.updated_at = _now()
+        with self._lock:
+            stored = self._jobs.get(record.id)
+            # La cancelación pedida mientras corría no se pisa con la copia del runner
+            record.cancel_requested = record.cancel_requested or bool(stored and stored.cancel_requested)
+            self._jobs[record.id] = record.copy()
+            finished = [r.id for r in self._jobs.values() if r.status in FINISHED_STATUSES]
+            for job_id in finished[:max(len(finished) - self._max_finished, 0)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return record.copy() if record else None
+
+    def list(self, status: Optional[str] = None, queue: Optional[str] = None, limit: int = 100) -> List[JobRecord]:
+        with self._lock:
+            records = [r.copy() for r in reversed(self._jobs.values())
+                       if (status is None or r.status == status) and (queue is None or r.queue == queue)]
+        return records[:limit]
+
+    def request_cancel(self, job_id: str) -> Optional[JobRecord]:
+        """Cancela un pendiente o marca un trabajo en curso para que se detenga"""
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None:
+                return None
+            if record.status == STATUS_QUEUED:
+                record.status = STATUS_CANCELLED
+                record.finished_at = record.updated_at = _now()
+            elif record.status == STATUS_RUNNING:
+                record.cancel_requested = True
+            return record.copy()
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        record = self._jobs.get(job_id)
+        return bool(record and record.cancel_requested)
+
+    def recover(self) -> int:
+        return 0
+
+
+class DatabaseJobStore:
+    """Trabajos en la tabla job, compartidos por todos los workers"""
+
+    def __init__(self, session_factory: Callable[[], Session], stale_seconds: float = 600.0):
+        self._session_factory = session_factory
+        self._stale_seconds = stale_seconds
+        self._table = Job.__table__
+
+    def _record(self, row) -> JobRecord:
+        return JobRecord(**row._asdict())
+
+    def add(self, record: JobRecord) -> None:
+        db = self._session_factory()
+        try:
+            db.execute(self._table.insert().values(**record.as_dict()))
+            db.commit()
+        finally:
+            db.close()
+
+    def claim(self, queue: str) -> Optional[JobRecord]:
+        now = _now()
+        table = self._table
+        next_id = select(table.c.id) \
+            .where(table.c.queue == queue, table.c.status == STATUS_QUEUED, table.c.run_after <= now) \
+            .order_by(table.c.run_after, table.c.created_at) \
+            .limit(1) \
+            .with_for_update(skip_locked=True) \
+            .scalar_subquery()
+        db = self._session_factory()
+        try:
+            row = db.execute(
+                update(table)
+                .where(table.c.id == next_id)
+                .values(status=STATUS_RUNNING, attempts=table.c.attempts + 1, worker=_WORKER_NAME,
+                        started_at=now, updated_at=now)
+                .returning(*table.c)
+            ).first()
+            db.commit()
+            return self._record(row) if row else None
+        finally:
+            db.close()
+
+    def save(self, record: JobRecord) -> None:
+        record.updated_at = _now()
+        fields = record.as_dict()
+        # cancel_requested lo escribe solo request_cancel
+        fields.pop("cancel_requested")
+        db = self._session_factory()
+        try:
+            db.execute(update(self._table).where(self._table.c.id == record.id).values(**fields))
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        db = self._session_factory()
+        try:
+            row = db.execute(select(self._table).where(self._table.c.id == job_id)).first()
+            return self._record(row) if row else None
+        finally:
+            db.close()
+
+    def list(self, status: Optional[str] = None, queue: Optional[str] = None, limit: int = 100) -> List[JobRecord]:
+        query = select(self._table).order_by(self._table.c.created_at.desc()).limit(limit)
+        if status is not None:
+            query = query.where(self._table.c.status == status)
+        if queue is not None:
+            query = query.where(self._table.c.queue == queue)
+        db = self._session_factory()
+        try:
+            return [self._record(row) for row in db.execute(query)]
+        finally:
+            db.close()
+
+    def request_cancel(self, job_id: str) -> Optional[JobRecord]:
+        table = self._table
+        now = _now()
+        db = self._session_factory()
+        try:
+            db.execute(
+                update(table).where(table.c.id == job_id, table.c.status == STATUS_QUEUED)
+                .values(status=STATUS_CANCELLED, finished_at=now, updated_at=now)
+            )
+            db.execute(
+                update(table).where(table.c.id == job_id, table.c.status == STATUS_RUNNING)
+                .values(cancel_requested=True)
+            )
+            db.commit()
+        finally:
+            db.close()
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        db = self._session_factory()
+        try:
+            return bool(db.execute(
+                select(self._table.c.cancel_requested).where(self._table.c.id == job_id)
+            ).scalar())
+        finally:
+            db.close()
+
+    def recover(self) -> int:
+        """Marca como fallidos los trabajos en curso sin avance reciente (worker caído)"""
+        table = self._table
+        now = _now()
+        db = self._session_factory()
+        try:
+            count = db.execute(
+                update(table)
+                .where(table.c.status == STATUS_RUNNING,
+                       table.c.updated_at < now - timedelta(seconds=self._stale_seconds))
+                .values(status=STATUS_FAILED, error="Interrumpido: el worker dejó de reportar avance",
+                        finished_at=now, updated_at=now)
+            ).rowcount
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+
+class JobContext:
+    """Lo que recibe el handler: parámetros, avance y cancelación"""
+
+    def __init__(self, runner: "JobRunner", record: JobRecord):
+        self._runner = runner
+        self._record = record
+        self._saved_at = 0.0
+        self.job_id = record.id
+
+    @property
+    def attempt(self) -> int:
+        return self._record.attempts
+
+    def check_cancelled(self) -> None:
+        if self._runner.is_cancelled(self._record):
+            raise JobCancelled()
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """Reporta avance (0..1); se guarda como mucho una vez por segundo"""
+        if self._runner.stopping:
+            # Tras el apagado el record puede estar ya de vuelta en la cola: no se guarda
+            raise JobCancelled()
+        self._record.progress = min(max(fraction, 0.0), 1.0)
+        if message is not None:
+            self._record.message = message
+        if time.monotonic() - self._saved_at >= _PROGRESS_SAVE_SECONDS:
+            self._saved_at = time.monotonic()
+            self._runner.store.save(self._record)
+            self.check_cancelled()
+
+
+class JobRunner:
+    def __init__(self, store, queues: Dict[str, int], poll_interval: float = 2.0,
+                 retry_backoff: float = 30.0, shutdown_timeout: float = 10.0):
+        self.store = store
+        self._queues = dict(queues)
+        self._poll_interval = poll_interval
+        self._retry_backoff = retry_backoff
+        self._shutdown_timeout = shutdown_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        # Trabajos en curso en este proceso, por id
+        self._running: Dict[str, JobRecord] = {}
+        # Hilo en curso de cada trabajo: ("handler" | "finish", future)
+        self._threads: Dict[str, Tuple[str, Future]] = {}
+
+    @property
+    def queues(self) -> Dict[str, int]:
+        return self._queues
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping
+
+    def submit(self, name: str, params: Optional[dict] = None, created_by: Optional[int] = None) -> JobRecord:
+        """Valida los parámetros y encola el trabajo; ValueError si el tipo no existe"""
+        handler = _handlers.get(name)
+        if handler is None:
+            raise ValueError(f"Tipo de trabajo desconocido: {name}")
+        if handler.queue not in self._queues:
+            raise ValueError(f"La cola {handler.queue} no está configurada en JOB_QUEUES")
+        if handler.params_model is not None:
+            # pydantic.ValidationError si no son válidos
+            params = handler.params_model.model_validate(params or {}).model_dump(mode="json")
+        record = JobRecord.new(name, handler.queue, params or {}, handler.max_attempts, created_by)
+        self.store.add(record)
+        self._wake(handler.queue)
+        return record
+
+    def _wake(self, queue: str) -> None:
+        event = self._wakeups.get(queue)
+        if event is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(event.set)
+
+    def cancel(self, job_id: str) -> Optional[JobRecord]:
+        return self.store.request_cancel(job_id)
+
+    def is_cancelled(self, record: JobRecord) -> bool:
+        return self._stopping or self.store.is_cancel_requested(record.id)
+
+    def _execute(self, handler: JobHandler, record: JobRecord) -> Any:
+        params = handler.params_model.model_validate(record.params) if handler.params_model else record.params
+        return handler.func(JobContext(self, record), params)
+
+    def _finish(self, handler: Optional[JobHandler], record: JobRecord, outcome: Any, error: Optional[BaseException]) -> None:
+        now = _now()
+        if error is None:
+            if isinstance(outcome, dict) and "file" in outcome:
+                outcome.setdefault("host", socket.gethostname())
+            record.status = STATUS_SUCCEEDED
+            record.progress = 1.0
+            record.result = outcome
+            record.error = None
+            record.finished_at = now
+        elif isinstance(error, JobCancelled):
+            if self.store.is_cancel_requested(record.id):
+                record.status = STATUS_CANCELLED
+                record.finished_at = now
+            else:
+                # Detenido por el apagado del worker: vuelve a la cola sin gastar un intento
+                record.status = STATUS_QUEUED
+                record.attempts -= 1
+                record.worker = None
+        elif handler is not None and record.attempts < record.max_attempts:
+            record.status = STATUS_QUEUED
+            record.error = str(error)
+            record.run_after = now + timedelta(seconds=self._retry_backoff * 2 ** (record.attempts - 1))
+            logger.warning(f"Trabajo {record.name} {record.id} falló (intento {record.attempts}): {error}")
+        else:
+            record.status = STATUS_FAILED
+            record.error = str(error)
+            record.finished_at = now
+            logger.error(f"Trabajo {record.name} {record.id} falló: {error}")
+        self.store.save(record)
+
+    async def _run(self, record: JobRecord) -> None:
+        loop = asyncio.get_running_loop()
+        handler = _handlers.get(record.name)
+        if handler is None:
+            await loop.run_in_executor(
+                self._executor, self._finish, None, record, None,
+                ValueError(f"Tipo de trabajo desconocido: {record.name}")
+            )
+            return
+        outcome, error = None, None
+        self._running[record.id] = record
+        try:
+            try:
+                if inspect.iscoroutinefunction(handler.func):
+                    outcome = await self._execute(handler, record)
+                else:
+                    outcome = await self._in_thread("handler", record, self._execute, handler, record)
+            except Exception as e:
+                error = e
+            await self._in_thread("finish", record, self._finish, handler, record, outcome, error)
+        finally:
+            self._running.pop(record.id, None)
+            self._threads.pop(record.id, None)
+
+    async def _in_thread(self, phase: str, record: JobRecord, func: Callable, *args: Any) -> Any:
+        # Se guarda el future del hilo: stop() necesita saber si terminó aunque se cancele la tarea
+        future = self._executor.submit(func, *args)
+        self._threads[record.id] = (phase, future)
+        return await asyncio.wrap_future(future)
+
+    async def _consume(self, queue: str) -> None:
+        loop = asyncio.get_running_loop()
+        wakeup = self._wakeups[queue]
+        while not self._stopping:
+            try:
+                record = await loop.run_in_executor(self._executor, self.store.claim, queue)
+            except Exception as e:
+                logger.error(f"No se pudo reclamar un trabajo de la cola {queue}: {e}")
+                record = None
+            if record is not None:
+                await self._run(record)
+                continue
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Arranca las tareas consumidoras; se llama desde el lifespan"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(sum(self._queues.values()), 1), thread_name_prefix="job"
+        )
+        try:
+            recovered = self.store.recover()
+            if recovered:
+                logger.warning(f"{recovered} trabajos interrumpidos marcados como fallidos")
+        except Exception as e:
+            logger.error(f"No se pudieron revisar los trabajos interrumpidos: {e}")
+        for queue, concurrency in self._queues.items():
+            self._wakeups[queue] = asyncio.Event()
+            for _ in range(concurrency):
+                self._tasks.append(asyncio.create_task(self._consume(queue)))
+
+    def _settle_abandoned(self, abandoned: List[Tuple[JobRecord, Optional[Tuple[str, Future]]]]) -> None:
+        """Cierra los trabajos cuya tarea se canceló al apagar, según el estado de su hilo"""
+        futures = [thread[1] for _, thread in abandoned if thread is not None]
+        wait_futures(futures, timeout=self._shutdown_timeout)
+        failed = 0
+        for record, thread in abandoned:
+            try:
+                if thread is None:
+                    # Handler async: se canceló con la tarea, no sigue corriendo
+                    self._finish(_handlers.get(record.name), record, None, JobCancelled())
+                elif thread[0] == "finish":
+                    # _finish guarda el estado por sí mismo
+                    continue
+                elif thread[1].done():
+                    error = thread[1].exception()
+                    outcome = thread[1].result() if error is None else None
+                    self._finish(_handlers.get(record.name), record, outcome, error)
+                else:
+                    # Sigue corriendo (ya no guarda avance): no se puede reencolar sin duplicarlo
+                    record.status = STATUS_FAILED
+                    record.error = "Interrumpido: el handler no se detuvo al apagar el worker"
+                    record.finished_at = _now()
+                    self.store.save(record)
+                    failed += 1
+            except Exception as e:
+                logger.error(f"No se pudo cerrar el trabajo {record.name} {record.id} al apagar: {e}")
+        if failed:
+            logger.warning(f"{failed} trabajos que no se detuvieron al apagar marcados como fallidos")
+
+    async def stop(self) -> None:
+        """
+        Pide a los trabajos en curso que se detengan y espera shutdown_timeout;
+        ver el docstring del módulo para los que no terminan a tiempo
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        for event in self._wakeups.values():
+            event.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=self._shutdown_timeout)
+        abandoned = [(record, self._threads.get(job_id)) for job_id, record in self._running.items()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        await run_in_threadpool(self._settle_abandoned, abandoned)
+        self._tasks = []
+        self._wakeups = {}
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+_job_runner: Optional[JobRunner] = None
+
+
+def get_job_runner() -> JobRunner:
+    """Instancia única por proceso; el lifespan arranca y detiene sus colas"""
+    global _job_runner
+    if _job_runner is None:
+        if settings.JOB_STORE == "database":
+            store = DatabaseJobStore(SessionLocal, stale_seconds=settings.JOB_STALE_SECONDS)
+        else:
+            # Cada worker tendría su propia lista: el estado y la cancelación fallarían al azar
+            if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+                raise RuntimeError("JOB_STORE=memory solo admite un worker; use JOB_STORE=database")
+            store = MemoryJobStore(max_finished=settings.JOB_MAX_FINISHED)
+        _job_runner = JobRunner(
+            store,
+            queues=settings.JOB_QUEUES,
+            poll_interval=settings.JOB_POLL_SECONDS,
+            retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+            shutdown_timeout=settings.JOB_SHUTDOWN_SECONDS
+        )
+    return _job_runner
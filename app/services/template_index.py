@@ -0,0 +1,189 @@
+"""
+Índice en memoria de templates de huella descifrados.
+
+Evita leer y descifrar toda la tabla user en cada verificación. Cada worker
+mantiene su propia copia y la recarga cuando cambia la firma de la galería
+(cantidad de usuarios con huella, último updated_at y asignación de lectores
+a sedes), comprobada como mucho una vez cada refresh_interval segundos.
+
+La galería está particionada por sede: un lector asignado a una sede solo
+compara contra los usuarios de esa sede y los globales (sin sede). Con
+sites se limita el worker a las sedes que atiende y solo carga esas
+particiones; los lectores sin sede comparan contra todo lo cargado.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.core.security import decrypt_fingerprint
+from app.models.site import Site, SiteDevice, user_site
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateEntry:
+    __slots__ = ("user_id", "template", "is_active")
+
+    def __init__(self, user_id: int, template: str, is_active: bool):
+        self.user_id = user_id
+        self.template = template
+        self.is_active = is_active
+
+
+class _GalleryView:
+    """Listas de candidatos precalculadas; se reemplaza completa en cada cambio"""
+    __slots__ = ("all", "by_site", "global_")
+
+    def __init__(self, entries: Dict[int, TemplateEntry], memberships: Dict[int, Tuple[int, ...]]):
+        self.all = list(entries.values())
+        self.global_ = [entries[u] for u, sites in memberships.items() if not sites]
+        by_site: Dict[int, List[TemplateEntry]] = {}
+        for user_id, sites in memberships.items():
+            for site_id in sites:
+                by_site.setdefault(site_id, []).append(entries[user_id])
+        # Cada sede incluye también a los usuarios globales
+        self.by_site = {site_id: members + self.global_ for site_id, members in by_site.items()}
+
+
+class TemplateIndex:
+    def __init__(self, refresh_interval: float = 5.0, sites: Optional[Sequence[str]] = None):
+        self._refresh_interval = refresh_interval
+        # Códigos de las sedes que atiende el worker; None = todas
+        self._sites = list(sites) if sites else None
+        self._served_site_ids: Optional[frozenset] = None
+        self._entries: Dict[int, TemplateEntry] = {}
+        # Sedes de cada usuario cargado; () = global
+        self._memberships: Dict[int, Tuple[int, ...]] = {}
+        self._device_sites: Dict[str, int] = {}
+        self._view = _GalleryView({}, {})
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self.loaded_at: Optional[float] = None
+        self.checked_at: float = 0.0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    @property
+    def is_partial(self) -> bool:
+        """True si el worker solo carga algunas sedes"""
+        return self._sites is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _gallery_signature(db: Session) -> Tuple:
+        count, last_update = db.query(
+            func.count(User.id),
+            func.max(func.coalesce(User.updated_at, User.created_at))
+        ).filter(User.fingerprint_template.isnot(None)).one()
+        devices, last_device, last_assignment = db.query(
+            func.count(SiteDevice.id), func.max(SiteDevice.id), func.max(SiteDevice.updated_at)
+        ).one()
+        return count, last_update, devices, last_device, last_assignment
+
+    def load(self, db: Session) -> None:
+        """Carga completa: solo id, estado, template y sedes, sin hidratar User"""
+        started = time.perf_counter()
+        signature = self._gallery_signature(db)
+
+        served = None
+        if self._sites is not None:
+            served = frozenset(site_id for (site_id,) in db.query(Site.id).filter(Site.code.in_(self._sites)))
+
+        query = db.query(User.id, User.is_active, User.fingerprint_template, user_site.c.site_id) \
+            .outerjoin(user_site, user_site.c.user_id == User.id) \
+            .filter(User.fingerprint_template.isnot(None))
+        if served is not None:
+            query = query.filter(or_(user_site.c.site_id.in_(served), user_site.c.site_id.is_(None)))
+
+        entries: Dict[int, TemplateEntry] = {}
+        memberships: Dict[int, List[int]] = {}
+        for user_id, is_active, encrypted, site_id in query:
+            if user_id not in memberships:
+                try:
+                    entries[user_id] = TemplateEntry(user_id, decrypt_fingerprint(str(encrypted)), bool(is_active))
+                except Exception as e:
+                    logger.error(f"No se pudo descifrar el template del usuario {user_id}: {e}")
+                memberships[user_id] = []
+            if site_id is not None:
+                memberships[user_id].append(site_id)
+        frozen = {u: tuple(sites) for u, sites in memberships.items() if u in entries}
+
+        device_query = db.query(SiteDevice.device_id, SiteDevice.site_id)
+        if served is not None:
+            device_query = device_query.filter(SiteDevice.site_id.in_(served))
+        device_sites = dict(device_query.all())
+
+        view = _GalleryView(entries, frozen)
+        with self._lock:
+            self._served_site_ids = served
+            self._entries = entries
+            self._memberships = frozen
+            self._device_sites = device_sites
+            self._view = view
+            self._signature = signature
+            self.loaded_at = self.checked_at = time.monotonic()
+        logger.info(
+            f"Índice de templates cargado: {len(entries)} huellas en {len(view.by_site)} sedes "
+            f"en {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Recarga el índice si la galería cambió desde la última carga"""
+        if self.is_loaded and time.monotonic() - self.checked_at < self._refresh_interval:
+            return
+        if not self.is_loaded or self._gallery_signature(db) != self._signature:
+            self.load(db)
+        else:
+            self.checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Fuerza la comprobación de la firma en el próximo acceso"""
+        self.checked_at = 0.0
+
+    def upsert(self, user_id: int, template: str, is_active: bool,
+               site_ids: Optional[Sequence[int]] = None) -> None:
+        """Alta o actualización de un usuario; site_ids=None conserva sus sedes"""
+        with self._lock:
+            if site_ids is None:
+                sites = self._memberships.get(user_id, ())
+            else:
+                sites = tuple(site_ids)
+                if self._served_site_ids is not None and sites:
+                    sites = tuple(s for s in sites if s in self._served_site_ids)
+                    if not sites:
+                        # Usuario de sedes que este worker no atiende
+                        self._remove(user_id)
+                        return
+            entries = {**self._entries, user_id: TemplateEntry(user_id, template, is_active)}
+            memberships = {**self._memberships, user_id: sites}
+            self._entries, self._memberships = entries, memberships
+            self._view = _GalleryView(entries, memberships)
+
+    def _remove(self, user_id: int) -> None:
+        if user_id in self._entries:
+            entries = {u: e for u, e in self._entries.items() if u != user_id}
+            memberships = {u: s for u, s in self._memberships.items() if u != user_id}
+            self._entries, self._memberships = entries, memberships
+            self._view = _GalleryView(entries, memberships)
+
+    def site_for_device(self, device_id: Optional[str]) -> Optional[int]:
+        return self._device_sites.get(device_id) if device_id else None
+
+    def entries(self) -> List[TemplateEntry]:
+        """Instantánea de la galería cargada; segura frente a recargas concurrentes"""
+        return self._view.all
+
+    def candidates(self, device_id: Optional[str] = None) -> List[TemplateEntry]:
+        """Templates a comparar para un lector: su sede más los globales"""
+        view = self._view
+        site_id = self.site_for_device(device_id)
+        if site_id is None:
+            return view.all
+        return view.by_site.get(site_id, view.global_)
@@ -0,0 +1,67 @@
+# scripts/bench_access_queries.py
+"""
+Compara el ancho de fila y el tiempo de consulta de los listados de access_log:
+carga de entidades con JOIN del usuario completo (comportamiento anterior)
+frente a las consultas proyectadas de app.services.access_log_queries.
+
+Uso:
+    python -m scripts.bench_access_queries [limit]
+"""
+import json
+import sys
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+from app.db.session import SessionLocal
+from app.models.access_log import AccessLog
+from app.models.user import User
+from app.services.access_log_queries import access_log_query, access_log_with_user_query
+
+
+def explain(db, query) -> dict:
+    """Ejecuta EXPLAIN ANALYZE y retorna ancho de fila y tiempos"""
+    statement = query.statement.compile(
+        dialect=db.bind.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    plan = db.execute(
+        text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}")
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+    return {
+        "width": root["Plan"]["Plan Width"],
+        "rows": root["Plan"]["Actual Rows"],
+        "execution_ms": root["Execution Time"],
+        "planning_ms": root["Planning Time"],
+    }
+
+
+def main(limit: int = 1000):
+    db = SessionLocal()
+    try:
+        cases = {
+            "historial (entidad + JOIN usuario)": db.query(AccessLog)
+            .options(joinedload(AccessLog.user))
+            .order_by(AccessLog.timestamp.desc()).limit(limit),
+            "historial (proyectado)": access_log_query(db)
+            .order_by(AccessLog.timestamp.desc()).limit(limit),
+            "admin con usuario (entidad + JOIN usuario)": db.query(AccessLog)
+            .join(User)
+            .options(joinedload(AccessLog.user))
+            .order_by(AccessLog.timestamp.desc()).limit(limit),
+            "admin con usuario (proyectado)": access_log_with_user_query(db)
+            .order_by(AccessLog.timestamp.desc()).limit(limit),
+        }
+        for name, query in cases.items():
+            result = explain(db, query)
+            print(
+                f"{name:<45} width={result['width']:>5} B  rows={result['rows']:>7}  "
+                f"exec={result['execution_ms']:.2f} ms  plan={result['planning_ms']:.2f} ms"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
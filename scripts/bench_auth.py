@@ -0,0 +1,80 @@
+# scripts/bench_auth.py
+"""
+Mide el costo por petición de autenticar un token: decodificación con la
+clave reconstruida en cada llamada (comportamiento anterior) frente a la
+clave precalculada de TokenService, por algoritmo, más la consulta a la
+lista de revocación.
+
+Uso:
+    python -m scripts.bench_auth [--iterations 2000]
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jose import jwt
+from app.core.tokens import TokenDenylist, TokenKeys, TokenService
+
+
+def private_pem(key) -> bytes:
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def public_pem(key) -> bytes:
+    return key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def build_cases():
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    return [
+        ("HS256", "secreto-de-prueba-con-longitud-suficiente", "secreto-de-prueba-con-longitud-suficiente"),
+        ("RS256", private_pem(rsa_key), public_pem(rsa_key)),
+        ("ES256", private_pem(ec_key), public_pem(ec_key)),
+        ("EdDSA", private_pem(ed_key), public_pem(ed_key)),
+    ]
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo por petición de la autenticación JWT")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'alg':<6} {'clave por llamada':>18} {'precalculada':>14} {'+ revocación':>14}")
+    for algorithm, signing, verification in build_cases():
+        service = TokenService(TokenKeys(algorithm, signing, verification), TokenDenylist())
+        token = service.create({"sub": "admin@x.com"}, timedelta(minutes=30))
+        # Revocaciones de otros tokens para que la consulta no sea sobre un dict vacío
+        for i in range(10000):
+            asyncio.run(service.denylist.revoke(f"jti-{i}", time.time() + 3600))
+
+        legacy = per_call_us(lambda: jwt.decode(token, verification, algorithms=[algorithm]), args.iterations)
+        cached = per_call_us(lambda: service.decode(token), args.iterations)
+
+        loop = asyncio.new_event_loop()
+
+        def with_revocation():
+            claims = service.decode(token)
+            loop.run_until_complete(service.is_revoked(claims))
+
+        full = per_call_us(with_revocation, args.iterations)
+        loop.close()
+        print(f"{algorithm:<6} {legacy:>15.1f} us {cached:>11.1f} us {full:>11.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# scripts/bench_compression.py
+"""
+Mide bytes transmitidos y costo de CPU de la compresión de respuestas JSON
+por tamaño de respuesta, para elegir COMPRESSION_MINIMUM_SIZE y los niveles
+de gzip/brotli.
+
+Uso:
+    python -m scripts.bench_compression
+"""
+import gzip
+import time
+from app.core.compression import brotli
+from app.core.responses import RowListSerializer
+from app.schemas import access_log as access_schemas
+from scripts.bench_serialization import build_rows
+
+ROW_COUNTS = (2, 10, 100, 1_000, 10_000, 50_000)
+
+
+def timed(fn, payload: bytes, repeat: int = 5):
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        start = time.process_time()
+        out = fn(payload)
+        best = min(best, time.process_time() - start)
+    return best * 1000, len(out)
+
+
+def main():
+    serializer = RowListSerializer(access_schemas.AccessLogWithUserRow)
+    codecs = {
+        "gzip-1": lambda data: gzip.compress(data, compresslevel=1),
+        "gzip-6": lambda data: gzip.compress(data, compresslevel=6),
+        "gzip-9": lambda data: gzip.compress(data, compresslevel=9),
+    }
+    if brotli is not None:
+        codecs["br-4"] = lambda data: brotli.compress(data, quality=4)
+        codecs["br-6"] = lambda data: brotli.compress(data, quality=6)
+
+    print(f"{'filas':>7} {'original':>11}  " + "  ".join(f"{name:>22}" for name in codecs))
+    for count in ROW_COUNTS:
+        payload = serializer.dump(build_rows(count))
+        cells = []
+        for fn in codecs.values():
+            ms, size = timed(fn, payload)
+            cells.append(f"{size / 1024:>9.1f} KiB {ms:>7.2f} ms")
+        print(f"{count:>7} {len(payload) / 1024:>7.1f} KiB  " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
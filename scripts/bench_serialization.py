@@ -0,0 +1,92 @@
+# scripts/bench_serialization.py
+"""
+Compara el costo de serializar un listado de AccessLogWithUser:
+
+- estándar: validación por objeto desde atributos + jsonable_encoder + json
+  (lo que hace FastAPI con response_model sobre objetos ORM)
+- orjson: dicts de filas proyectadas codificados con orjson
+- TypeAdapter: dicts de filas proyectadas con un TypeAdapter sobre TypedDict
+- RowListSerializer: el camino que usan las rutas (TypeAdapter)
+
+No requiere base de datos: genera filas sintéticas.
+
+Uso:
+    python -m scripts.bench_serialization [filas] [repeticiones]
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.core.responses import RowListSerializer
+from app.schemas import access_log as access_schemas
+
+
+def build_rows(n: int) -> List[dict]:
+    base = datetime(2024, 1, 1, 8, 0, 0)
+    return [
+        {
+            "id": i,
+            "user_id": i % 500,
+            "access_type": "entry" if i % 2 else "exit",
+            "status": "success",
+            "timestamp": base + timedelta(seconds=i * 37),
+            "device_id": f"DOOR_{i % 12}",
+            "user": {
+                "email": f"usuario{i % 500}@discdc.com",
+                "full_name": f"Usuario Numero {i % 500}",
+                "employee_id": f"{20000 + i % 500}",
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def as_orm_like(rows: List[dict]) -> List[SimpleNamespace]:
+    return [
+        SimpleNamespace(**{**row, "user": SimpleNamespace(**row["user"])})
+        for row in rows
+    ]
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, size
+
+
+def main(n: int = 10_000, repeat: int = 5):
+    rows = build_rows(n)
+    objects = as_orm_like(rows)
+    model_adapter = TypeAdapter(List[access_schemas.AccessLogWithUser])
+    row_adapter = TypeAdapter(List[access_schemas.AccessLogWithUserRow])
+    row_serializer = RowListSerializer(access_schemas.AccessLogWithUserRow)
+
+    def standard():
+        validated = model_adapter.validate_python(objects, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    cases = {
+        "estándar (modelo por fila + json)": standard,
+        "TypeAdapter (filas TypedDict)": lambda: row_adapter.dump_json(rows),
+        "RowListSerializer": lambda: row_serializer.dump(rows),
+        "orjson (dicts)": lambda: orjson.dumps(rows),
+    }
+
+    print(f"{n} filas, mejor de {repeat} repeticiones")
+    for name, fn in cases.items():
+        ms, size = timed(fn, repeat)
+        print(f"{name:<36} {ms:>9.2f} ms  {size / 1024:>8.1f} KiB")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
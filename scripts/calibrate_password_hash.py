@@ -0,0 +1,79 @@
+# scripts/calibrate_password_hash.py
+"""
+Calibra el costo del hash de contraseñas en la máquina actual: elige el
+mayor costo cuyo tiempo de verificación no supera el objetivo y muestra
+las variables de entorno a configurar.
+
+Uso:
+    python -m scripts.calibrate_password_hash [--scheme bcrypt|argon2] [--target-ms 250]
+"""
+import argparse
+import time
+from app.core.security import build_password_context
+
+PASSWORD = "Calibracion-123"
+
+
+def measure(context, repeat: int = 3) -> float:
+    """Mejor tiempo de verificación en milisegundos"""
+    hashed = context.hash(PASSWORD)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def calibrate_bcrypt(target_ms: float):
+    chosen = None
+    for rounds in range(10, 17):
+        elapsed = measure(build_password_context("bcrypt", bcrypt_rounds=rounds))
+        print(f"bcrypt rounds={rounds:>2}  {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    if chosen is None:
+        print("Ningún costo cumple el objetivo; se recomienda el mínimo (10)")
+        chosen = 10
+    print("\nPASSWORD_HASH_SCHEME=bcrypt")
+    print(f"PASSWORD_BCRYPT_ROUNDS={chosen}")
+
+
+def calibrate_argon2(target_ms: float, memory_cost: int, parallelism: int):
+    chosen = None
+    for time_cost in range(1, 11):
+        context = build_password_context(
+            "argon2", argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_cost, argon2_parallelism=parallelism
+        )
+        elapsed = measure(context)
+        print(f"argon2 time_cost={time_cost:>2} memory={memory_cost} KiB  {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = time_cost
+    if chosen is None:
+        print("Ningún costo cumple el objetivo; reduzca --memory-kib")
+        return
+    print("\nPASSWORD_HASH_SCHEME=argon2")
+    print(f"PASSWORD_ARGON2_TIME_COST={chosen}")
+    print(f"PASSWORD_ARGON2_MEMORY_COST={memory_cost}")
+    print(f"PASSWORD_ARGON2_PARALLELISM={parallelism}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibración del costo de hashing")
+    parser.add_argument("--scheme", choices=("bcrypt", "argon2"), default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--memory-kib", type=int, default=65536)
+    parser.add_argument("--parallelism", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.scheme == "bcrypt":
+        calibrate_bcrypt(args.target_ms)
+    else:
+        calibrate_argon2(args.target_ms, args.memory_kib, args.parallelism)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# scripts/measure_access_log_storage.py
+"""
+Mide el espacio de access_log con el esquema anterior (access_type, status y
+device_id como texto) frente al compacto (smallint y device_pk entero).
+
+Crea dos tablas temporales con las mismas filas sintéticas (generate_series),
+los mismos índices que la tabla real y reporta tabla, índices y total con
+pg_relation_size / pg_indexes_size / pg_total_relation_size. Solo PostgreSQL.
+
+Uso:
+    python -m scripts.measure_access_log_storage [filas]
+"""
+import sys
+from sqlalchemy import text
+from app.db.session import SessionLocal
+
+DEVICES = 24
+
+LEGACY = """
+CREATE TEMP TABLE access_log_legacy AS
+SELECT i AS id,
+       (i % 5000) + 1 AS user_id,
+       CASE WHEN i % 2 = 0 THEN 'entry' ELSE 'exit' END::varchar AS access_type,
+       CASE WHEN i % 20 = 0 THEN 'denied' ELSE 'success' END::varchar AS status,
+       now() - make_interval(secs => i) AS timestamp,
+       'ZKTECO_DOOR_' || lpad((i % :devices)::text, 3, '0') AS device_id,
+       md5(i::text) AS idempotency_key,
+       CASE WHEN i % 20 = 0 THEN 1 END::smallint AS reason
+FROM generate_series(1, :rows) AS i
+"""
+
+COMPACT = """
+CREATE TEMP TABLE access_log_compact AS
+SELECT i AS id,
+       (i % 5000) + 1 AS user_id,
+       CASE WHEN i % 2 = 0 THEN 1 ELSE 2 END::smallint AS access_type,
+       CASE WHEN i % 20 = 0 THEN 2 ELSE 1 END::smallint AS status,
+       now() - make_interval(secs => i) AS timestamp,
+       (i % :devices) + 1 AS device_pk,
+       md5(i::text) AS idempotency_key,
+       CASE WHEN i % 20 = 0 THEN 1 END::smallint AS reason
+FROM generate_series(1, :rows) AS i
+"""
+
+
+def _indexes(table: str, device_column: str) -> list:
+    return [
+        f"ALTER TABLE {table} ADD PRIMARY KEY (id)",
+        f"CREATE UNIQUE INDEX ON {table} ({device_column}, idempotency_key)",
+        f"CREATE INDEX ON {table} (status, timestamp)",
+        f"CREATE INDEX ON {table} (user_id)",
+    ]
+
+
+def _sizes(db, table: str) -> dict:
+    return db.execute(text(
+        f"SELECT pg_relation_size('{table}') AS heap, "
+        f"pg_indexes_size('{table}') AS indexes, "
+        f"pg_total_relation_size('{table}') AS total"
+    )).one()._asdict()
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:10.1f} MB"
+
+
+def main(rows: int = 10_000_000):
+    db = SessionLocal()
+    try:
+        if db.bind.dialect.name != "postgresql":
+            raise SystemExit("Este script requiere PostgreSQL")
+        results = {}
+        for name, ddl, device_column in (
+                ("legacy", LEGACY, "device_id"),
+                ("compact", COMPACT, "device_pk"),
+        ):
+            table = f"access_log_{name}"
+            print(f"Generando {rows} filas en {table}...")
+            db.execute(text(ddl), {"rows": rows, "devices": DEVICES})
+            for statement in _indexes(table, device_column):
+                db.execute(text(statement))
+            db.execute(text(f"ANALYZE {table}"))
+            results[name] = _sizes(db, table)
+
+        print(f"\n{'':10}{'tabla':>14}{'índices':>14}{'total':>14}")
+        for name, sizes in results.items():
+            print(f"{name:10}{_mb(sizes['heap'])}{_mb(sizes['indexes'])}{_mb(sizes['total'])}")
+        legacy, compact = results["legacy"], results["compact"]
+        for key in ("heap", "indexes", "total"):
+            saved = 1 - compact[key] / legacy[key] if legacy[key] else 0.0
+            print(f"Reducción {key}: {saved:.1%}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)